@@ -0,0 +1,5 @@
+# Benchmarks für die Chart- und Cache-Pfade mit synthetischen Scrobbles (python -m benchmarks)
+#
+#   synthetic  Erzeugung realistischer Scrobble-Historien (Zipf-verteilte Songs, mehrere Jahre)
+#   fakeapi    Nachgebildete Last.fm-Session, liefert die Seiten einer Historie aus dem Speicher
+#   run        Messung der einzelnen Stufen, Ergebnisdatei (JSON) und Vergleich mit einer Basis
@@ -0,0 +1,55 @@
+# Nachbildung von user.getrecenttracks für die Benchmarks und Tests: Die Seiten einer Historie
+# kommen aus dem Speicher statt aus dem Netz. So wird der echte Abruf (call_api, JSON-Verarbeitung,
+# parallele Seiten, Speichern der Blöcke) ausgeführt, ohne Last.fm und ohne Wartezeiten.
+import json
+import math
+import numpy as np
+
+
+# Antwort mit dem vorbereiteten JSON einer Seite
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+# Ersatz für die requests-Session des Clients (siehe client.get_session)
+# df: Historie mit artist, album, song_title und uts (neueste zuerst, wie make_scrobbles)
+# fail_page: Seite, die mit einem nicht wiederholbaren API-Fehler beantwortet wird (Abbruch mitten im Abruf)
+class FakeLastFmSession:
+    def __init__(self, df, fail_page=None):
+        self.df = df
+        self.uts = df['uts'].to_numpy()[::-1]  # aufsteigend für die Suche nach from/to
+        self.fail_page = fail_page
+        self.pages = {}
+        self.requests = []  # (from, to, page) jeder Anfrage
+
+    # Funktion zum Vorbereiten der Seiten eines Zeitraums als JSON wie von Last.fm
+    # Die Benchmarks rufen sie vor der Messung auf; sonst werden die Seiten bei der ersten Anfrage erzeugt.
+    def prepare(self, from_timestamp, to_timestamp, limit):
+        start = np.searchsorted(self.uts, from_timestamp, side='left')
+        end = np.searchsorted(self.uts, to_timestamp, side='right')
+        rows = self.df.iloc[len(self.uts) - end:len(self.uts) - start]
+        tracks = [{'artist': {'#text': artist}, 'album': {'#text': album}, 'name': song_title,
+                   'date': {'uts': str(uts), '#text': ''}}
+                  for artist, album, song_title, uts in zip(rows['artist'], rows['album'], rows['song_title'], rows['uts'])]
+        total_pages = max(1, math.ceil(len(tracks) / limit))
+        for page in range(1, total_pages + 1):
+            recent_tracks = {
+                'track': tracks[(page - 1) * limit:page * limit],
+                '@attr': {'page': str(page), 'totalPages': str(total_pages), 'total': str(len(tracks))},
+            }
+            self.pages[(from_timestamp, to_timestamp, page)] = json.dumps({'recenttracks': recent_tracks}).encode()
+        return total_pages
+
+    def get(self, url, params=None, timeout=None):
+        from_timestamp, to_timestamp, page = int(params['from']), int(params['to']), int(params['page'])
+        self.requests.append((from_timestamp, to_timestamp, page))
+        if page == self.fail_page:
+            return FakeResponse(json.dumps({'error': 6, 'message': 'Seite nicht verfügbar'}).encode())
+        if (from_timestamp, to_timestamp, page) not in self.pages:
+            self.prepare(from_timestamp, to_timestamp, int(params['limit']))
+        return FakeResponse(self.pages[(from_timestamp, to_timestamp, page)])
@@ -0,0 +1,271 @@
+# Messung der Chart- und Cache-Pfade mit synthetischen Daten (ohne Netzwerk und Oberfläche)
+# Die Stufen folgen dem Weg der Daten in der Anwendung: Abruf (fetch_missing_ranges mit einer
+# nachgebildeten Last.fm-Session), Schreiben der Segmente, aggregate_weeks, rank_chart und die Charts.
+#
+#   python -m benchmarks                         # 10k und 1M Scrobbles
+#   python -m benchmarks --sizes 10k,1m,10m --repeat 5
+#   python -m benchmarks --save-baseline         # Messung als Vergleichsbasis speichern
+#   python -m benchmarks --backend sqlite        # SQLite-Speicher statt Segmentdateien
+#
+# Jede Stufe wird einzeln gemessen (Minimum und Median über --repeat Läufe). Die Ergebnisse stehen
+# maschinenlesbar in benchmarks/results.json; liegt eine Basis (benchmarks/baseline.json) vor,
+# wird jede Stufe mit ihr verglichen. Mit --fail-on-regression endet der Lauf mit Exit-Code 1,
+# wenn eine Stufe um mehr als --threshold langsamer geworden ist.
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import platform
+import datetime
+import statistics
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from lastfm_engine import config, client, store, charts, sqlstore, results as chart_results
+from lastfm_engine.periods import get_range_timestamps, get_period_timestamps
+from lastfm_engine.cli import get_chart_rows, write_charts
+from .synthetic import make_scrobbles, parse_size, format_size
+from .fakeapi import FakeLastFmSession
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, 'results.json')
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+
+# Funktion zum Einlesen der Kommandozeilenargumente
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmarks der Chart- und Cache-Pfade mit synthetischen Scrobbles.")
+    parser.add_argument('--sizes', default='10k,1m', help="Anzahl Scrobbles, kommagetrennt (z. B. 10k,1m,10m)")
+    parser.add_argument('--years', type=int, default=5, help="Anzahl Jahre der Historie")
+    parser.add_argument('--repeat', type=int, default=3, help="Läufe pro Stufe")
+    parser.add_argument('--backend', choices=['arrow', 'sqlite'], default='arrow', help="Speicher der Scrobbles")
+    parser.add_argument('--output', default=RESULTS_FILE, help="Ergebnisdatei (JSON)")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Vergleichsbasis (JSON)")
+    parser.add_argument('--save-baseline', action='store_true', help="Ergebnis zusätzlich als Vergleichsbasis speichern")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Toleranz für Abweichungen (0.2 = 20 %%)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit-Code 1 bei langsameren Stufen")
+    return parser.parse_args(argv)
+
+# Funktion zum wiederholten Messen einer Stufe
+# setup() liefert vor jedem Lauf frische Argumente (nicht mitgemessen), stage(*args) wird gemessen.
+def measure(stage, setup, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        args = setup()
+        started = time.perf_counter()
+        result = stage(*args)
+        timings.append(time.perf_counter() - started)
+    return {'min': min(timings), 'median': statistics.median(timings), 'runs': repeat}, result
+
+# Funktion zum Festhalten der Argumente, mit denen compute_chart_levels rank_chart für die Jahrescharts aufruft
+def capture_rank_chart_args(weekly, year):
+    captured = []
+    rank_chart = charts.rank_chart
+
+    def capture(*args):
+        captured.append(args)
+        return rank_chart(*args)
+
+    charts.rank_chart = capture
+    try:
+        charts.compute_chart_levels(weekly, year)
+    finally:
+        charts.rank_chart = rank_chart
+    return captured[0]
+
+# Funktion zur Messung des Abrufs eines Jahres über fetch_missing_ranges, jeweils in einen leeren Speicher
+# Die Seiten liefert eine nachgebildete Session; Ratenbegrenzung und Wartezeiten sind ausgeschaltet.
+def measure_fetch(df, year, repeat):
+    timestamps = get_period_timestamps('year', year)
+    fake_session = FakeLastFmSession(df)
+    fake_session.prepare(*timestamps, config.PAGE_LIMIT)
+    run_number = [0]
+
+    def new_user():
+        run_number[0] += 1
+        return (store.get_user_store(f"fetch_{len(df)}_{run_number[0]}"),) + timestamps
+
+    session, api_key, rate = client.session, config.API_KEY, config.REQUESTS_PER_SECOND
+    client.session = fake_session
+    config.API_KEY = 'benchmark'
+    config.REQUESTS_PER_SECOND = 1e9
+    client.rate_limiters.pop(config.API_KEY, None)
+    try:
+        return measure(store.fetch_missing_ranges, new_user, repeat)
+    finally:
+        client.session, config.API_KEY, config.REQUESTS_PER_SECOND = session, api_key, rate
+        client.rate_limiters.pop('benchmark', None)
+
+# Funktion zur Darstellung der Charts als Text (gleiches Zeilenformat wie in der Oberfläche)
+def render_chart_text(results):
+    out = io.StringIO()
+    write_charts(get_chart_rows(results), "Jahrescharts", 'text', out)
+    return out.getvalue()
+
+# Funktion zur Messung aller Stufen für eine Historie mit rows Scrobbles
+# Gemessen wird im mittleren Jahr der Historie (Woche 26, Monat 6).
+def run_size(rows, years, repeat):
+    df = make_scrobbles(rows, years)
+    year = int(df['date_time'].dt.year.iloc[len(df) // 2])
+    month = 6
+    week = 26
+    results = {}
+    run_number = [0]
+
+    # Abruf eines Jahres von Last.fm: Seiten parallel abrufen, dekodieren und blockweise speichern
+    results['fetch_missing_ranges'], _ = measure_fetch(df, year, repeat)
+
+    # Speichern der ganzen Historie (Stringtabelle, Segmente), jeweils in einen leeren Speicher
+    def new_user():
+        run_number[0] += 1
+        return (store.get_user_store(f"bench_{len(df)}_{run_number[0]}"), df)
+    results['write_segments'], _ = measure(store.merge_scrobbles, new_user, repeat)
+    user = f"bench_{len(df)}_{run_number[0]}"
+
+    results['save_cache'], _ = measure(store.save_cache, lambda: (), repeat)
+
+    # Laden: Manifest und Stringtabelle lesen, Segmente mappen und die ganze Historie lesen
+    def load_all():
+        store.load_cache()
+        entry = store.get_user_store(user)
+        return store.read_scrobbles(entry, 0, int(df['uts'].max()))
+    results['load_cache'], _ = measure(load_all, lambda: (), repeat)
+
+    entry = store.get_user_store(user)
+    results['read_year'], _ = measure(store.get_cached_period_data, lambda: ('year', year, None, None, user), repeat)
+    _, week_df = measure(store.get_cached_period_data, lambda: ('week', year, None, week, user), 1)
+
+    results['calculate_weekly_charts'], _ = measure(charts.calculate_weekly_charts, lambda: (week_df, year, week), repeat)
+
+    # Wochenaggregate eines Jahres wie in weekly.update_weekly (Scrobbles neueste zuerst aus dem Speicher)
+    empty_album_id = entry['strings'].album_ids.get('', -1)
+    year_scrobbles = store.read_newest_first(entry, *get_period_timestamps('year', year))
+    results['aggregate_weeks'], aggregates = measure(charts.aggregate_weeks,
+                                                     lambda: (year_scrobbles, empty_album_id), repeat)
+    weekly = store.add_string_columns(entry, aggregates.reset_index(drop=True))
+
+    # Reihenfolge der Jahrescharts aus den summierten Monatspunkten (Chartgröße und alle Songs)
+    rank_args = capture_rank_chart_args(weekly, year)
+    results['rank_chart'], _ = measure(charts.rank_chart, lambda: rank_args, repeat)
+    results['calculate_monthly_charts'], _ = measure(charts.calculate_monthly_charts, lambda: (weekly, year, month), repeat)
+    results['calculate_yearly_charts'], yearly = measure(charts.calculate_yearly_charts, lambda: (weekly, year), repeat)
+    results['calculate_yearly_artist_charts'], _ = measure(charts.calculate_yearly_charts,
+                                                           lambda: (weekly, year, 'artist'), repeat)
+    results['render_chart_text'], _ = measure(render_chart_text, lambda: (yearly[2],), repeat)
+
+    # Wochenaggregate eines Jahres aus den in SQL gezählten Gruppen (Songs, Künstler und Alben)
+    if entry['backend'] == 'sqlite':
+        results['sql_weekly_aggregates'], _ = measure(
+            sqlstore.query_weekly_aggregates, lambda: (user,) + get_period_timestamps('year', year) + (empty_album_id,),
+            repeat)
+        results['sql_yearly_charts'], _ = measure(chart_results.calculate_charts, lambda: (entry, 'year', year), repeat)
+
+    # Charts eines frei gewählten Zeitraums (Juni bis August): Lesen über den Zeitindex und Berechnung
+    summer = get_range_timestamps(datetime.date(year, 6, 1), datetime.date(year, 8, 31))
+    results['calculate_range_charts'], _ = measure(chart_results.calculate_range, lambda: (entry,) + summer, repeat)
+
+    # Jahrescharts mit allen Songs des Jahres (chart_depth "all")
+    chart_depth = config.CHART_DEPTH
+    config.CHART_DEPTH = -1
+    try:
+        results['rank_chart_all'], _ = measure(charts.rank_chart, lambda: rank_args, repeat)
+        results['calculate_yearly_charts_all'], _ = measure(charts.calculate_yearly_charts, lambda: (weekly, year), repeat)
+    finally:
+        config.CHART_DEPTH = chart_depth
+    return results
+
+# Funktion zum Laden einer Ergebnisdatei (None, wenn sie fehlt oder unlesbar ist)
+def load_results(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Fehler beim Laden von {path}: {e}", file=sys.stderr)
+        return None
+
+# Funktion zum Vergleich mit der Basis: Verhältnis der Mediane pro Größe und Stufe
+# Rückgabe: Liste von (Größe, Stufe, Median, Basis-Median, Verhältnis, Bewertung)
+def compare_results(results, baseline, threshold):
+    comparison = []
+    for size, stages in results['results'].items():
+        for stage, timing in stages.items():
+            base = (baseline or {}).get('results', {}).get(size, {}).get(stage)
+            if base is None:
+                comparison.append((size, stage, timing['median'], None, None, ''))
+                continue
+            ratio = timing['median'] / base['median'] if base['median'] > 0 else float('inf')
+            if ratio > 1 + threshold:
+                verdict = 'langsamer'
+            elif ratio < 1 - threshold:
+                verdict = 'schneller'
+            else:
+                verdict = 'gleich'
+            comparison.append((size, stage, timing['median'], base['median'], ratio, verdict))
+    return comparison
+
+# Funktion zur Ausgabe der Ergebnistabelle
+def print_comparison(comparison):
+    print(f"{'Größe':<6} {'Stufe':<30} {'Median':>10} {'Basis':>10} {'Faktor':>7}")
+    for size, stage, median, base, ratio, verdict in comparison:
+        base_text = f"{base * 1000:.2f} ms" if base is not None else '-'
+        ratio_text = f"{ratio:.2f}" if ratio is not None else '-'
+        print(f"{size:<6} {stage:<30} {median * 1000:>7.2f} ms {base_text:>10} {ratio_text:>7} {verdict}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    config.DEBUG_MODE = False
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+
+    results = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'years': args.years,
+            'repeat': args.repeat,
+            'backend': args.backend,
+        },
+        'results': {},
+    }
+
+    # Eigener, temporärer Speicher, damit der echte Cache (auch ein alter data_cache.pkl) unberührt bleibt
+    cache_dir, legacy_cache_file, backend = config.CACHE_DIR, config.LEGACY_CACHE_FILE, config.STORAGE_BACKEND
+    work_dir = tempfile.mkdtemp(prefix='lastfm_bench_')
+    config.CACHE_DIR = work_dir
+    config.LEGACY_CACHE_FILE = os.path.join(work_dir, 'data_cache.pkl')
+    config.STORAGE_BACKEND = args.backend
+    try:
+        for rows in sizes:
+            print(f"Messe {format_size(rows)} Scrobbles...", file=sys.stderr)
+            with contextlib.redirect_stdout(sys.stderr):
+                store.load_cache()
+                results['results'][format_size(rows)] = run_size(rows, args.years, args.repeat)
+    finally:
+        store.load_cache()
+        sqlstore.close_connections()
+        config.CACHE_DIR, config.LEGACY_CACHE_FILE, config.STORAGE_BACKEND = cache_dir, legacy_cache_file, backend
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    comparison = compare_results(results, None if args.save_baseline else load_results(args.baseline), args.threshold)
+    print_comparison(comparison)
+    if args.fail_on_regression and any(verdict == 'langsamer' for *_, verdict in comparison):
+        return 1
+    return 0
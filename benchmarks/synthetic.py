@@ -0,0 +1,55 @@
+# Synthetische Scrobble-Historien für die Benchmarks
+# Songs sind Zipf-verteilt (wenige Songs werden sehr oft gehört), jeder Song gehört fest zu einem
+# Künstler und einem Album. Die Zeitstempel sind eindeutig und über mehrere Jahre verteilt.
+import calendar
+import numpy as np
+import pandas as pd
+
+# Funktion zum Einlesen einer Größenangabe wie "10k", "1m" oder "10000"
+def parse_size(text):
+    text = text.strip().lower()
+    factor = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    if factor > 1:
+        text = text[:-1]
+    return int(float(text) * factor)
+
+# Funktion zur Formatierung einer Größe für die Ergebnisdatei (10000 -> "10k")
+def format_size(rows):
+    if rows >= 1000000 and rows % 1000000 == 0:
+        return f"{rows // 1000000}m"
+    if rows >= 1000 and rows % 1000 == 0:
+        return f"{rows // 1000}k"
+    return str(rows)
+
+# Funktion zur Erzeugung einer Historie im Format von iter_scrobble_batches (neueste zuerst)
+# rows: Anzahl Scrobbles, years: Anzahl Jahre bis einschließlich end_year
+def make_scrobbles(rows, years=5, end_year=2024, tracks=None, seed=1):
+    rng = np.random.default_rng(seed)
+    tracks = tracks or max(500, rows // 40)
+    artists = max(50, tracks // 8)
+    albums = max(100, tracks // 4)
+
+    # Eindeutige, aufsteigende Zeitstempel im Zeitraum
+    start = calendar.timegm((end_year - years + 1, 1, 1, 0, 0, 0))
+    end = calendar.timegm((end_year + 1, 1, 1, 0, 0, 0)) - 1
+    uts = np.sort(rng.integers(start, end - rows, size=rows))
+    steps = np.arange(rows)
+    uts = np.maximum.accumulate(uts - steps) + steps
+
+    # Zipf-verteilte Songs mit festem Künstler und Album
+    track_ids = (rng.zipf(1.3, size=rows) - 1) % tracks
+    track_artists = rng.integers(0, artists, size=tracks)
+    track_albums = rng.integers(0, albums, size=tracks)
+    titles = np.array([f"Song {i}" for i in range(tracks)], dtype=object)
+    artist_names = np.array([f"Artist {i}" for i in range(artists)], dtype=object)
+    album_names = np.array([f"Album {i}" if i % 13 else '' for i in range(albums)], dtype=object)
+
+    uts = uts[::-1]
+    track_ids = track_ids[::-1]
+    return pd.DataFrame({
+        'artist': artist_names[track_artists[track_ids]],
+        'album': album_names[track_albums[track_ids]],
+        'song_title': titles[track_ids],
+        'date_time': pd.to_datetime(uts, unit='s'),
+        'uts': uts.astype(np.int64),
+    })
@@ -1,449 +1,82 @@
 import sys
-import os
-import json
 import tkinter as tk
 import tkinter.font as tkFont
 from tkinter import ttk
+from tkinter import filedialog
+from tkinter import messagebox
 import pandas as pd
-from collections import Counter
 import calendar
-import requests
-import time
-import pickle  # Zum Speichern des Caches
+import threading
 import datetime  # Für die Berechnung der Wochen in einem Jahr
 
-# ---------------------------- Konfiguration und Konstante ----------------------------
-DEBUG_MODE = True  # Setze auf True, um Debug-Ausgaben zu aktivieren
+# Laden, lokaler Speicher und Chartberechnung liegen in der Engine (auch ohne Oberfläche nutzbar)
+from lastfm_engine import config
+from lastfm_engine.api import LoadJob, fetch_latest_scrobble_time
+from lastfm_engine.client import format_metrics
+from lastfm_engine.periods import get_weeks_in_year, get_prefetch_periods, get_range_timestamps
+from lastfm_engine.store import (get_cached_period_data, get_cached_range_data, prefetch_periods,
+                                 import_lastfm_csv, load_cache, clear_store, sync_all_users,
+                                 get_latest_scrobble_time)
+from lastfm_engine.trackinfo import get_track_info_cache, fetch_track_info, prefetch_track_info
+from lastfm_engine.results import get_chart_results, get_range_chart_results
+from lastfm_engine.chartruns import get_chart_run, format_chart_run
+from lastfm_engine import trace
 
+# ---------------------------- Konfiguration und Konstante ----------------------------
 # Schriftarten definieren
 FONT_FAMILY = "Ubuntu Mono"
 FONT_SIZE_TEXT = 16
 FONT_SIZE_LABEL = 20
 
-# API-Parameter
-BASE_URL = 'http://ws.audioscrobbler.com/2.0/'
-API_KEY = None  # Wird in der Initialisierung gesetzt
-current_user = None  # Aktueller Benutzer (wird gesetzt)
-
-# ---------------------------- Cache und Benutzerkonfiguration ----------------------------
-# Globale Variablen für den Daten-Cache und die Benutzer
-data_cache = {}
-users = []
-last_chart_type = None
-
 # ---------------------------- Globale Variablen für die GUI ----------------------------
 newest_date = None
 last_year = None
 last_month = None
 last_week = None
 
+# Globale Variable für die letzte Auswahl (week, month, year, range)
+last_chart_type = None
+last_range = None  # Zuletzt angezeigter frei gewählter Zeitraum (von, bis)
+chart_dimension = 'track'  # Charts für Songs (track), Künstler (artist) oder Alben (album)
 
-# Funktion zum Laden der Benutzer und API-Schlüssel aus keys.json
-def load_users():
-    global users
-    try:
-        with open('keys.json', 'r') as f:
-            users_data = json.load(f)
-            users = users_data
-    except Exception as e:
-        print(f"Fehler beim Laden der Benutzer aus keys.json: {e}")
-        sys.exit(1)
-
-# Benutzer laden
-load_users()
+# Benutzer und Einstellungen laden
+config.load_users()
+config.load_settings()
+trace.configure()  # Zeitmessung und Profiler gemäß settings.json (debug_mode, trace_file, profile_file)
 
 # Überprüfen, ob Benutzer vorhanden sind
-if not users:
+if not config.users:
     print("Keine Benutzer in keys.json gefunden.")
     sys.exit(1)
 
-# Initialisierung von API_KEY und USER mit Standardwerten
-API_KEY = users[0]['LASTFM_API_KEY']
-USER = users[0]['LASTFM_USER']
-BASE_URL = 'http://ws.audioscrobbler.com/2.0/'
-
-# Globale Variable für den aktuell ausgewählten Benutzer
-current_user = USER
-
-# Globale Variable für die letzte Auswahl (week, month, year)
-last_chart_type = None
-
-# Funktion zum Abrufen der Daten von der Last.fm API für einen bestimmten Zeitraum
-def fetch_lastfm_data(from_timestamp, to_timestamp):
-    all_tracks = []
-    page = 1
-    total_pages = 1  # Initialisierung mit 1, wird später aktualisiert
-
-    # Update the chart_label to show "Daten werden von Last.fm geladen..."
-    chart_label.config(text="Daten werden von Last.fm geladen...")
-    chart_label.update_idletasks()
-
-    while page <= total_pages:
-        try:
-            params = {
-                'method': 'user.getrecenttracks',
-                'user': current_user,
-                'api_key': API_KEY,
-                'format': 'json',
-                'from': from_timestamp,
-                'to': to_timestamp,
-                'limit': 200,  # Maximale Anzahl pro Seite
-                'page': page,
-            }
-            response = requests.get(BASE_URL, params=params)
-            response.raise_for_status()  # HTTP-Fehler auslösen, falls vorhanden
-            data = response.json()
-
-            if 'error' in data:
-                print(f"API-Fehler: {data['message']}")
-                break
-
-            recent_tracks = data.get('recenttracks', {}).get('track', [])
-            total_pages = int(data.get('recenttracks', {}).get('@attr', {}).get('totalPages', 1))
-
-            for track in recent_tracks:
-                # Überspringe den aktuell gespielten Track (nowplaying)
-                if '@attr' in track and track['@attr'].get('nowplaying') == 'true':
-                    continue
-
-                artist = track.get('artist', {}).get('#text', '').strip()
-                album = track.get('album', {}).get('#text', '').strip()
-                song_title = track.get('name', '').strip()
-                date_uts = track.get('date', {}).get('uts', None)
-
-                if date_uts is None:
-                    continue  # Wenn kein Datum vorhanden ist, überspringe den Eintrag
-
-                date_time = pd.to_datetime(int(date_uts), unit='s')
-
-                all_tracks.append({
-                    'artist': artist,
-                    'album': album,
-                    'song_title': song_title,
-                    'date_time': date_time,
-                })
-
-            if DEBUG_MODE:
-                print(f"Seite {page} von {total_pages} abgerufen für Benutzer {current_user}.")
-
-            page += 1
-            time.sleep(0.2)  # Kleine Pause, um die API nicht zu überlasten
-
-        except requests.exceptions.RequestException as e:
-            print(f"Netzwerkfehler: {e}")
-            break
-        except Exception as e:
-            print(f"Fehler beim Abrufen der Daten: {e}")
-            break
-
-    return pd.DataFrame(all_tracks)
-
-# Funktion zur Vorbereitung der Daten
-def prepare_data(df):
-    # Entferne potenzielle führende und nachfolgende Leerzeichen
-    df['song_title'] = df['song_title'].str.strip()
-    df['artist'] = df['artist'].str.strip()
-    df['album'] = df['album'].str.strip()
-
-    # Datumskomponenten hinzufügen
-    iso_calendar = df['date_time'].dt.isocalendar()
-    df['iso_year'] = iso_calendar.year
-    df['iso_week'] = iso_calendar.week
-    df['year'] = df['date_time'].dt.year
-    df['month'] = df['date_time'].dt.month
-
-    return df
-
-# Funktion zum Laden der Daten für einen bestimmten Zeitraum
-def load_data_for_period(period_type, year, month=None, week=None):
-    global data_cache
-
-    # Erzeuge einen eindeutigen Schlüssel für den Cache basierend auf dem Zeitraum und dem Benutzer
-    if period_type == 'year':
-        cache_key = f'{current_user}_year_{year}'
-    elif period_type == 'month':
-        cache_key = f'{current_user}_month_{year}_{month}'
-    elif period_type == 'week':
-        cache_key = f'{current_user}_week_{year}_{week}'
-    else:
-        print("Ungültiger Zeitraumtyp.")
-        return pd.DataFrame()
-
-    # Überprüfe, ob die Daten bereits im Cache sind
-    if cache_key in data_cache:
-        if DEBUG_MODE:
-            print(f"Daten für {cache_key} aus dem Cache geladen.")
-        return data_cache[cache_key]
-
-    # Andernfalls Daten von der API abrufen
-    if DEBUG_MODE:
-        print(f"Daten für {cache_key} werden von der API abgerufen.")
-
-    # Bestimme die Zeitstempel für den Zeitraum
-    if period_type == 'year':
-        from_timestamp = int(pd.Timestamp(year=year, month=1, day=1).timestamp())
-        to_timestamp = int(pd.Timestamp(year=year + 1, month=1, day=1).timestamp()) - 1
-    elif period_type == 'month':
-        from_timestamp = int(pd.Timestamp(year=year, month=month, day=1).timestamp())
-        if month == 12:
-            to_timestamp = int(pd.Timestamp(year=year + 1, month=1, day=1).timestamp()) - 1
-        else:
-            to_timestamp = int(pd.Timestamp(year=year, month=month + 1, day=1).timestamp()) - 1
-    elif period_type == 'week':
-        # Wir nehmen an, dass die Woche beginnt am Montag
-        from_date = pd.Timestamp.fromisocalendar(year, week, 1)
-        to_date = from_date + pd.Timedelta(days=6, hours=23, minutes=59, seconds=59)
-        from_timestamp = int(from_date.timestamp())
-        to_timestamp = int(to_date.timestamp())
-    else:
-        print("Ungültiger Zeitraumtyp.")
-        return pd.DataFrame()
-
-    # Daten abrufen
-    df = fetch_lastfm_data(from_timestamp, to_timestamp)
-    if df.empty:
-        if DEBUG_MODE:
-            print(f"Keine Daten für {cache_key} abgerufen.")
-        return df
-
-    df = prepare_data(df)
-
-    # Daten im Cache speichern
-    data_cache[cache_key] = df
-
-    # Cache speichern
-    save_cache()
-
-    return df
+# Der erste Benutzer aus keys.json ist zu Beginn ausgewählt
+config.select_user()
 
-# Funktion zum Speichern des Caches auf die Festplatte
-def save_cache():
-    try:
-        with open('data_cache.pkl', 'wb') as f:
-            pickle.dump(data_cache, f)
-    except Exception as e:
-        print(f"Fehler beim Speichern des Caches: {e}")
-
-# Funktion zum Laden des Caches von der Festplatte
-def load_cache():
-    global data_cache
-    if os.path.exists('data_cache.pkl'):
-        try:
-            with open('data_cache.pkl', 'rb') as f:
-                data_cache = pickle.load(f)
-            if DEBUG_MODE:
-                print("Cache geladen.")
-        except Exception as e:
-            print(f"Fehler beim Laden des Caches: {e}")
-            data_cache = {}
-    else:
-        data_cache = {}
+# Vor dem Start der Anwendung den Cache laden
+load_cache()
 
 # Funktion zum Löschen des Caches
 def clear_cache():
-    global data_cache
-    data_cache = {}
-    if os.path.exists('data_cache.pkl'):
-        try:
-            os.remove('data_cache.pkl')
-            print("Cache erfolgreich gelöscht.")
-        except Exception as e:
-            print(f"Fehler beim Löschen des Caches: {e}")
-    else:
-        print("Kein Cache vorhanden.")
+    cancel_current_job()
+    cancel_sync()
+    clear_store()
     # Aktualisiere die Anzeige
     chart_label.config(text="Charts")
-    chart_text.delete('1.0', tk.END)
-
-# Vor dem Start der Anwendung den Cache laden
-load_cache()
-
-# Funktion zur Berechnung der Wochencharts
-def calculate_weekly_charts(df, year, week):
-    try:
-        week_data = df[(df['iso_year'] == year) & (df['iso_week'] == week)]
-
-        if week_data.empty:
-            if DEBUG_MODE:
-                print(f"Keine Songs für Woche {week} im Jahr {year} gefunden.")
-            return {}, pd.Series(dtype=int), pd.DataFrame()
-
-        # Zähle die Vorkommen jeder song_title/artist-Kombination
-        counts = week_data.groupby(['song_title', 'artist']).size()
-
-        # Hole das erste Vorkommen jeder song_title/artist-Kombination, um das Album zu erhalten
-        first_occurrences = week_data.drop_duplicates(subset=['song_title', 'artist'], keep='first')
-
-        # Füge die Zählungen zum DataFrame hinzu
-        top_songs_df = first_occurrences.set_index(['song_title', 'artist'])
-        top_songs_df['play_count'] = counts
-
-        # Sortiere nach Häufigkeit
-        top_songs_df = top_songs_df.sort_values(by='play_count', ascending=False)
-
-        # Begrenze auf die Top 20 Songs
-        top_songs_df = top_songs_df.head(20)
-
-        # Vergabe der Punkte (Platz 1 = 20 Punkte, Platz 2 = 19 usw.)
-        points = {song: 20 - i for i, song in enumerate(top_songs_df.index)}
-
-        # Füge die Punkte zum DataFrame hinzu
-        top_songs_df['points'] = top_songs_df.index.map(points)
-
-        # Rückgabe: Punkte, Wiedergabeanzahl und Top-Songs DataFrame
-        return points, counts, top_songs_df
-
-    except Exception as e:
-        print(f"Fehler in calculate_weekly_charts: {e}")
-        return {}, pd.Series(dtype=int), pd.DataFrame()
-
-# Funktion zur Berechnung der Monatscharts
-def calculate_monthly_charts(df, year, month):
-    try:
-        month_data = df[(df['year'] == year) & (df['month'] == month)]
-
-        if month_data.empty:
-            if DEBUG_MODE:
-                print(f"Keine Songs für Monat {month} im Jahr {year} gefunden.")
-            return {}, {}, pd.DataFrame()
-
-        # Alle Wochen des Monats ermitteln
-        weeks_in_month = month_data['iso_week'].unique()
-        weekly_points = Counter()
-        weekly_plays = Counter()
-
-        # Berechnung der Wochencharts für jede Woche des Monats
-        for week in weeks_in_month:
-            points, plays, _ = calculate_weekly_charts(month_data, year, week)
-            for song, points_count in points.items():
-                weekly_points[song] += points_count
-                weekly_plays[song] += plays.get(song, 0)
-
-        if not weekly_points:
-            if DEBUG_MODE:
-                print(f"Keine Songs für Monat {month} im Jahr {year} gefunden.")
-            return {}, {}, pd.DataFrame()
-
-        # Erstelle DataFrame für die Songs
-        chart_data = pd.DataFrame({
-            'points': pd.Series(weekly_points),
-            'play_count': pd.Series(weekly_plays),
-        })
-
-        # Setze die Indexnamen
-        chart_data.index.names = ['song_title', 'artist']
-
-        # Hole Song-Informationen
-        first_occurrences = month_data.drop_duplicates(subset=['song_title', 'artist'], keep='first')
-        song_info = first_occurrences.set_index(['song_title', 'artist'])
-        song_info = song_info[['album']]
-
-        # Zusammenführen mit Song-Informationen
-        chart_data = chart_data.merge(song_info, left_index=True, right_index=True)
-
-        # Sortiere nach Punkten und Wiedergabeanzahl
-        chart_data = chart_data.sort_values(by=['points', 'play_count'], ascending=[False, False])
-
-        # Begrenze auf die Top 30 Songs
-        chart_data = chart_data.head(30)
-
-        # Konvertiere Punkte und Wiedergabeanzahl zu Dictionaries
-        points = chart_data['points'].to_dict()
-        plays = chart_data['play_count'].to_dict()
-
-        return points, plays, chart_data
-
-    except Exception as e:
-        print(f"Fehler in calculate_monthly_charts: {e}")
-        return {}, {}, pd.DataFrame()
-
-# Funktion zur Berechnung der Jahrescharts
-def calculate_yearly_charts(df, year):
-    try:
-        year_data = df[df['year'] == year]
-
-        if year_data.empty:
-            if DEBUG_MODE:
-                print(f"Keine Songs für Jahr {year} gefunden.")
-            return {}, {}, pd.DataFrame()
-
-        # Alle Monate des Jahres ermitteln
-        months_in_year = year_data['month'].unique()
-        monthly_points = Counter()
-        monthly_plays = Counter()
-
-        # Berechnung der Monatscharts für jeden Monat des Jahres
-        for month in months_in_year:
-            points, plays, _ = calculate_monthly_charts(year_data, year, month)
-            for song, points_count in points.items():
-                monthly_points[song] += points_count
-                monthly_plays[song] += plays.get(song, 0)
-
-        if not monthly_points:
-            if DEBUG_MODE:
-                print(f"Keine Songs für Jahr {year} gefunden.")
-            return {}, {}, pd.DataFrame()
-
-        # Erstelle DataFrame für die Songs
-        chart_data = pd.DataFrame({
-            'points': pd.Series(monthly_points),
-            'play_count': pd.Series(monthly_plays),
-        })
-
-        # Setze die Indexnamen
-        chart_data.index.names = ['song_title', 'artist']
-
-        # Hole Song-Informationen
-        first_occurrences = year_data.drop_duplicates(subset=['song_title', 'artist'], keep='first')
-        song_info = first_occurrences.set_index(['song_title', 'artist'])
-        song_info = song_info[['album']]
-
-        # Zusammenführen mit Song-Informationen
-        chart_data = chart_data.merge(song_info, left_index=True, right_index=True)
-
-        # Sortiere nach Punkten und Wiedergabeanzahl
-        chart_data = chart_data.sort_values(by=['points', 'play_count'], ascending=[False, False])
-
-        # Begrenze auf die Top 50 Songs
-        chart_data = chart_data.head(50)
-
-        # Konvertiere Punkte und Wiedergabeanzahl zu Dictionaries
-        points = chart_data['points'].to_dict()
-        plays = chart_data['play_count'].to_dict()
-
-        return points, plays, chart_data
-
-    except Exception as e:
-        print(f"Fehler in calculate_yearly_charts: {e}")
-        return {}, {}, pd.DataFrame()
+    clear_chart_view()
 
 # Funktion zum Abrufen des neuesten Datums (für die Initialisierung)
+# Nach einer kürzlichen Synchronisierung ist das Datum ohne Abruf aus dem lokalen Speicher bekannt.
 def get_latest_date():
     try:
-        # Abrufen des aktuellsten Tracks
-        params = {
-            'method': 'user.getrecenttracks',
-            'user': current_user,
-            'api_key': API_KEY,
-            'format': 'json',
-            'limit': 1,
-        }
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        recent_tracks = data.get('recenttracks', {}).get('track', [])
-        if not recent_tracks:
-            print("Keine aktuellen Daten verfügbar.")
-            sys.exit(1)
-
-        track = recent_tracks[0]
-        date_uts = track.get('date', {}).get('uts', None)
+        date_uts = get_latest_scrobble_time(config.current_user, config.SYNC_FRESH_INTERVAL)
+        if date_uts is None:
+            # Abrufen des aktuellsten Tracks
+            date_uts = fetch_latest_scrobble_time(config.current_user, config.API_KEY)
         if date_uts is None:
-            print("Keine Datumseinträge gefunden.")
+            print("Keine aktuellen Daten verfügbar.")
             sys.exit(1)
 
-        date_time = pd.to_datetime(int(date_uts), unit='s')
+        date_time = pd.to_datetime(date_uts, unit='s')
         return date_time
 
     except Exception as e:
@@ -452,14 +85,9 @@ def get_latest_date():
 
 # Funktion zur Aktualisierung des aktuell ausgewählten Benutzers
 def update_current_user(event):
-    global current_user, API_KEY
-    selected_user = user_combo.get()
-    for user in users:
-        if user['LASTFM_USER'] == selected_user:
-            current_user = user['LASTFM_USER']
-            API_KEY = user['LASTFM_API_KEY']
-            break
-    print(f"Aktueller Benutzer: {current_user}")
+    cancel_current_job()  # Laufende Abrufe gehören noch zum bisherigen Benutzer
+    config.select_user(user_combo.get())
+    print(f"Aktueller Benutzer: {config.current_user}")
     initialize()
 
 # Funktion zur Formatierung von Werten
@@ -469,11 +97,6 @@ def format_value(value):
     else:
         return f"{int(value)}"
 
-# Funktion zur Berechnung der Anzahl der Wochen in einem Jahr
-def get_weeks_in_year(year):
-    last_week = datetime.date(year, 12, 28).isocalendar()[1]
-    return last_week
-
 # Initialisierung der GUI mit den neuesten Daten
 newest_date = None
 def initialize():
@@ -530,7 +153,7 @@ chart_label.grid(row=1, column=1, columnspan=5, sticky="w", pady=(10, 5), padx=(
 
 # Benutzer-Auswahl
 ttk.Label(root, text="Benutzer:").grid(row=2, column=1, sticky="e", padx=(10,0))
-user_combo = ttk.Combobox(root, values=[user['LASTFM_USER'] for user in users])
+user_combo = ttk.Combobox(root, values=[user['LASTFM_USER'] for user in config.users])
 user_combo.current(0)  # Standardmäßig den ersten Benutzer auswählen
 user_combo.grid(row=2, column=2, sticky="w")
 user_combo.bind("<<ComboboxSelected>>", update_current_user)
@@ -548,6 +171,181 @@ ttk.Label(root, text="Woche:").grid(row=5, column=1, sticky="e", padx=(10,0))
 week_entry = ttk.Entry(root)
 week_entry.grid(row=5, column=2, sticky="w")
 
+# Frei gewählter Zeitraum (JJJJ-MM-TT, jeweils einschließlich)
+ttk.Label(root, text="Von:").grid(row=7, column=1, sticky="e", padx=(10,0))
+from_entry = ttk.Entry(root)
+from_entry.grid(row=7, column=2, sticky="w")
+
+ttk.Label(root, text="Bis:").grid(row=8, column=1, sticky="e", padx=(10,0))
+to_entry = ttk.Entry(root)
+to_entry.grid(row=8, column=2, sticky="w")
+
+# Auswahl der angezeigten Plätze (Standard = 20/30/50, weitere Plätze ohne Punkte)
+DEPTH_CHOICES = {'Standard': 0, '100': 100, '500': 500, '1000': 1000, '5000': 5000, 'Alle': -1}
+ttk.Label(root, text="Plätze:").grid(row=6, column=1, sticky="e", padx=(10,0))
+depth_combo = ttk.Combobox(root, values=list(DEPTH_CHOICES), state="readonly")
+depth_combo.set(next((name for name, depth in DEPTH_CHOICES.items() if depth == config.CHART_DEPTH), str(config.CHART_DEPTH)))
+depth_combo.grid(row=6, column=2, sticky="w")
+
+# Funktion zur Änderung der angezeigten Plätze
+def update_chart_depth(event):
+    config.CHART_DEPTH = DEPTH_CHOICES[depth_combo.get()]
+    redisplay_charts()
+
+depth_combo.bind("<<ComboboxSelected>>", update_chart_depth)
+
+# Auswahl der Chartart (Songs, Künstler oder Alben; Punkte jeweils wie bei den Songcharts)
+DIMENSION_CHOICES = {'Songs': 'track', 'Künstler': 'artist', 'Alben': 'album'}
+DIMENSION_NAMES = {dimension: name for name, dimension in DIMENSION_CHOICES.items()}
+ttk.Label(root, text="Charts:").grid(row=9, column=1, sticky="e", padx=(10,0))
+dimension_combo = ttk.Combobox(root, values=list(DIMENSION_CHOICES), state="readonly")
+dimension_combo.set('Songs')
+dimension_combo.grid(row=9, column=2, sticky="w")
+
+# Funktion zur Änderung der Chartart
+def update_chart_dimension(event):
+    global chart_dimension
+    chart_dimension = DIMENSION_CHOICES[dimension_combo.get()]
+    redisplay_charts()
+
+dimension_combo.bind("<<ComboboxSelected>>", update_chart_dimension)
+
+# Funktion zur Bestimmung der Überschrift einer Chartart (z. B. "Jahrescharts (Künstler)")
+def get_chart_heading(name, dimension):
+    return name if dimension == 'track' else f"{name} ({DIMENSION_NAMES[dimension]})"
+
+# Funktion zur erneuten Anzeige der zuletzt gewählten Charts (nach Änderung von Plätzen oder Chartart)
+def redisplay_charts():
+    try:
+        if last_chart_type == 'week':
+            display_weekly_charts(int(year_entry.get()), int(week_entry.get()))
+        elif last_chart_type == 'month':
+            display_monthly_charts(int(year_entry.get()), int(month_entry.get()))
+        elif last_chart_type == 'year':
+            display_yearly_charts(int(year_entry.get()))
+        elif last_chart_type == 'range':
+            on_range_entry(None)
+    except ValueError:
+        chart_label.config(text="Bitte geben Sie gültige Zahlen für Jahr, Monat und Woche ein.")
+
+# ---------------------------- Hintergrundaufträge ----------------------------
+JOB_POLL_INTERVAL = 100  # Abfrageintervall für laufende Aufträge in Millisekunden
+current_job = None  # Aktuell angezeigter Ladeauftrag
+prefetch_job = None  # Vorausladen der Nachbarzeiträume (niedrige Priorität)
+info_prefetch_job = None  # Vorausladen der Song-Informationen der angezeigten Charts (niedrige Priorität)
+
+# Funktion zum Starten eines Ladeauftrags im Hintergrund
+# work(job) läuft in einem eigenen Thread, on_done(result) danach im Tk-Hauptthread.
+# Ein noch laufender Auftrag wird abgebrochen, sein Ergebnis wird nicht mehr angezeigt.
+def start_job(work, on_done):
+    global current_job
+    cancel_current_job()
+    job = LoadJob()
+    current_job = job
+
+    def run():
+        try:
+            job.result = work(job)
+        except Exception as e:
+            print(f"Fehler im Hintergrundauftrag: {e}")
+        finally:
+            job.finished.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    chart_label.config(text=job.describe())
+    root.after(JOB_POLL_INTERVAL, poll_job, job, on_done)
+
+# Funktion zur Abfrage eines Auftrags: Fortschritt anzeigen bzw. Ergebnis ausgeben
+def poll_job(job, on_done):
+    global current_job
+    if job is not current_job:
+        return  # Auftrag wurde durch einen neueren ersetzt
+
+    if job.finished.is_set():
+        current_job = None
+        on_done(job.result)
+        return
+
+    chart_label.config(text=job.describe())
+    root.after(JOB_POLL_INTERVAL, poll_job, job, on_done)
+
+# Funktion zum Starten einer Arbeit im Hintergrund, die den angezeigten Ladeauftrag nicht ersetzt
+# (z. B. für ein Info-Fenster). on_done(result) läuft danach im Tk-Hauptthread; bei einem Fehler
+# erhält es die Ausnahme.
+def start_background_task(work, on_done):
+    job = LoadJob()
+
+    def run():
+        try:
+            job.result = work(job)
+        except Exception as e:
+            job.result = e
+        finally:
+            job.finished.set()
+
+    def poll():
+        if job.finished.is_set():
+            on_done(job.result)
+        else:
+            root.after(JOB_POLL_INTERVAL, poll)
+
+    threading.Thread(target=run, daemon=True).start()
+    root.after(JOB_POLL_INTERVAL, poll)
+    return job
+
+# Funktion zum Abbrechen des laufenden Auftrags (und des Vorausladens, damit es sofort Platz macht)
+def cancel_current_job():
+    global current_job, prefetch_job, info_prefetch_job
+    if current_job is not None:
+        current_job.cancel()
+        current_job = None
+    if prefetch_job is not None:
+        prefetch_job.cancel()
+        prefetch_job = None
+    if info_prefetch_job is not None:
+        info_prefetch_job.cancel()
+        info_prefetch_job = None
+
+# Funktion zum Vorausladen der Song-Informationen aller angezeigten Chartplätze im Hintergrund
+# results ist wie bei den Charts nach (song_title, artist) indiziert.
+def start_info_prefetch(results):
+    global info_prefetch_job
+    if info_prefetch_job is not None:
+        info_prefetch_job.cancel()
+    info_prefetch_job = LoadJob(low_priority=True)
+
+    job = info_prefetch_job
+    songs = [(artist, song_title) for song_title, artist in results.index]
+
+    def run():
+        try:
+            prefetch_track_info(songs, job)
+        except Exception as e:
+            print(f"Fehler beim Vorausladen der Song-Informationen: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
+
+# Funktion zum Vorausladen der Nachbarzeiträume der angezeigten Charts im Hintergrund
+# Damit werden "Zurück" und "Weiter" ohne Wartezeit auf Last.fm beantwortet.
+def start_prefetch(period_type, year, month=None, week=None):
+    global prefetch_job
+    periods = get_prefetch_periods(period_type, year, month, week)
+    if not periods:
+        return
+    if prefetch_job is not None:
+        prefetch_job.cancel()
+    prefetch_job = LoadJob(low_priority=True)
+
+    job = prefetch_job
+
+    def run():
+        try:
+            prefetch_periods(period_type, periods, job)
+        except Exception as e:
+            print(f"Fehler beim Vorausladen: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
+
 # Funktionen, die bei Drücken der Enter-Taste aufgerufen werden
 def on_year_entry(event):
     try:
@@ -572,10 +370,20 @@ def on_week_entry(event):
     except ValueError:
         chart_label.config(text="Bitte geben Sie gültige Zahlen für Jahr und Woche ein.")
 
+def on_range_entry(event):
+    try:
+        from_date = datetime.date.fromisoformat(from_entry.get().strip())
+        to_date = datetime.date.fromisoformat(to_entry.get().strip())
+        display_range_charts(from_date, to_date)
+    except ValueError:
+        chart_label.config(text="Bitte geben Sie gültige Daten im Format JJJJ-MM-TT ein.")
+
 # Bindings für die Enter-Taste
 year_entry.bind('<Return>', on_year_entry)
 month_entry.bind('<Return>', on_month_entry)
 week_entry.bind('<Return>', on_week_entry)
+from_entry.bind('<Return>', on_range_entry)
+to_entry.bind('<Return>', on_range_entry)
 
 # Funktionen für "Zurück" und "Weiter"
 def go_back():
@@ -681,6 +489,7 @@ ttk.Button(root, text="Wochencharts", command=lambda: display_weekly_charts(int(
 # Schaltflächen für "Zurück" und "Weiter"
 ttk.Button(root, text="Zurück", command=go_back).grid(row=7, column=3, sticky="ew")
 ttk.Button(root, text="Weiter", command=go_forward).grid(row=7, column=4, sticky="ew")
+ttk.Button(root, text="Zeitraumcharts", command=lambda: on_range_entry(None)).grid(row=8, column=3, columnspan=2, sticky="ew")
 
 # Trennline
 separator = ttk.Separator(root, orient='horizontal')
@@ -690,23 +499,172 @@ separator.grid(row=9, column=3, columnspan=2, sticky="ew", pady=10)
 ttk.Button(root, text="Reset", command=reset_input).grid(row=10, column=3, sticky="ew")
 ttk.Button(root, text="Cache löschen", command=clear_cache).grid(row=10, column=4, sticky="ew")
 
+# Funktion zum Importieren eines CSV-Exports für den aktuellen Benutzer
+def on_import_csv():
+    path = filedialog.askopenfilename(title="Last.fm-Export importieren",
+                                      filetypes=[("CSV-Dateien", "*.csv"), ("Alle Dateien", "*.*")])
+    if not path:
+        return
+    # Enthält der Export die gesamte Historie, muss vor seinem ersten Eintrag nichts mehr abgerufen werden
+    complete_history = messagebox.askyesnocancel(
+        "Last.fm-Export importieren",
+        "Enthält der Export die gesamte Historie des Benutzers (seit dem ersten Scrobble)?")
+    if complete_history is None:
+        return
+
+    # Import im Hintergrund ausführen, damit die Oberfläche bedienbar bleibt
+    def work(job):
+        job.set_status("CSV-Datei wird importiert...")
+        try:
+            return import_lastfm_csv(path, complete_history=complete_history)
+        except Exception as e:
+            print(f"Fehler beim Importieren von {path}: {e}")
+            return None
+
+    def done(result):
+        if result is None:
+            chart_label.config(text="Fehler beim Importieren der CSV-Datei.")
+        else:
+            text = f"{result['imported']} Scrobbles importiert, {result['duplicates']} bereits vorhanden"
+            if result['skipped']:
+                text += f", {result['skipped']} ohne freie Sekunde in ihrer Minute übersprungen"
+            chart_label.config(text=text)
+
+    start_job(work, done)
+
+ttk.Button(root, text="CSV importieren", command=on_import_csv).grid(row=11, column=3, columnspan=2, sticky="ew")
+
+# Synchronisierung aller Benutzer aus keys.json im Hintergrund (niedrige Priorität)
+SYNC_POLL_INTERVAL = 500  # Abfrageintervall in Millisekunden
+sync_job = None
+
+# Funktion zum Starten der Synchronisierung aller Benutzer (läuft nur einmal gleichzeitig)
+# Danach zeigt ein Benutzerwechsel aktuelle Daten ohne Wartezeit.
+# stored_only=True: nur Benutzer, für die schon Scrobbles gespeichert sind
+def start_sync(show_status=False, stored_only=False):
+    global sync_job
+    if sync_job is not None:
+        return
+    job = LoadJob(low_priority=True)
+    sync_job = job
+
+    def run():
+        try:
+            job.result = sync_all_users(job, stored_only)
+        except Exception as e:
+            print(f"Fehler bei der Synchronisierung: {e}")
+        finally:
+            job.finished.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    if show_status:
+        chart_label.config(text="Alle Benutzer werden im Hintergrund synchronisiert...")
+    root.after(SYNC_POLL_INTERVAL, poll_sync, job, show_status)
+
+# Funktion zur Abfrage der Synchronisierung (meldet das Ergebnis, wenn gerade nichts anderes lädt)
+def poll_sync(job, show_status):
+    global sync_job
+    if job is not sync_job:
+        return
+    if not job.finished.is_set():
+        root.after(SYNC_POLL_INTERVAL, poll_sync, job, show_status)
+        return
+
+    sync_job = None
+    results = job.result or {}
+    if show_status and current_job is None:
+        synced = sum(1 for success in results.values() if success)
+        chart_label.config(text=f"Synchronisierung abgeschlossen: {synced} von {len(results)} Benutzern aktuell")
+
+# Funktion zum Abbrechen der Synchronisierung
+def cancel_sync():
+    global sync_job
+    if sync_job is not None:
+        sync_job.cancel()
+        sync_job = None
+
+ttk.Button(root, text="Alle Benutzer synchronisieren", command=lambda: start_sync(show_status=True)).grid(row=12, column=3, columnspan=2, sticky="ew")
+
 # Label zur Anzeige der Charts
 chart_label = ttk.Label(root, text="Wählen Sie eine Auswertung", anchor="center", style="ChartLabel.TLabel")
 chart_label.grid(row=13, column=0, columnspan=6, sticky="ew", pady=(10, 5), padx=(10,10))
 
-# Erstelle einen Frame für das Text-Widget und den Scrollbar
+# Erstelle einen Frame für die Chartliste und den Scrollbar
 text_frame = tk.Frame(root)
 text_frame.grid(row=15, column=0, columnspan=6, padx=(10,10))
 
-# Erstelle das Text-Widget
-chart_text = tk.Text(text_frame, width=125, height=35, font=(FONT_FAMILY, FONT_SIZE_TEXT))
-chart_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-# Erstelle den Scrollbar und verbinde ihn mit dem Text-Widget
+# Chartliste: Es werden nur die sichtbaren Zeilen (und ein Vorrat) eingefügt, weitere beim Scrollen.
+# Ein einziger Handler öffnet die Song-Informationen der angeklickten Zeile.
+CHART_VIEW_BATCH = 200  # Zeilen, die beim Scrollen jeweils nachgeladen werden
+INFO_PREFETCH_ROWS = 50  # Song-Informationen werden nur für die ersten Plätze vorausgeladen
+chart_rows = []  # Alle Zeilen der angezeigten Charts: (Platz, Wiedergaben, Punkte, Titel, Künstler, Album)
+chart_rows_shown = 0  # Davon bereits in die Liste eingefügt
+chart_rows_dimension = 'track'  # Chartart der angezeigten Zeilen
+# Sichtbare Spalten pro Chartart (Albumcharts tragen den Albumtitel auch als Titel)
+CHART_VIEW_COLUMNS = {'track': ('rank', 'plays', 'points', 'title', 'artist', 'album'),
+                      'artist': ('rank', 'plays', 'points', 'artist'),
+                      'album': ('rank', 'plays', 'points', 'album', 'artist')}
+
+style.configure("Chart.Treeview", font=(FONT_FAMILY, FONT_SIZE_TEXT), rowheight=text_font.metrics('linespace') + 4)
+chart_view = ttk.Treeview(text_frame, columns=('rank', 'plays', 'points', 'title', 'artist', 'album'),
+                          show='headings', height=30, style="Chart.Treeview")
+for column, heading, width, anchor in (('rank', 'Platz', 70, 'e'), ('plays', 'Wiedergaben', 120, 'e'),
+                                       ('points', 'Punkte', 80, 'e'), ('title', 'Titel', 450, 'w'),
+                                       ('artist', 'Künstler', 300, 'w'), ('album', 'Album', 300, 'w')):
+    chart_view.heading(column, text=heading, anchor=anchor)
+    chart_view.column(column, width=width, anchor=anchor, stretch=(anchor == 'w'))
+chart_view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+# Funktion zum Einfügen weiterer Zeilen in die Chartliste
+def show_more_chart_rows():
+    global chart_rows_shown
+    end = min(len(chart_rows), chart_rows_shown + CHART_VIEW_BATCH)
+    for index in range(chart_rows_shown, end):
+        chart_view.insert('', tk.END, iid=str(index), values=chart_rows[index])
+    chart_rows_shown = end
+
+# Funktion für den Scrollbar: Nähert sich die Ansicht dem Ende der eingefügten Zeilen, wird nachgeladen
+def on_chart_scroll(first, last):
+    scrollbar.set(first, last)
+    if float(last) > 0.9 and chart_rows_shown < len(chart_rows):
+        root.after_idle(show_more_chart_rows)
+
+# Funktion zum Leeren der Chartliste
+def clear_chart_view():
+    global chart_rows, chart_rows_shown
+    chart_rows = []
+    chart_rows_shown = 0
+    chart_view.delete(*chart_view.get_children())
+
+# Funktion zur Anzeige von Charts in der Chartliste (results ist nach (song_title, artist) indiziert)
+def show_chart_rows(results, dimension='track'):
+    global chart_rows, chart_rows_dimension
+    clear_chart_view()
+    chart_rows_dimension = dimension
+    chart_view['displaycolumns'] = CHART_VIEW_COLUMNS[dimension]
+    albums = results['album'] if 'album' in results else pd.Series('', index=results.index)
+    chart_rows = [(rank, format_value(play_count), format_value(points), song_title, artist,
+                   album if pd.notna(album) else '')
+                  for rank, ((song_title, artist), play_count, points, album)
+                  in enumerate(zip(results.index, results['play_count'], results['points'], albums), start=1)]
+    show_more_chart_rows()
+    chart_view.yview_moveto(0)
+
+# Funktion zum Öffnen der Song-Informationen der angeklickten Zeile (nur bei Songcharts)
+def on_chart_click(event):
+    item = chart_view.identify_row(event.y)
+    if not item or chart_rows_dimension != 'track':
+        return
+    rank, play_count, point, song_title, artist, album = chart_rows[int(item)]
+    show_song_info(artist, song_title)
+
+chart_view.bind('<Double-1>', on_chart_click)
+
+# Erstelle den Scrollbar und verbinde ihn mit der Chartliste
 scrollbar = tk.Scrollbar(text_frame)
 scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-chart_text.config(yscrollcommand=scrollbar.set)
-scrollbar.config(command=chart_text.yview)
+chart_view.config(yscrollcommand=on_chart_scroll)
+scrollbar.config(command=chart_view.yview)
 
 # Funktion zur Anzeige der Wochencharts
 def display_weekly_charts(year, week):
@@ -723,58 +681,32 @@ def display_weekly_charts(year, week):
             print(f"Ungültiges Jahr: {year}.")
             return
 
-        # Statusmeldung: Daten werden geladen
-        chart_label.config(text="Daten werden von Last.fm geladen...")
-        chart_label.update_idletasks()
+        # Daten im Hintergrund laden und die Charts berechnen, ohne die Oberfläche zu blockieren
+        dimension = chart_dimension
+        def work(job):
+            return get_chart_results('week', year, week=week, job=job, dimension=dimension)
 
-        # Daten für den Zeitraum laden
-        df = load_data_for_period('week', year, week=week)
-
-        # Statusmeldung: Berechnungen werden durchgeführt
-        chart_label.config(text="Führe Berechnungen durch...")
-        chart_label.update_idletasks()
-
-        if df.empty:
-            chart_label.config(text=f"Keine Daten für Woche {week}, {year}")
-            chart_text.delete('1.0', tk.END)
-            return
+        start_job(work, lambda results: render_weekly_charts(year, week, results, dimension))
 
-        # Berechne die Wochencharts
-        points, plays, results = calculate_weekly_charts(df, year, week)
+    except ValueError:
+        print("Bitte geben Sie gültige Zahlen für Jahr und Woche ein.")
+    except Exception as e:
+        print(f"Fehler in display_weekly_charts: {e}")
 
-        if results.empty:
+# Funktion zur Ausgabe der Wochencharts (im Tk-Hauptthread, sobald die Berechnung fertig ist)
+@trace.traced
+def render_weekly_charts(year, week, results, dimension='track'):
+    try:
+        if results is None or results.empty:
             chart_label.config(text=f"Keine Daten für Woche {week}, {year}")
-            chart_text.delete('1.0', tk.END)
+            clear_chart_view()
             return
 
         # Setze die Überschrift
-        chart_label.config(text=f"Wochencharts - Woche {week}, {year} - {current_user}")
-
-        # Lösche die alte Chartanzeige
-        chart_text.delete('1.0', tk.END)
+        chart_label.config(text=f"{get_chart_heading('Wochencharts', dimension)} - Woche {week}, {year} - {config.current_user}")
 
-        # Füge die Top-Songs mit Punkten, Wiedergabeanzahl und Platzierung hinzu
-        for idx, ((song_title, artist), row) in enumerate(results.iterrows(), start=1):
-            album = row['album'] if 'album' in row else ''
-            play_count = format_value(row['play_count'])
-            point = format_value(row['points'])
-
-            album = album if pd.notna(album) else ''
-
-            # Text für den Song
-            song_text = f"{idx:>2}. {play_count:>2}× {point:>2} Pkt: {song_title} - {artist} ({album}) "
-
-            # Einfügen des Textes in das Text-Widget
-            chart_text.insert(tk.END, song_text)
-
-            # Füge den Link hinzu
-            start_index = chart_text.index(tk.INSERT)
-            chart_text.insert(tk.END, "Info\n")  # Einheitlicher Link-Text
-            end_index = chart_text.index(tk.INSERT)
-            tag_name = f"info_link_{idx}"
-            chart_text.tag_add(tag_name, start_index, end_index)
-            chart_text.tag_bind(tag_name, "<Button-1>", lambda e, artist=artist, song_title=song_title: show_song_info(artist, song_title))
-            chart_text.tag_config(tag_name, underline=True)  # Kein spezieller Farbton
+        # Zeige die Charts in der Chartliste an
+        show_chart_rows(results, dimension)
 
         # Aktualisiere das Monatseingabefeld basierend auf der Woche
         first_day_of_week = datetime.date.fromisocalendar(year, week, 1)
@@ -782,12 +714,17 @@ def display_weekly_charts(year, week):
         month_entry.delete(0, tk.END)
         month_entry.insert(0, month)
 
-    except ValueError:
-        print("Bitte geben Sie gültige Zahlen für Jahr und Woche ein.")
+        if dimension == 'track':
+            start_info_prefetch(results.head(INFO_PREFETCH_ROWS))
+        start_prefetch('week', year, week=week)
+
     except Exception as e:
-        print(f"Fehler in display_weekly_charts: {e}")
+        print(f"Fehler in render_weekly_charts: {e}")
 
 # Funktion zum Anzeigen von Song-Informationen
+# Das Fenster öffnet sofort; track.getInfo und die Einträge des Zeitraums werden im Hintergrund
+# geladen und danach von fill_song_info eingetragen.
+@trace.traced
 def show_song_info(artist, song_title):
     try:
         # Neues Fenster erstellen
@@ -798,24 +735,51 @@ def show_song_info(artist, song_title):
         info_label = tk.Label(info_window, text="Lade Song-Informationen...")
         info_label.pack()
 
-        # API-Aufruf für track.getInfo mit artist und song_title
-        params = {
-            'method': 'track.getInfo',
-            'api_key': API_KEY,
-            'format': 'json',
-            'artist': artist,
-            'track': song_title,
-        }
-
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if 'error' in data:
-            info_label.config(text=f"Fehler: {data['message']}")
-            return
+        # Den zuletzt angezeigten Zeitraum jetzt festhalten (er kann sich bis zum Ende des Ladens ändern)
+        chart_type, year, month, week, chart_range = last_chart_type, last_year, last_month, last_week, last_range
+        user = config.current_user
+
+        def work(job):
+            # track.getInfo mit artist und song_title (meist bereits im Cache vorhanden)
+            track_info = fetch_track_info(artist, song_title)
+            get_track_info_cache().save()
+
+            # Scrobbles des Zeitraums, für den das Fenster geöffnet wurde
+            if chart_type == 'week':
+                current_df = get_cached_period_data('week', year, week=week, user=user)
+            elif chart_type == 'month':
+                current_df = get_cached_period_data('month', year, month=month, user=user)
+            elif chart_type == 'year':
+                current_df = get_cached_period_data('year', year, user=user)
+            elif chart_type == 'range':
+                current_df = get_cached_range_data(*get_range_timestamps(*chart_range), user=user)
+            else:
+                current_df = pd.DataFrame()
+
+            # Chartverlauf aus dem Index der berechneten Charts (ohne Berechnung)
+            chart_run = get_chart_run(artist, song_title, user)
+            return track_info, current_df, chart_run
+
+        start_background_task(work, lambda result: fill_song_info(info_window, info_label, artist, song_title, result))
 
-        track_info = data.get('track', {})
+    except Exception as e:
+        print(f"Fehler in show_song_info: {e}")
+
+# Funktion zum Eintragen der geladenen Song-Informationen in das Info-Fenster
+# result: (track_info, Scrobbles des Zeitraums, Chartverlauf) oder die Ausnahme beim Laden
+def fill_song_info(info_window, info_label, artist, song_title, result):
+    if not info_window.winfo_exists():
+        return  # Fenster wurde inzwischen geschlossen
+    if isinstance(result, RuntimeError):
+        info_label.config(text=f"Fehler: {result}")
+        return
+    if isinstance(result, Exception):
+        print(f"Fehler beim Laden der Song-Informationen: {result}")
+        info_label.config(text="Fehler beim Laden der Song-Informationen.")
+        return
+
+    try:
+        track_info, current_df, chart_run = result
 
         # Informationen extrahieren
         listeners = track_info.get('listeners', 'N/A')
@@ -845,23 +809,8 @@ Zusammenfassung:
 {summary}
 """
 
-        # Überprüfen, welche Chart-Art zuletzt angezeigt wurde, um den entsprechenden Zeitraum abzurufen
-        if last_chart_type == 'week':
-            period = f"Woche {last_week}, {last_year}"
-            cache_key = f'{current_user}_week_{last_year}_{last_week}'
-        elif last_chart_type == 'month':
-            period = f"Monat {last_month}, {last_year}"
-            cache_key = f'{current_user}_month_{last_year}_{last_month}'
-        elif last_chart_type == 'year':
-            period = f"Jahr {last_year}"
-            cache_key = f'{current_user}_year_{last_year}'
-        else:
-            period = "Unbekannter Zeitraum"
-            cache_key = None
-
         # Liste der Song-Einträge im aktuellen Zeitraum
-        if cache_key and cache_key in data_cache:
-            current_df = data_cache[cache_key]
+        if not current_df.empty:
             # Filtere nach dem angeklickten Song
             song_entries = current_df[
                 (current_df['song_title'] == song_title) &
@@ -883,8 +832,10 @@ Zusammenfassung:
         else:
             entries_text = "\nKeine Einträge verfügbar."
 
+        run_text = "\nChartverlauf:\n" + format_chart_run(chart_run) + "\n"
+
         # Vollständiger Informationstext
-        full_info_text = info_text + entries_text
+        full_info_text = info_text + run_text + entries_text
 
         # Aktualisiere das Label
         info_label.config(text=full_info_text, justify=tk.LEFT)
@@ -901,7 +852,7 @@ Zusammenfassung:
         info_text_widget.config(yscrollcommand=info_scrollbar.set)
 
     except Exception as e:
-        print(f"Fehler in show_song_info: {e}")
+        print(f"Fehler in fill_song_info: {e}")
         info_label.config(text="Fehler beim Laden der Song-Informationen.")
 
 # Funktion zur Anzeige der Monatscharts
@@ -919,60 +870,35 @@ def display_monthly_charts(year, month):
             print(f"Ungültiges Jahr: {year}.")
             return
 
-        # Statusmeldung: Daten werden geladen
-        chart_label.config(text="Daten werden von Last.fm geladen...")
-        chart_label.update_idletasks()
+        # Daten im Hintergrund laden und die Charts berechnen, ohne die Oberfläche zu blockieren
+        dimension = chart_dimension
+        def work(job):
+            return get_chart_results('month', year, month=month, job=job, dimension=dimension)
 
-        # Daten für den Zeitraum laden
-        df = load_data_for_period('month', year, month=month)
+        start_job(work, lambda results: render_monthly_charts(year, month, results, dimension))
 
-        # Statusmeldung: Berechnungen werden durchgeführt
-        chart_label.config(text="Führe Berechnungen durch...")
-        chart_label.update_idletasks()
-
-        if df.empty:
-            chart_label.config(text=f"Keine Daten für Monat {month}, {year}")
-            chart_text.delete('1.0', tk.END)
-            return
-
-        # Berechne die Monatscharts
-        points, plays, results = calculate_monthly_charts(df, year, month)
+    except ValueError:
+        print("Bitte geben Sie gültige Zahlen für Jahr und Monat ein.")
+    except Exception as e:
+        print(f"Fehler in display_monthly_charts: {e}")
 
-        if results.empty:
+# Funktion zur Ausgabe der Monatscharts (im Tk-Hauptthread, sobald die Berechnung fertig ist)
+@trace.traced
+def render_monthly_charts(year, month, results, dimension='track'):
+    try:
+        if results is None or results.empty:
             chart_label.config(text=f"Keine Daten für Monat {month}, {year}")
-            chart_text.delete('1.0', tk.END)
+            clear_chart_view()
             return
 
         # Hole den Monatsnamen
         month_name = calendar.month_name[month]
 
         # Setze die Überschrift
-        chart_label.config(text=f"Monatscharts - {month_name} {year} - {current_user}")
-
-        # Lösche die alte Chartanzeige
-        chart_text.delete('1.0', tk.END)
-
-        # Füge die Top-Songs hinzu
-        for idx, ((song_title, artist), row) in enumerate(results.iterrows(), start=1):
-            album = row['album'] if 'album' in row else ''
-            play_count = format_value(row['play_count'])
-            point = format_value(row['points'])
-
-            album = album if pd.notna(album) else ''
+        chart_label.config(text=f"{get_chart_heading('Monatscharts', dimension)} - {month_name} {year} - {config.current_user}")
 
-            # Text für den Song
-            song_text = f"{idx:>2}. {play_count:>2}× {point:>2} Pkt: {song_title} - {artist} ({album}) "
-            # Einfügen des Textes in das Text-Widget
-            chart_text.insert(tk.END, song_text)
-
-            # Füge den Link hinzu
-            start_index = chart_text.index(tk.INSERT)
-            chart_text.insert(tk.END, "Info\n")  # Einheitlicher Link-Text
-            end_index = chart_text.index(tk.INSERT)
-            tag_name = f"info_link_{idx}"
-            chart_text.tag_add(tag_name, start_index, end_index)
-            chart_text.tag_bind(tag_name, "<Button-1>", lambda e, artist=artist, song_title=song_title: show_song_info(artist, song_title))
-            chart_text.tag_config(tag_name, underline=True)  # Kein spezieller Farbton
+        # Zeige die Charts in der Chartliste an
+        show_chart_rows(results, dimension)
 
         # Setze das Wocheneingabefeld auf die erste Woche des Monats
         first_day_of_month = datetime.date(year, month, 1)
@@ -980,10 +906,12 @@ def display_monthly_charts(year, month):
         week_entry.delete(0, tk.END)
         week_entry.insert(0, week)
 
-    except ValueError:
-        print("Bitte geben Sie gültige Zahlen für Jahr und Monat ein.")
+        if dimension == 'track':
+            start_info_prefetch(results.head(INFO_PREFETCH_ROWS))
+        start_prefetch('month', year, month)
+
     except Exception as e:
-        print(f"Fehler in display_monthly_charts: {e}")
+        print(f"Fehler in render_monthly_charts: {e}")
 
 # Funktion zur Anzeige der Jahrescharts
 def display_yearly_charts(year):
@@ -996,64 +924,94 @@ def display_yearly_charts(year):
             print(f"Ungültiges Jahr: {year}.")
             return
 
-        # Statusmeldung: Daten werden geladen
-        chart_label.config(text="Daten werden von Last.fm geladen...")
-        chart_label.update_idletasks()
+        # Daten im Hintergrund laden und die Charts berechnen, ohne die Oberfläche zu blockieren
+        dimension = chart_dimension
+        def work(job):
+            return get_chart_results('year', year, job=job, dimension=dimension)
 
-        # Daten für den Zeitraum laden
-        df = load_data_for_period('year', year)
+        start_job(work, lambda results: render_yearly_charts(year, results, dimension))
 
-        # Statusmeldung: Berechnungen werden durchgeführt
-        chart_label.config(text="Führe Berechnungen durch...")
-        chart_label.update_idletasks()
+    except ValueError:
+        print("Bitte geben Sie eine gültige Zahl für das Jahr ein.")
+    except Exception as e:
+        print(f"Fehler in display_yearly_charts: {e}")
 
-        if df.empty:
+# Funktion zur Ausgabe der Jahrescharts (im Tk-Hauptthread, sobald die Berechnung fertig ist)
+@trace.traced
+def render_yearly_charts(year, results, dimension='track'):
+    try:
+        if results is None or results.empty:
             chart_label.config(text=f"Keine Daten für Jahr {year}")
-            chart_text.delete('1.0', tk.END)
+            clear_chart_view()
             return
 
-        # Berechne die Jahrescharts
-        points, plays, results = calculate_yearly_charts(df, year)
+        # Setze die Überschrift
+        chart_label.config(text=f"{get_chart_heading('Jahrescharts', dimension)} - {year} - {config.current_user}")
 
-        if results.empty:
-            chart_label.config(text=f"Keine Daten für Jahr {year}")
-            chart_text.delete('1.0', tk.END)
+        # Zeige die Charts in der Chartliste an
+        show_chart_rows(results, dimension)
+
+        if dimension == 'track':
+            start_info_prefetch(results.head(INFO_PREFETCH_ROWS))
+        start_prefetch('year', year)
+
+    except Exception as e:
+        print(f"Fehler in render_yearly_charts: {e}")
+
+# Funktion zur Anzeige der Charts eines frei gewählten Zeitraums
+def display_range_charts(from_date, to_date):
+    global last_chart_type, last_range
+    last_chart_type = 'range'
+
+    try:
+        # Eingabevalidierung
+        if to_date < from_date:
+            print(f"Ungültiger Zeitraum: {to_date} liegt vor {from_date}.")
             return
 
-        # Setze die Überschrift
-        chart_label.config(text=f"Jahrescharts - {year} - {current_user}")
+        if from_date.year < 2000 or from_date > newest_date.date():
+            print(f"Ungültiger Zeitraum: {from_date} bis {to_date}.")
+            return
+
+        last_range = (from_date, to_date)
 
-        # Lösche die alte Chartanzeige
-        chart_text.delete('1.0', tk.END)
+        # Daten im Hintergrund laden und die Charts berechnen, ohne die Oberfläche zu blockieren
+        dimension = chart_dimension
+        def work(job):
+            return get_range_chart_results(from_date, to_date, job=job, dimension=dimension)
 
-        # Füge die Top-Songs hinzu
-        for idx, ((song_title, artist), row) in enumerate(results.iterrows(), start=1):
-            album = row['album'] if 'album' in row else ''
-            play_count = format_value(row['play_count'])
-            point = format_value(row['points'])
+        start_job(work, lambda results: render_range_charts(from_date, to_date, results, dimension))
 
-            album = album if pd.notna(album) else ''
+    except Exception as e:
+        print(f"Fehler in display_range_charts: {e}")
+
+# Funktion zur Ausgabe der Charts eines frei gewählten Zeitraums (im Tk-Hauptthread)
+@trace.traced
+def render_range_charts(from_date, to_date, results, dimension='track'):
+    try:
+        if results is None or results.empty:
+            chart_label.config(text=f"Keine Daten für {from_date} bis {to_date}")
+            clear_chart_view()
+            return
 
-            # Text für den Song
-            song_text = f"{idx:>2}. {play_count:>3}× {point:>3} Pkt: {song_title} - {artist} ({album}) "
+        # Setze die Überschrift
+        chart_label.config(text=f"{get_chart_heading('Zeitraumcharts', dimension)} - {from_date} bis {to_date} - {config.current_user}")
 
-            # Einfügen des Textes in das Text-Widget
-            chart_text.insert(tk.END, song_text)
+        # Zeige die Charts in der Chartliste an
+        show_chart_rows(results, dimension)
 
-            # Füge den Link hinzu
-            start_index = chart_text.index(tk.INSERT)
-            chart_text.insert(tk.END, "Info\n")  # Einheitlicher Link-Text
-            end_index = chart_text.index(tk.INSERT)
-            tag_name = f"info_link_{idx}"
-            chart_text.tag_add(tag_name, start_index, end_index)
-            chart_text.tag_bind(tag_name, "<Button-1>", lambda e, artist=artist, song_title=song_title: show_song_info(artist, song_title))
-            chart_text.tag_config(tag_name, underline=True)  # Kein spezieller Farbton
+        if dimension == 'track':
+            start_info_prefetch(results.head(INFO_PREFETCH_ROWS))
 
-    except ValueError:
-        print("Bitte geben Sie eine gültige Zahl für das Jahr ein.")
     except Exception as e:
-        print(f"Fehler in display_yearly_charts: {e}")
+        print(f"Fehler in render_range_charts: {e}")
 
 # Starte die GUI
 initialize()
+start_sync(stored_only=True)  # Beim Start nur Benutzer mit lokalem Speicher, neue Benutzer laden nichts ungefragt
 root.mainloop()
+
+# Messwerte der API-Aufrufe dieser Sitzung ausgeben, Trace und Profil speichern
+if config.DEBUG_MODE:
+    print(format_metrics())
+trace.finish()
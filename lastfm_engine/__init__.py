@@ -0,0 +1,19 @@
+# Chart-Engine ohne Oberfläche: Laden, lokaler Speicher und Chartberechnung
+#
+#   config     Konstanten, Benutzer (keys.json) und Einstellungen (settings.json)
+#   client     HTTP-Client: Session, Timeouts, Wiederholungen, Circuit Breaker, Messwerte
+#   api        Ladeaufträge und Abruf von user.getrecenttracks
+#   periods    Zeiträume (Jahr, Monat, Woche) und ihre Zeitstempel
+#   store      Lokaler Scrobble-Speicher, CSV-Import, Übernahme alter Caches
+#   sqlstore   Optionaler SQLite-Speicher mit Wochenaggregation in SQL
+#   trackinfo  track.getInfo mit persistentem Cache
+#   charts     Wochen-, Monats- und Jahrescharts
+#   weekly     Persistente Wochenaggregate (Grundlage der Monats- und Jahrescharts)
+#   results    Gespeicherte Chartergebnisse pro Zeitraum
+#   chartruns  Chartverläufe: Index Song -> Platzierungen in allen berechneten Zeiträumen
+#   trace      Zeitmessung mit Spans (Chrome-Trace, Übersicht) und optionaler Profiler
+#   cli        Kommandozeile (python -m lastfm_engine)
+#
+# Beim Import wird weder gelesen noch geschrieben oder abgerufen; Dateien werden erst beim
+# Aufruf der Funktionen verwendet. pandas und pyarrow werden erst mit store bzw. charts geladen,
+# requests erst beim ersten Abruf von Last.fm.
@@ -0,0 +1,221 @@
+# Abruf von Scrobbles über user.getrecenttracks und Ladeaufträge (Fortschritt, Abbruch, Priorität)
+# requests (sowie numpy und pandas) werden erst beim ersten Abruf importiert: Das Modul lässt sich
+# ohne Nebenwirkungen laden, und Auswertungen aus dem lokalen Speicher kommen ganz ohne requests aus.
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .client import call_api
+from .trace import log
+
+# Spalten eines abgerufenen Scrobble-DataFrames
+SCROBBLE_COLUMNS = ['artist', 'album', 'song_title', 'date_time', 'uts']
+
+# Ladeauftrag der Oberfläche: Abbruch und Fortschritt (wird von Hintergrund-Threads aktualisiert)
+# Hintergrundaufträge (low_priority=True, z. B. Vorausladen) lassen Vordergrundanfragen beim Rate-Limiter vor.
+class LoadJob:
+    def __init__(self, low_priority=False):
+        self.low_priority = low_priority
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+        self.result = None
+        self.status = "Daten werden geladen..."
+        self.pages_done = 0
+        self.total_pages = 0
+        self.fetch_started = None
+
+    # Auftrag abbrechen (laufende Abrufe enden nach der aktuellen Seite)
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
+
+    def set_status(self, status):
+        with self.lock:
+            self.status = status
+            self.total_pages = 0
+
+    # Beginn eines Abrufs mit bekannter Seitenzahl (Seite 1 ist bereits geladen)
+    def start_fetch(self, total_pages, started):
+        with self.lock:
+            self.status = "Daten werden von Last.fm geladen..."
+            self.pages_done = 1
+            self.total_pages = total_pages
+            self.fetch_started = started
+
+    def page_done(self):
+        with self.lock:
+            self.pages_done += 1
+
+    # Statustext mit Seitenfortschritt, Durchsatz und geschätzter Restzeit
+    def describe(self):
+        with self.lock:
+            if self.total_pages <= 1:
+                return self.status
+            text = f"{self.status} Seite {self.pages_done} von {self.total_pages}"
+            elapsed = max(time.monotonic() - self.fetch_started, 0.001)
+            rate = self.pages_done / elapsed
+            remaining = (self.total_pages - self.pages_done) / rate
+            return f"{text} ({rate:.1f} Seiten/s), noch ca. {format_duration(remaining)}"
+
+# Funktion zur Formatierung einer Dauer in Sekunden (z. B. "45 s", "12 min", "3 h 5 min")
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{int(seconds // 3600)} h {int(seconds % 3600 // 60)} min"
+
+# Funktion zum Abrufen einer einzelnen Seite von user.getrecenttracks (Wiederholungen im Client)
+def fetch_recent_tracks_page(user, api_key, from_timestamp, to_timestamp, page, low_priority=False):
+    params = {
+        'user': user,
+        'from': from_timestamp,
+        'to': to_timestamp,
+        'limit': config.PAGE_LIMIT,
+        'page': page,
+    }
+    data = call_api('user.getrecenttracks', params, api_key, low_priority)
+    return data.get('recenttracks', {})
+
+# Funktion zur Umwandlung der Tracks einer Seite in Spalten
+# Rückgabe: Listen für artist, album und song_title sowie ein int64-Array für uts
+def parse_recent_tracks(recent_tracks):
+    import numpy as np
+    artists = []
+    albums = []
+    song_titles = []
+    timestamps = []
+    for track in recent_tracks:
+        # Überspringe den aktuell gespielten Track (nowplaying)
+        attributes = track.get('@attr')
+        if attributes and attributes.get('nowplaying') == 'true':
+            continue
+
+        date_uts = track.get('date', {}).get('uts', None)
+        if date_uts is None:
+            continue  # Wenn kein Datum vorhanden ist, überspringe den Eintrag
+
+        artists.append(track.get('artist', {}).get('#text', '').strip())
+        albums.append(track.get('album', {}).get('#text', '').strip())
+        song_titles.append(track.get('name', '').strip())
+        timestamps.append(date_uts)
+
+    return {
+        'artist': artists,
+        'album': albums,
+        'song_title': song_titles,
+        'uts': np.array(timestamps).astype(np.int64),
+    }
+
+# Funktion zum Zusammensetzen der Spalten mehrerer Seiten zu einem DataFrame
+# Die Zeitstempel werden dabei einmal für alle Seiten umgewandelt.
+def build_scrobble_frame(parsed_pages):
+    import numpy as np
+    import pandas as pd
+    parsed_pages = [parsed for parsed in parsed_pages if len(parsed['uts'])]
+    if not parsed_pages:
+        return pd.DataFrame(columns=SCROBBLE_COLUMNS)
+
+    uts = np.concatenate([parsed['uts'] for parsed in parsed_pages])
+    return pd.DataFrame({
+        'artist': [value for parsed in parsed_pages for value in parsed['artist']],
+        'album': [value for parsed in parsed_pages for value in parsed['album']],
+        'song_title': [value for parsed in parsed_pages for value in parsed['song_title']],
+        'date_time': pd.to_datetime(uts, unit='s'),
+        'uts': uts,
+    })
+
+# Generator für die Scrobbles eines Zeitraums in Blöcken von config.STREAM_BATCH_PAGES Seiten
+# Seite 1 liefert totalPages; die weiteren Seiten werden parallel abgerufen, aber nur wenige im
+# Voraus, und blockweise in Seitenreihenfolge (neueste zuerst) als DataFrame geliefert. Der
+# Speicherbedarf hängt so nur von der Blockgröße ab, nicht von der Länge des Zeitraums.
+# Fehler werden an den Aufrufer weitergegeben; bei einem Abbruch (job) endet der Generator nach dem
+# laufenden Block.
+def iter_scrobble_batches(from_timestamp, to_timestamp, job=None, user=None, api_key=None):
+    # Benutzer und Schlüssel festhalten, damit alle Threads denselben Stand verwenden
+    if user is None:
+        user, api_key = config.current_user, config.API_KEY
+    elif api_key is None:
+        api_key = config.get_api_key(user)
+
+    # Zeitraum auf "jetzt" begrenzen, damit neue Scrobbles die Seiten nicht verschieben
+    to_timestamp = min(to_timestamp, int(time.time()))
+    low_priority = job is not None and job.low_priority
+
+    started = time.monotonic()
+    first_page = fetch_recent_tracks_page(user, api_key, from_timestamp, to_timestamp, 1, low_priority)
+    total_pages = int(first_page.get('@attr', {}).get('totalPages', 1))
+    batch = [parse_recent_tracks(first_page.get('track', []))]
+    if job is not None:
+        if job.is_cancelled():
+            yield build_scrobble_frame(batch)
+            return
+        job.start_fetch(total_pages, started)
+
+    log.debug("Seite 1 von %s abgerufen für Benutzer %s.", total_pages, user)
+
+    if total_pages > 1:
+        executor = ThreadPoolExecutor(max_workers=config.MAX_WORKERS)
+        try:
+            futures = {}
+            next_page = 2
+            for page in range(2, total_pages + 1):
+                # Höchstens zwei Seiten pro Thread im Voraus anfordern
+                while next_page <= total_pages and next_page < page + 2 * config.MAX_WORKERS:
+                    futures[next_page] = executor.submit(fetch_recent_tracks_page, user, api_key, from_timestamp,
+                                                         to_timestamp, next_page, low_priority)
+                    next_page += 1
+                recent_tracks = futures.pop(page).result()
+                batch.append(parse_recent_tracks(recent_tracks.get('track', [])))
+                if job is not None:
+                    job.page_done()
+                log.debug("Seite %s von %s abgerufen für Benutzer %s.", page, total_pages, user)
+
+                # Bei einem Abbruch die bereits abgerufenen Seiten noch liefern (sie können gespeichert werden)
+                if job is not None and job.is_cancelled():
+                    log.debug("Abruf für Benutzer %s abgebrochen.", user)
+                    yield build_scrobble_frame(batch)
+                    return
+
+                if len(batch) >= config.STREAM_BATCH_PAGES:
+                    yield build_scrobble_frame(batch)
+                    batch = []
+        finally:
+            # Bei einem Fehler oder Abbruch noch nicht gestartete Seiten verwerfen
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    if batch:
+        yield build_scrobble_frame(batch)
+
+# Funktion zum blockweisen Abrufen eines Zeitraums: handle_batch wird für jeden Block aufgerufen
+# (z. B. zum Speichern), danach wird der Block verworfen.
+# Gibt False zurück, wenn der Zeitraum nicht vollständig abgerufen werden konnte
+# oder der Ladeauftrag (job) abgebrochen wurde.
+def stream_lastfm_data(from_timestamp, to_timestamp, handle_batch, job=None, user=None, api_key=None):
+    import requests
+    try:
+        for batch in iter_scrobble_batches(from_timestamp, to_timestamp, job, user, api_key):
+            handle_batch(batch)
+    except requests.exceptions.RequestException as e:
+        print(f"Netzwerkfehler: {e}")
+        return False
+    except Exception as e:
+        print(f"Fehler beim Abrufen der Daten: {e}")
+        return False
+    return job is None or not job.is_cancelled()
+
+# Funktion zum Abrufen des Zeitstempels (uts) des neuesten Scrobbles eines Benutzers
+# Gibt None zurück, wenn der Benutzer noch keine Scrobbles hat.
+def fetch_latest_scrobble_time(user, api_key):
+    data = call_api('user.getrecenttracks', {'user': user, 'limit': 1}, api_key)
+
+    # Der aktuell gespielte Track (nowplaying) hat kein Datum und wird übersprungen
+    for track in data.get('recenttracks', {}).get('track', []):
+        date_uts = track.get('date', {}).get('uts', None)
+        if date_uts is not None:
+            return int(date_uts)
+    return None
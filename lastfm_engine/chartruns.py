@@ -0,0 +1,204 @@
+# Chartverläufe: Umgekehrter Index Song -> Platzierungen in allen berechneten Wochen-, Monats- und
+# Jahrescharts (data_cache/<Benutzer>/chart_runs.json). Der Index wird bei jedem Speichern eines
+# Chartergebnisses fortgeschrieben (siehe results.save_result); rebuild_chart_runs baut ihn für alle
+# vollständig vorhandenen Zeiträume neu auf. Gespeichert wird pro Zeitraum die Liste seiner
+# Chartplätze, die Zuordnung pro Song entsteht beim Laden.
+import os
+import json
+import time
+
+from . import config
+from .periods import get_period_timestamps, get_weeks_in_year
+from .store import store_lock, get_user_store, get_user_dir, get_missing_ranges, get_stored_range
+from .trace import log
+
+CHART_RUNS_VERSION = 1  # Erhöhen, wenn sich das Format des Index ändert
+PERIOD_LABELS = {'week': 'Wochen', 'month': 'Monate', 'year': 'Jahre'}
+
+
+# Funktion zur Bestimmung der Chartgröße (Plätze mit Punkten) eines Zeitraumtyps
+def get_chart_size(period_type):
+    return {'week': config.WEEKLY_CHART_SIZE, 'month': config.MONTHLY_CHART_SIZE,
+            'year': config.YEARLY_CHART_SIZE}[period_type]
+
+# Funktion zur Bestimmung des Zeitraumtyps eines Ergebnisschlüssels (None für frei gewählte Zeiträume)
+def get_key_period_type(key):
+    period_type = key.split('_', 1)[0]
+    return period_type if period_type in PERIOD_LABELS else None
+
+# Funktion zur Darstellung eines Ergebnisschlüssels (z. B. "week_2023_05" -> "Woche 5, 2023")
+def format_period_key(key):
+    parts = key.split('_')
+    if parts[0] == 'week':
+        return f"Woche {int(parts[2])}, {parts[1]}"
+    if parts[0] == 'month':
+        return f"Monat {int(parts[2])}, {parts[1]}"
+    return f"Jahr {parts[1]}"
+
+# Funktion zum Öffnen des Index eines Benutzers (einmal pro Sitzung von der Festplatte, nur mit store_lock)
+# entry['chart_runs'] = {'periods': {Schlüssel: [[track_id, Platz, Punkte, Wiedergaben], ...]},
+#                        'tracks': {track_id: {Schlüssel: (Platz, Punkte, Wiedergaben)}}, ...}
+def open_chart_runs(entry):
+    runs = entry.get('chart_runs')
+    if runs is not None:
+        return runs
+
+    runs = {'periods': {}, 'tracks': {}, 'dirty': False, 'deferred': False}
+    path = os.path.join(get_user_dir(entry['user']), 'chart_runs.json')
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data['version'] == CHART_RUNS_VERSION:
+                for key, places in data['periods'].items():
+                    set_period_places(runs, key, places)
+        except Exception as e:
+            print(f"Fehler beim Laden der Chartverläufe für {entry['user']}: {e}")
+    entry['chart_runs'] = runs
+    return runs
+
+# Funktion zum Ersetzen der Chartplätze eines Zeitraums im Index (beide Richtungen)
+def set_period_places(runs, key, places):
+    for track_id, *_ in runs['periods'].get(key, []):
+        track = runs['tracks'].get(track_id)
+        if track is not None:
+            track.pop(key, None)
+    runs['periods'][key] = places
+    for track_id, rank, points, plays in places:
+        runs['tracks'].setdefault(track_id, {})[key] = (rank, points, plays)
+
+# Funktion zum Speichern des Index (atomar, nur nach Änderungen und nicht während eines Neuaufbaus)
+def save_chart_runs(entry):
+    with store_lock:
+        runs = open_chart_runs(entry)
+        if not runs['dirty'] or runs['deferred']:
+            return
+        data = {'version': CHART_RUNS_VERSION, 'periods': runs['periods']}
+        runs['dirty'] = False
+    user_dir = get_user_dir(entry['user'])
+    try:
+        os.makedirs(user_dir, exist_ok=True)
+        path = os.path.join(user_dir, 'chart_runs.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+    except Exception as e:
+        print(f"Fehler beim Speichern der Chartverläufe für {entry['user']}: {e}")
+
+# Funktion zum Eintragen eines berechneten Chartergebnisses in den Index
+# Übernommen werden nur die Plätze innerhalb der Chartgröße (20/30/50), auch bei größerer Charttiefe.
+def record_chart_result(entry, key, results):
+    period_type = get_key_period_type(key)
+    if period_type is None:
+        return
+
+    strings = entry['strings']
+    places = []
+    for rank, ((song_title, artist), play_count, points) in enumerate(
+            zip(results.index, results['play_count'], results['points']), start=1):
+        if rank > get_chart_size(period_type):
+            break
+        track_id = strings.track_ids.get((strings.title_ids.get(song_title), strings.artist_ids.get(artist)))
+        if track_id is not None:
+            places.append([track_id, rank, int(points), int(play_count)])
+
+    with store_lock:
+        runs = open_chart_runs(entry)
+        set_period_places(runs, key, places)
+        runs['dirty'] = True
+
+# Funktion zum Abrufen des Chartverlaufs eines Songs (ohne Berechnung, nur aus dem Index)
+# Rückgabe: {Zeitraumtyp: {'entries': [(Schlüssel, Platz, Punkte, Wiedergaben), ...] chronologisch,
+#            'count': Anzahl Zeiträume in den Charts, 'peak': beste Platzierung, 'peak_count': wie oft,
+#            'points': Summe der Punkte}}; leer, wenn der Song nie in den Charts war
+def get_chart_run(artist, song_title, user=None):
+    entry = get_user_store(user or config.current_user)
+    strings = entry['strings']
+    with store_lock:
+        track_id = strings.track_ids.get((strings.title_ids.get(song_title), strings.artist_ids.get(artist)))
+        places = dict(open_chart_runs(entry)['tracks'].get(track_id, {}))
+
+    run = {}
+    for key in sorted(places):
+        rank, points, plays = places[key]
+        run.setdefault(get_key_period_type(key), {'entries': []})['entries'].append((key, rank, points, plays))
+    for period_run in run.values():
+        ranks = [rank for key, rank, points, plays in period_run['entries']]
+        period_run['count'] = len(ranks)
+        period_run['peak'] = min(ranks)
+        period_run['peak_count'] = ranks.count(period_run['peak'])
+        period_run['points'] = sum(points for key, rank, points, plays in period_run['entries'])
+    return run
+
+# Funktion zur Darstellung eines Chartverlaufs als Text (für Oberfläche und Kommandozeile)
+def format_chart_run(run):
+    if not run:
+        return "Keine Chartplatzierungen in den berechneten Zeiträumen."
+    lines = []
+    for period_type in ('week', 'month', 'year'):
+        period_run = run.get(period_type)
+        if period_run is None:
+            continue
+        lines.append(f"{PERIOD_LABELS[period_type]} in den Charts: {period_run['count']}, "
+                     f"beste Platzierung: {period_run['peak']} ({period_run['peak_count']}×), "
+                     f"Punkte: {period_run['points']}")
+        for key, rank, points, plays in period_run['entries']:
+            lines.append(f"  {format_period_key(key):<16} Platz {rank:>2}  {points:>4} Pkt  {plays:>4}×")
+    return '\n'.join(lines)
+
+# Funktion zur Bestimmung aller Zeiträume, die vollständig im lokalen Speicher liegen
+# Rückgabe: Liste von (Zeitraumtyp, Jahr, Monat, Woche)
+def get_covered_periods(entry):
+    stored_range = get_stored_range(entry)
+    if stored_range is None:
+        return []
+    first_year = time.gmtime(stored_range[0]).tm_year
+    last_year = time.gmtime(stored_range[1]).tm_year
+    now = int(time.time())
+
+    periods = []
+    for year in range(first_year, last_year + 1):
+        periods += [('week', year, None, week) for week in range(1, get_weeks_in_year(year) + 1)]
+        periods += [('month', year, month, None) for month in range(1, 13)]
+        periods.append(('year', year, None, None))
+
+    covered = []
+    for period in periods:
+        from_timestamp, to_timestamp = get_period_timestamps(*period)
+        if from_timestamp <= now and not get_missing_ranges(entry['covered'], from_timestamp, min(to_timestamp, now)):
+            covered.append(period)
+    return covered
+
+# Funktion zum Neuaufbau des Index aus allen vollständig vorhandenen Zeiträumen (ohne Netzwerkzugriff)
+# Gespeicherte Chartergebnisse werden wiederverwendet, fehlende berechnet. Gibt die Anzahl der
+# eingetragenen Zeiträume zurück (bzw. None nach einem Abbruch über job).
+def rebuild_chart_runs(user=None, job=None):
+    from .results import get_chart_results, get_result_key
+
+    entry = get_user_store(user or config.current_user)
+    periods = get_covered_periods(entry)
+    with store_lock:
+        runs = open_chart_runs(entry)
+        runs['deferred'] = True
+        runs['periods'] = {}
+        runs['tracks'] = {}
+        runs['dirty'] = True
+
+    count = 0
+    try:
+        for number, (period_type, year, month, week) in enumerate(periods, start=1):
+            if job is not None:
+                if job.is_cancelled():
+                    return None
+                job.set_status(f"Chartverläufe: {number} von {len(periods)} Zeiträumen...")
+            results = get_chart_results(period_type, year, month, week, user=entry['user'], offline=True)
+            if not results.empty:
+                record_chart_result(entry, get_result_key(period_type, year, month, week), results)
+                count += 1
+    finally:
+        with store_lock:
+            runs['deferred'] = False
+        save_chart_runs(entry)
+
+    log.debug("Chartverläufe für %s: %s Zeiträume eingetragen.", entry['user'], count)
+    return count
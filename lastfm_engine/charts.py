@@ -0,0 +1,376 @@
+# Berechnung der Wochencharts aus den Scrobbles einer Woche sowie der Monats- und Jahrescharts
+# aus den Wochenaggregaten, jeweils für Songs, Künstler oder Alben
+import numpy as np
+import pandas as pd
+
+from . import config
+from .trace import traced, log
+
+# Dimensionen der Charts (Index = Wert der Spalte 'dimension' in den Wochenaggregaten)
+# Die Ergebnisse sind immer nach (song_title, artist) indiziert: Künstlercharts mit leerem Titel,
+# Albumcharts mit dem Albumtitel als Titel. Scrobbles ohne Album zählen nicht für die Albumcharts.
+DIMENSIONS = ['track', 'artist', 'album']
+
+# Funktion zur Berechnung der Wochencharts aus den Scrobbles einer Woche (neueste zuerst, mit IDs und Datumsspalten)
+# Gezählt und gereiht wird wie in den Wochenaggregaten (siehe aggregate_weeks), ausgewählt werden die
+# angezeigten Plätze per Teilsortierung (siehe calculate_weekly_charts_from_aggregates).
+@traced
+def calculate_weekly_charts(df, year, week, dimension='track'):
+    try:
+        week_data = df[(df['iso_year'] == year) & (df['iso_week'] == week)]
+        if week_data.empty:
+            log.debug("Keine Songs für Woche %s im Jahr %s gefunden.", week, year)
+            return {}, {}, pd.DataFrame()
+
+        empty_albums = week_data['album_id'].to_numpy()[(week_data['album'] == '').to_numpy()]
+        weekly = aggregate_weeks(week_data.assign(year=0, month=0), empty_albums[0] if len(empty_albums) else None)
+        positions = pd.Index(week_data['uts']).get_indexer(weekly['last_uts'])
+        for column in ('song_title', 'artist', 'album'):
+            weekly[column] = week_data[column].to_numpy()[positions]
+        return calculate_weekly_charts_from_aggregates(weekly, year, week, dimension)
+
+    except Exception as e:
+        print(f"Fehler in calculate_weekly_charts: {e}")
+        return {}, {}, pd.DataFrame()
+
+# Funktion zur Bestimmung der angezeigten Plätze eines Charts mit size Plätzen
+# (config.CHART_DEPTH: 0 = size, -1 = alle Songs des Zeitraums; Rückgabe None steht für alle)
+def get_chart_limit(size):
+    if config.CHART_DEPTH == 0:
+        return size
+    if config.CHART_DEPTH < 0:
+        return None
+    return config.CHART_DEPTH
+
+# Funktion zur Auswahl der ersten n Positionen nach mehreren Sortierschlüsseln (jeweils aufsteigend,
+# der wichtigste zuerst) als Teilsortierung: argpartition bestimmt die Grenze des wichtigsten
+# Schlüssels, vollständig sortiert werden nur die Kandidaten bis zu dieser Grenze (samt Gleichständen).
+def select_top(keys, n):
+    count = len(keys[0])
+    if n < count:
+        primary = keys[0]
+        threshold = primary[np.argpartition(primary, n - 1)[n - 1]]
+        candidates = np.flatnonzero(primary <= threshold)
+    else:
+        candidates = np.arange(count)
+    order = np.lexsort([key[candidates] for key in reversed(keys)])
+    return candidates[order[:n]]
+
+# Funktion zur absteigenden Sortierung wie DataFrame.sort_values(ascending=False)
+# (Quicksort, nicht stabil), damit Gleichstände wie in calculate_weekly_charts aufgelöst werden
+def argsort_descending(values):
+    indexer = np.arange(len(values))[::-1][values[::-1].argsort(kind='quicksort')]
+    return indexer[::-1]
+
+# Spalten der Wochenaggregate (eine Zeile pro Woche, Dimension und Song, Künstler bzw. Album)
+# item_id: track_id, artist_id bzw. album_id << 32 | artist_id
+AGGREGATE_COLUMNS = ['dimension', 'year', 'month', 'iso_year', 'iso_week', 'item_id', 'play_count', 'rank',
+                     'last_uts', 'track_id', 'artist_id', 'album_id']
+
+# Funktion zur Gruppierung von Zeilen nach mehreren nichtnegativen Ganzzahlspalten
+# Die Spalten werden zu einem Ganzzahlschlüssel kombiniert (solange er in int64 passt, sonst wird
+# zwischendurch nummeriert) und mit pd.factorize nummeriert, das ist deutlich schneller als groupby.
+# Rückgabe: Gruppennummer pro Zeile (in Reihenfolge des ersten Vorkommens) und die erste Zeile
+# jeder Gruppe (damit aufsteigend).
+def group_rows(columns):
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    if len(key) == 0:
+        return key, key
+    key_range = 1
+    for values in columns:
+        value_range = int(values.max()) + 1
+        if key_range * value_range >= 2 ** 62:
+            key, uniques = pd.factorize(key)
+            key_range = len(uniques)
+        key = key * value_range + values
+        key_range *= value_range
+    codes = pd.factorize(key)[0]
+    first = np.flatnonzero(np.r_[True, codes[1:] > np.maximum.accumulate(codes)[:-1]])
+    return codes, first
+
+# Funktion zur Berechnung der Wochenaggregate aus Scrobbles (neueste zuerst, mit Datumsspalten und IDs)
+# Eine Woche ist hier ein Teil einer ISO-Woche innerhalb eines Kalendermonats: Eine ISO-Woche, die
+# zwei Monate berührt, zählt in jedem Monat nur mit ihren Scrobbles aus diesem Monat.
+# Die Scrobbles werden nur einmal gruppiert (Woche, Song, Album); aus diesen deutlich kleineren
+# Gruppen entstehen Songs, Künstler und Alben gemeinsam (siehe aggregate_week_groups).
+# empty_album_id: ID des leeren Albums (Scrobbles ohne Album zählen nicht für die Albumcharts)
+@traced
+def aggregate_weeks(df, empty_album_id=None):
+    week_keys = get_week_keys(df['year'].to_numpy(dtype=np.int64), df['month'].to_numpy(dtype=np.int64),
+                              df['iso_year'].to_numpy(dtype=np.int64), df['iso_week'].to_numpy(dtype=np.int64))
+    week_codes = pd.factorize(week_keys)[0].astype(np.int64)
+    track_ids = df['track_id'].to_numpy(dtype=np.int64)
+    album_ids = df['album_id'].to_numpy(dtype=np.int64)
+
+    codes, group_first = group_rows([week_codes, track_ids, album_ids])
+    return aggregate_week_groups(week_keys[group_first], track_ids[group_first],
+                                 df['artist_id'].to_numpy(dtype=np.int64)[group_first], album_ids[group_first],
+                                 np.bincount(codes, minlength=len(group_first)),
+                                 df['uts'].to_numpy(dtype=np.int64)[group_first], empty_album_id)
+
+# Funktion zur Bildung des Wochenschlüssels (Jahr, Monat, ISO-Jahr, ISO-Woche als eine Ganzzahl)
+def get_week_keys(years, months, iso_years, iso_weeks):
+    return ((years * 100 + months) * 10000 + iso_years) * 100 + iso_weeks
+
+# Funktion zur Berechnung der Wochenaggregate aus Gruppen (Woche, Song, Album), neueste Gruppe zuerst
+# (absteigend nach dem Zeitpunkt ihres neuesten Scrobbles, also in Reihenfolge des ersten Vorkommens)
+# Pro Woche und Song, Künstler bzw. Album: Wiedergaben, Platz in der Woche (Gleichstände wie in
+# calculate_weekly_charts), Zeitpunkt sowie Song, Künstler und Album des neuesten Scrobbles.
+# Die Gruppen stammen aus aggregate_weeks oder direkt aus SQL (siehe sqlstore.query_weekly_aggregates).
+def aggregate_week_groups(week_keys, track_ids, artist_ids, album_ids, play_counts, last_uts, empty_album_id=None):
+    week_codes, week_values = pd.factorize(week_keys)
+    week_codes = week_codes.astype(np.int64)
+
+    # Gruppen je Dimension untereinander: Songs (track_id), Künstler (artist_id), Alben (album_id, artist_id)
+    all_groups = np.arange(len(week_keys))
+    album_groups = np.flatnonzero(album_ids != (-1 if empty_album_id is None else empty_album_id))
+    groups = np.concatenate([all_groups, all_groups, album_groups])
+    dimensions = np.repeat(np.arange(len(DIMENSIONS), dtype=np.int64),
+                           [len(all_groups), len(all_groups), len(album_groups)])
+    main_ids = np.concatenate([track_ids, artist_ids, album_ids[album_groups]])
+    extra_ids = np.where(dimensions == 2, artist_ids[groups], 0)
+
+    item_codes, first = group_rows([dimensions, week_codes[groups], main_ids, extra_ids])
+    item_counts = np.bincount(item_codes, weights=play_counts[groups], minlength=len(first)).astype(np.int64)
+    first_groups = groups[first]
+    dimensions = dimensions[first]
+    item_ids = np.where(dimensions == 2, main_ids[first] << 32 | extra_ids[first], main_ids[first])
+
+    # Nach Dimension und Woche ordnen; innerhalb der Woche bleibt die Reihenfolge des ersten Vorkommens
+    keys = week_values[week_codes[first_groups]] if len(first_groups) else first_groups
+    order = np.lexsort((keys, dimensions))
+    keys, dimensions, item_ids, item_counts, first_groups = (
+        keys[order], dimensions[order], item_ids[order], item_counts[order], first_groups[order])
+
+    # Rang innerhalb jeder Woche
+    changes = (keys[1:] != keys[:-1]) | (dimensions[1:] != dimensions[:-1])
+    starts = np.flatnonzero(np.r_[True, changes]) if len(keys) else keys
+    ends = np.r_[starts[1:], len(keys)]
+    ranks = np.empty(len(keys), dtype=np.int64)
+    for start, end in zip(starts, ends):
+        ranks[start + argsort_descending(item_counts[start:end])] = np.arange(1, end - start + 1)
+
+    return pd.DataFrame({
+        'dimension': dimensions.astype(np.int8),
+        'year': keys // 100000000,
+        'month': keys // 1000000 % 100,
+        'iso_year': keys // 100 % 10000,
+        'iso_week': keys % 100,
+        'item_id': item_ids,
+        'play_count': item_counts,
+        'rank': ranks,
+        'last_uts': last_uts[first_groups],
+        'track_id': track_ids[first_groups],
+        'artist_id': artist_ids[first_groups].astype(np.int32),
+        'album_id': album_ids[first_groups].astype(np.int32),
+    }, columns=AGGREGATE_COLUMNS)
+
+# Funktion zur Berechnung der Monats- und Jahrescharts eines Jahres aus den Wochenaggregaten
+# Die Monatscharts summieren die Punkte der Wochencharts (Top 20, nur Wochen des eigenen ISO-Jahres),
+# die Jahrescharts die Punkte der Monatscharts (Top 30). Bei Gleichstand entscheidet der beste Platz
+# im neuesten Zeitraum; Album, Titel und Künstler stammen vom neuesten Scrobble. Die Ergebnisse
+# sind identisch mit den bisherigen verschachtelten Berechnungen aus den Scrobbles.
+# weekly: Wochenaggregate (siehe aggregate_weeks) mit den Textspalten song_title, artist und album
+# Rückgabe: {'weeks': DataFrame, 'months': DataFrame (Top 30 pro Monat) und 'month' (angezeigte
+# Monatscharts, nur mit month) bzw. 'year' (angezeigte Jahrescharts, nur ohne month)} oder None
+def compute_chart_levels(weekly, year, month=None, dimension='track'):
+    mask = (weekly['year'] == year) & (weekly['dimension'] == DIMENSIONS.index(dimension))
+    if month is not None:
+        mask &= weekly['month'] == month
+    data, rows = select_aggregates(weekly, mask)
+    if data.empty:
+        return None
+
+    # Wochencharts: Top 20 pro Woche mit Punkten (Platz 1 = 20 Punkte usw.)
+    weeks = data[(data['iso_year'] == year) & (data['rank'] <= config.WEEKLY_CHART_SIZE)].copy()
+    weeks['points'] = config.WEEKLY_CHART_SIZE + 1 - weeks['rank']
+
+    # Monatscharts: Summe der Wochenpunkte und -wiedergaben, Top 30 pro Monat
+    weeks['insert_key'] = (53 - weeks['iso_week']) * (config.WEEKLY_CHART_SIZE + 1) + weeks['rank']
+    month_pool = weeks.groupby(['month', 'item_id'], sort=False).agg(
+        points=('points', 'sum'), play_count=('play_count', 'sum'), insert_key=('insert_key', 'min')).reset_index()
+    month_pool = month_pool.sort_values(['month', 'points', 'play_count', 'insert_key'], ascending=[True, False, False, True])
+    month_pool['rank'] = month_pool.groupby('month').cumcount() + 1
+    months = month_pool[month_pool['rank'] <= config.MONTHLY_CHART_SIZE].copy()
+
+    # Neuester Scrobble des Eintrags im Monat (auch aus Wochen des Nachbarjahres)
+    newest = data.sort_values('last_uts', ascending=False)
+    first_in_month = newest.drop_duplicates(['month', 'item_id']).set_index(['month', 'item_id'])['row']
+    months = months.merge(first_in_month.rename('first_in_month'), left_on=['month', 'item_id'],
+                          right_index=True, how='left')
+    first_in_period = newest.drop_duplicates('item_id').set_index('item_id')['row']
+    levels = {'weeks': weeks, 'months': months}
+
+    if month is not None:
+        # Angezeigte Monatscharts (data enthält hier nur den Monat)
+        levels['month'] = rank_chart(month_pool, data, first_in_period, config.MONTHLY_CHART_SIZE)
+    else:
+        # Jahrescharts: Summe der Monatspunkte und -wiedergaben, Top 50
+        months['insert_key'] = (12 - months['month']) * (config.MONTHLY_CHART_SIZE + 1) + months['rank']
+        year_pool = months.groupby('item_id', sort=False).agg(
+            points=('points', 'sum'), play_count=('play_count', 'sum'), insert_key=('insert_key', 'min')).reset_index()
+        levels['year'] = rank_chart(year_pool, data, first_in_period, config.YEARLY_CHART_SIZE)
+
+    # Texte erst jetzt (nur für die Chartplätze) nachschlagen
+    for name, position_column in (('weeks', 'row'), ('months', 'first_in_month'), ('month', 'first_in_period'),
+                                  ('year', 'first_in_period')):
+        if name not in levels:
+            continue
+        set_chart_texts(levels[name], weekly, rows[levels[name][position_column].to_numpy()], dimension)
+
+    return levels
+
+# Funktion zur Auswahl und Reihenfolge der angezeigten Plätze eines Charts mit size Plätzen
+# pool: Einträge mit Punkten (item_id, points, play_count, insert_key); first_in_period: Zeile des
+# neuesten Scrobbles pro Eintrag in data. Reicht die Tiefe (siehe get_chart_limit) über die Chartgröße
+# hinaus, folgen nach den Einträgen mit Punkten alle übrigen des Zeitraums mit 0 Punkten, geordnet
+# nach ihren Wiedergaben im Zeitraum und danach nach dem neuesten Scrobble.
+def rank_chart(pool, data, first_in_period, size):
+    limit = get_chart_limit(size)
+    pool = pool[['item_id', 'points', 'play_count', 'insert_key']]
+    if limit is None or limit > size:
+        totals = data.groupby('item_id', sort=False)['play_count'].sum()
+        totals = totals[~totals.index.isin(pool['item_id'])]
+        rest = pd.DataFrame({'item_id': totals.index.to_numpy(dtype=np.int64), 'points': 0,
+                             'play_count': totals.to_numpy(dtype=np.int64)})
+        rest['insert_key'] = -data['last_uts'].to_numpy()[first_in_period.loc[rest['item_id']].to_numpy()]
+        if not rest.empty:
+            pool = pd.concat([pool, rest], ignore_index=True) if not pool.empty else rest
+
+    keys = [-pool['points'].to_numpy(dtype=np.int64), -pool['play_count'].to_numpy(dtype=np.int64),
+            pool['insert_key'].to_numpy(dtype=np.int64)]
+    order = select_top(keys, len(pool) if limit is None else limit)
+    chart = pool.iloc[order].reset_index(drop=True)
+    chart['rank'] = np.arange(1, len(chart) + 1)
+    chart['first_in_period'] = first_in_period.loc[chart['item_id']].to_numpy()
+    return chart
+
+# Funktion zum Nachschlagen der Texte einer (ggf. kategorischen) Spalte an bestimmten Positionen
+def take_strings(column, positions):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.categories.to_numpy()[column.cat.codes.to_numpy()[positions]]
+    return column.to_numpy()[positions]
+
+# Funktion zur Auswahl der Wochenaggregate einer Dimension und eines Zeitraums (nur die Zahlenspalten;
+# die Textspalten werden erst für die Chartplätze nachgeschlagen)
+# Rückgabe: DataFrame mit Spalte 'row' (Zeilennummer) und die Zeilen in weekly
+def select_aggregates(weekly, mask):
+    rows = np.flatnonzero(mask.to_numpy())
+    data = pd.DataFrame({column: weekly[column].to_numpy()[rows] for column in AGGREGATE_COLUMNS})
+    data['row'] = np.arange(len(data))
+    return data, rows
+
+# Funktion zum Ergänzen der Textspalten einer Chartebene (Texte des neuesten Scrobbles, Zeilen positions in weekly)
+# Künstlercharts erhalten einen leeren Titel und kein Album, Albumcharts den Albumtitel als Titel.
+def set_chart_texts(level, weekly, positions, dimension):
+    for column in ('song_title', 'artist', 'album'):
+        level[column] = take_strings(weekly[column], positions)
+    if dimension == 'artist':
+        level['song_title'] = ''
+        level['album'] = ''
+    elif dimension == 'album':
+        level['song_title'] = level['album']
+
+# Funktion zur Umwandlung einer Ebene aus compute_chart_levels in das bisherige Ergebnisformat
+def build_chart_result(level):
+    chart_data = pd.DataFrame({
+        'points': level['points'].to_numpy(dtype=np.int64),
+        'play_count': level['play_count'].to_numpy(dtype=np.int64),
+        'album': level['album'].to_numpy(),
+    }, index=pd.MultiIndex.from_arrays([level['song_title'].to_numpy(), level['artist'].to_numpy()],
+                                       names=['song_title', 'artist']))
+
+    # Konvertiere Punkte und Wiedergabeanzahl zu Dictionaries
+    points = chart_data['points'].to_dict()
+    plays = chart_data['play_count'].to_dict()
+
+    return points, plays, chart_data
+
+# Funktion zur Berechnung der Monatscharts aus den Wochenaggregaten
+@traced
+def calculate_monthly_charts(weekly, year, month, dimension='track'):
+    try:
+        levels = compute_chart_levels(weekly, year, month, dimension)
+        if levels is None or levels['month'].empty:
+            log.debug("Keine Songs für Monat %s im Jahr %s gefunden.", month, year)
+            return {}, {}, pd.DataFrame()
+
+        return build_chart_result(levels['month'])
+
+    except Exception as e:
+        print(f"Fehler in calculate_monthly_charts: {e}")
+        return {}, {}, pd.DataFrame()
+
+# Funktion zur Berechnung der Jahrescharts aus den Wochenaggregaten
+@traced
+def calculate_yearly_charts(weekly, year, dimension='track'):
+    try:
+        levels = compute_chart_levels(weekly, year, dimension=dimension)
+        if levels is None or levels['year'].empty:
+            log.debug("Keine Songs für Jahr %s gefunden.", year)
+            return {}, {}, pd.DataFrame()
+
+        return build_chart_result(levels['year'])
+
+    except Exception as e:
+        print(f"Fehler in calculate_yearly_charts: {e}")
+        return {}, {}, pd.DataFrame()
+
+# Funktion zur Berechnung der Charts eines frei gewählten Zeitraums aus seinen Wochenaggregaten
+# Wie bei den Monatscharts werden die Punkte der Wochencharts (Top 20) summiert; jede ISO-Woche zählt
+# mit ihren Scrobbles innerhalb des Zeitraums (auch über Jahresgrenzen). Bei Gleichstand entscheiden
+# die Wiedergaben und danach der beste Platz in der neuesten Woche.
+# weekly: aggregate_weeks der Scrobbles des Zeitraums ohne Aufteilung nach Monaten (year und month
+# gleich 0) mit den Textspalten song_title, artist und album
+@traced
+def calculate_range_charts(weekly, dimension='track'):
+    try:
+        if not weekly.empty:
+            data, rows = select_aggregates(weekly, weekly['dimension'] == DIMENSIONS.index(dimension))
+        if weekly.empty or data.empty:
+            log.debug("Keine Songs im gewählten Zeitraum gefunden.")
+            return {}, {}, pd.DataFrame()
+
+        # Wochencharts: Top 20 pro Woche mit Punkten; Wochen werden von der neuesten an gezählt
+        weeks = data[data['rank'] <= config.WEEKLY_CHART_SIZE].copy()
+        weeks['points'] = config.WEEKLY_CHART_SIZE + 1 - weeks['rank']
+        week_age = (weeks['iso_year'] * 100 + weeks['iso_week']).rank(method='dense', ascending=False).astype(np.int64)
+        weeks['insert_key'] = week_age * (config.WEEKLY_CHART_SIZE + 1) + weeks['rank']
+        pool = weeks.groupby('item_id', sort=False).agg(
+            points=('points', 'sum'), play_count=('play_count', 'sum'), insert_key=('insert_key', 'min')).reset_index()
+
+        newest = data.sort_values('last_uts', ascending=False)
+        first_in_period = newest.drop_duplicates('item_id').set_index('item_id')['row']
+        chart = rank_chart(pool, data, first_in_period, config.RANGE_CHART_SIZE)
+        set_chart_texts(chart, weekly, rows[chart['first_in_period'].to_numpy()], dimension)
+
+        return build_chart_result(chart)
+
+    except Exception as e:
+        print(f"Fehler in calculate_range_charts: {e}")
+        return {}, {}, pd.DataFrame()
+
+# Funktion zur Berechnung der Wochencharts aus den Wochenaggregaten einer ISO-Woche (ohne Aufteilung
+# nach Monaten): Plätze und Gleichstände stehen bereits in 'rank'
+@traced
+def calculate_weekly_charts_from_aggregates(weekly, year, week, dimension='track'):
+    try:
+        mask = ((weekly['dimension'] == DIMENSIONS.index(dimension)) & (weekly['iso_year'] == year)
+                & (weekly['iso_week'] == week))
+        data, rows = select_aggregates(weekly, mask)
+        if data.empty:
+            log.debug("Keine Songs für Woche %s im Jahr %s gefunden.", week, year)
+            return {}, {}, pd.DataFrame()
+
+        # Teilsortierung: nur die angezeigten Plätze werden geordnet
+        limit = get_chart_limit(config.WEEKLY_CHART_SIZE)
+        order = select_top([data['rank'].to_numpy()], len(data) if limit is None else limit)
+        chart = data.iloc[order].reset_index(drop=True)
+        chart['points'] = np.maximum(0, config.WEEKLY_CHART_SIZE + 1 - chart['rank'].to_numpy())
+        set_chart_texts(chart, weekly, rows[chart['row'].to_numpy()], dimension)
+
+        return build_chart_result(chart)
+
+    except Exception as e:
+        print(f"Fehler in calculate_weekly_charts_from_aggregates: {e}")
+        return {}, {}, pd.DataFrame()
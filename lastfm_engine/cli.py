@@ -0,0 +1,336 @@
+# Kommandozeile: Charts eines Zeitraums als Text, JSON oder CSV ausgeben
+#
+#   python -m lastfm_engine year 2024
+#   python -m lastfm_engine month 2024 9 --format json
+#   python -m lastfm_engine week 2024 38 --user athefu --format csv --offline
+#   python -m lastfm_engine range --from 2023-06-01 --to 2023-08-31
+#   python -m lastfm_engine year 2024 --dimension artist
+#   python -m lastfm_engine chartrun --title "Song" --artist "Künstler" [--rebuild]
+#   python -m lastfm_engine sync
+#   python -m lastfm_engine backfill --user athefu
+#   python -m lastfm_engine import lastfm_data.csv --complete
+import sys
+import time
+import threading
+import csv
+import json
+import argparse
+import datetime
+import contextlib
+
+from . import config
+from . import periods
+from . import trace
+
+PERIOD_NAMES = {'week': 'Wochencharts', 'month': 'Monatscharts', 'year': 'Jahrescharts', 'range': 'Zeitraumcharts'}
+DIMENSION_NAMES = {'track': 'Songs', 'artist': 'Künstler', 'album': 'Alben'}
+
+
+# Funktion zum Einlesen der Kommandozeilenargumente
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m lastfm_engine',
+                                     description="Last.fm-Charts für eine Woche, einen Monat, ein Jahr oder einen "
+                                                 "frei gewählten Zeitraum (range --from ... --to ...) ausgeben, "
+                                                 "den Chartverlauf eines Songs anzeigen (chartrun), "
+                                                 "alle Benutzer aus keys.json synchronisieren (sync), die "
+                                                 "gesamte Historie eines Benutzers laden (backfill) oder einen "
+                                                 "Last.fm-CSV-Export importieren (import).")
+    parser.add_argument('period', choices=['week', 'month', 'year', 'range', 'chartrun', 'sync', 'backfill', 'import'],
+                        help="Art der Charts bzw. chartrun, sync, backfill oder import")
+    parser.add_argument('year', nargs='?', help="Jahr (bei Wochencharts das ISO-Jahr) bzw. CSV-Datei (import)")
+    parser.add_argument('number', type=int, nargs='?', help="Monat (1-12) bzw. ISO-Woche (1-53)")
+    parser.add_argument('--from', dest='from_date', type=datetime.date.fromisoformat, metavar='JJJJ-MM-TT',
+                        help="Erster Tag des Zeitraums (range)")
+    parser.add_argument('--to', dest='to_date', type=datetime.date.fromisoformat, metavar='JJJJ-MM-TT',
+                        help="Letzter Tag des Zeitraums (range)")
+    parser.add_argument('--title', help="Titel des Songs (chartrun)")
+    parser.add_argument('--artist', help="Künstler des Songs (chartrun)")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Chartverläufe vorher aus allen vollständig gespeicherten Zeiträumen neu aufbauen (chartrun)")
+    parser.add_argument('--dimension', choices=list(DIMENSION_NAMES), default='track',
+                        help="Charts für Songs (track), Künstler (artist) oder Alben (album)")
+    parser.add_argument('--complete', action='store_true',
+                        help="Der CSV-Export enthält die gesamte Historie des Benutzers (import)")
+    parser.add_argument('--user', help="Last.fm-Benutzer aus keys.json (Standard: der erste Eintrag)")
+    parser.add_argument('--format', choices=['text', 'json', 'csv'], default='text', help="Ausgabeformat")
+    parser.add_argument('--depth', type=config.parse_chart_depth, metavar='ANZAHL',
+                        help="Angezeigte Plätze (Zahl oder all; Standard: 20/30/50 bzw. chart_depth aus settings.json)")
+    parser.add_argument('--offline', action='store_true', help="Nur den lokalen Speicher verwenden, nichts abrufen")
+    parser.add_argument('--debug', action='store_true', help="Debug-Ausgaben und Übersicht der Zeitmessung (auf stderr)")
+    parser.add_argument('--trace', metavar='DATEI', help="Zeitmessung als Chrome-Trace (JSON) speichern")
+    parser.add_argument('--profile', metavar='DATEI', help="cProfile-Statistiken des Aufrufs speichern")
+    args = parser.parse_args(argv)
+
+    if args.period in ('sync', 'backfill'):
+        return args
+    if args.period == 'import':
+        if args.year is None:
+            parser.error("Für den Import wird eine CSV-Datei benötigt.")
+        args.file = args.year
+        return args
+    if args.period == 'chartrun':
+        if not args.title or not args.artist:
+            parser.error("Für den Chartverlauf werden --title und --artist benötigt.")
+        return args
+    if args.period == 'range':
+        if args.from_date is None or args.to_date is None:
+            parser.error("Für Zeitraumcharts werden --from und --to benötigt.")
+        if args.to_date < args.from_date:
+            parser.error("--to darf nicht vor --from liegen.")
+        return args
+    if args.year is None:
+        parser.error("Bitte ein Jahr angeben.")
+    if not args.year.isdigit():
+        parser.error(f"Ungültiges Jahr: {args.year}")
+    args.year = int(args.year)
+    if args.period == 'month' and not (args.number and 1 <= args.number <= 12):
+        parser.error("Für Monatscharts wird ein Monat zwischen 1 und 12 benötigt.")
+    if args.period == 'week' and not (args.number and 1 <= args.number <= 53):
+        parser.error("Für Wochencharts wird eine Woche zwischen 1 und 53 benötigt.")
+    if args.period == 'week' and args.number > periods.get_weeks_in_year(args.year):
+        parser.error(f"Das ISO-Jahr {args.year} hat nur {periods.get_weeks_in_year(args.year)} Wochen.")
+    return args
+
+# Funktion zur Berechnung der Charts eines Zeitraums (lädt fehlende Daten, außer offline)
+def compute_charts(period_type, year, number, offline, dimension='track'):
+    from . import store
+    from .results import get_chart_results
+
+    month = number if period_type == 'month' else None
+    week = number if period_type == 'week' else None
+    store.load_cache()
+    results = get_chart_results(period_type, year, month, week, offline=offline, dimension=dimension)
+    if results.empty:
+        return None
+    return results
+
+# Funktion zur Berechnung der Charts eines frei gewählten Zeitraums (lädt fehlende Daten, außer offline)
+def compute_range_charts(from_date, to_date, offline, dimension='track'):
+    from . import store
+    from .results import get_range_chart_results
+
+    store.load_cache()
+    results = get_range_chart_results(from_date, to_date, offline=offline, dimension=dimension)
+    if results.empty:
+        return None
+    return results
+
+# Funktion zur Umwandlung der Charts in Zeilen (Platz, Titel, Künstler, Album, Wiedergaben, Punkte)
+# Künstler- und Albumcharts haben keinen Titel.
+def get_chart_rows(results, dimension='track'):
+    rows = []
+    for rank, ((song_title, artist), row) in enumerate(results.iterrows(), start=1):
+        album = row['album'] if 'album' in row else ''
+        rows.append({
+            'rank': rank,
+            'title': str(song_title) if dimension == 'track' else '',
+            'artist': str(artist),
+            'album': album if isinstance(album, str) else '',
+            'plays': int(row['play_count']),
+            'points': int(row['points']),
+        })
+    return rows
+
+# Funktion zur Ausgabe der Charts im gewählten Format
+def write_charts(rows, title, output_format, out):
+    if output_format == 'json':
+        json.dump(rows, out, ensure_ascii=False, indent=2)
+        out.write('\n')
+    elif output_format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=['rank', 'title', 'artist', 'album', 'plays', 'points'])
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        out.write(f"{title}\n")
+        for row in rows:
+            if row['title']:
+                name = f"{row['title']} - {row['artist']} ({row['album']})"
+            elif row['album']:
+                name = f"{row['album']} - {row['artist']}"
+            else:
+                name = row['artist']
+            out.write(f"{row['rank']:>2}. {row['plays']:>3}× {row['points']:>3} Pkt: {name}\n")
+
+# Funktion zur Ausgabe des Chartverlaufs eines Songs (aus dem Index, optional vorher neu aufgebaut)
+def run_chart_run(song_title, artist, rebuild, output_format):
+    from . import store
+    from .chartruns import get_chart_run, format_chart_run, rebuild_chart_runs, format_period_key
+
+    with contextlib.redirect_stdout(sys.stderr):
+        store.load_cache()
+        if rebuild:
+            rebuild_chart_runs(config.current_user)
+        run = get_chart_run(artist, song_title)
+
+    rows = [{'period': period_type, 'key': key, 'label': format_period_key(key), 'rank': rank,
+             'points': points, 'plays': plays}
+            for period_type, period_run in run.items() for key, rank, points, plays in period_run['entries']]
+    if output_format == 'json':
+        json.dump({'title': song_title, 'artist': artist, 'runs': run}, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
+    elif output_format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=['period', 'key', 'label', 'rank', 'points', 'plays'])
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        print(f"Chartverlauf - {song_title} - {artist} - {config.current_user}")
+        print(format_chart_run(run))
+    return 0 if run else 1
+
+# Funktion zur Synchronisierung aller Benutzer mit Ausgabe des Ergebnisses pro Benutzer
+def run_sync(output_format):
+    from . import store
+
+    with contextlib.redirect_stdout(sys.stderr):
+        store.load_cache()
+        results = store.sync_all_users()
+
+    if output_format == 'json':
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    elif output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(['user', 'synced'])
+        writer.writerows(results.items())
+    else:
+        for user, success in results.items():
+            print(f"{user}: {'aktuell' if success else 'Fehler'}")
+    return 0 if all(results.values()) else 1
+
+# Funktion zum Laden der gesamten Historie des gewählten Benutzers mit Fortschrittsanzeige (stderr)
+# Der Abruf läuft in einem eigenen Thread; Strg+C bricht nach der aktuellen Seite ab, der bis dahin
+# gespeicherte Stand bleibt erhalten und wird beim nächsten Aufruf fortgesetzt.
+def run_backfill():
+    from . import store
+    from .api import LoadJob
+
+    job = LoadJob()
+    result = {}
+
+    def work():
+        with contextlib.redirect_stdout(sys.stderr):
+            store.load_cache()
+            result['success'] = store.backfill_user(config.current_user, job)
+            if result['success']:
+                # Mit der vollständigen Historie die Chartverläufe aller Zeiträume aufbauen
+                from .chartruns import rebuild_chart_runs
+                rebuild_chart_runs(config.current_user, job)
+
+    thread = threading.Thread(target=work, daemon=True)
+    started = time.monotonic()
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(config.BACKFILL_REPORT_INTERVAL)
+            if thread.is_alive():
+                print(job.describe(), file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Abbruch angefordert, der gespeicherte Stand bleibt erhalten...", file=sys.stderr)
+        job.cancel()
+        thread.join()
+
+    entry = store.get_user_store(config.current_user)
+    scrobbles = store.get_scrobble_count(entry)
+    elapsed = time.monotonic() - started
+    if result.get('success'):
+        print(f"{config.current_user}: vollständig geladen, {scrobbles} Scrobbles gespeichert ({elapsed:.0f} s).")
+        return 0
+    print(f"{config.current_user}: unvollständig, {scrobbles} Scrobbles gespeichert. "
+          f"Erneuter Aufruf setzt den Abruf fort.", file=sys.stderr)
+    return 1
+
+# Funktion zum Importieren eines Last.fm-CSV-Exports in den Speicher des gewählten Benutzers
+def run_import(path, complete_history, output_format):
+    from . import store
+
+    with contextlib.redirect_stdout(sys.stderr):
+        store.load_cache()
+        try:
+            result = store.import_lastfm_csv(path, complete_history=complete_history)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Fehler beim Importieren von {path}: {e}")
+            return 1
+
+    if output_format == 'json':
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    elif output_format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(result))
+        writer.writeheader()
+        writer.writerow(result)
+    else:
+        print(f"{config.current_user}: {result['imported']} Scrobbles importiert, "
+              f"{result['duplicates']} bereits vorhanden, {result['invalid']} ungültig, "
+              f"{result['skipped']} ohne freie Sekunde in ihrer Minute übersprungen.")
+    return 0
+
+# Funktion zur Ausgabe der Messwerte der API-Aufrufe (nur mit --debug, auf stderr)
+def print_metrics():
+    from .client import get_metrics, format_metrics
+    if config.DEBUG_MODE and get_metrics():
+        print(format_metrics(), file=sys.stderr)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if not config.load_users():
+        print(f"Keine Benutzer in {config.KEYS_FILE} gefunden.", file=sys.stderr)
+        return 1
+    if not config.select_user(args.user):
+        print(f"Benutzer {args.user} steht nicht in {config.KEYS_FILE}.", file=sys.stderr)
+        return 1
+    config.load_settings()
+    config.DEBUG_MODE = config.DEBUG_MODE or args.debug
+    config.TRACE_FILE = args.trace or config.TRACE_FILE
+    config.PROFILE_FILE = args.profile or config.PROFILE_FILE
+    if args.depth is not None:
+        config.CHART_DEPTH = args.depth
+    trace.configure()
+
+    try:
+        return run_command(args)
+    finally:
+        print_metrics()
+        with contextlib.redirect_stdout(sys.stderr):
+            trace.finish()
+
+# Funktion zur Ausführung des gewählten Befehls (Charts, sync, backfill oder import)
+def run_command(args):
+    if args.period == 'import':
+        return run_import(args.file, args.complete, args.format)
+    if args.period == 'sync':
+        return run_sync(args.format)
+    if args.period == 'backfill':
+        return run_backfill()
+    if args.period == 'chartrun':
+        return run_chart_run(args.title, args.artist, args.rebuild, args.format)
+
+    # Meldungen der Engine nach stderr umleiten, damit stdout nur die Charts enthält
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.period == 'range':
+            results = compute_range_charts(args.from_date, args.to_date, args.offline, args.dimension)
+        else:
+            results = compute_charts(args.period, args.year, args.number, args.offline, args.dimension)
+
+    name = PERIOD_NAMES[args.period]
+    if args.dimension != 'track':
+        name = f"{name} ({DIMENSION_NAMES[args.dimension]})"
+    if args.period == 'range':
+        title = f"{name} - {args.from_date} bis {args.to_date} - {config.current_user}"
+    elif args.period == 'year':
+        title = f"{name} - {args.year} - {config.current_user}"
+    elif args.period == 'month':
+        title = f"{name} - Monat {args.number}, {args.year} - {config.current_user}"
+    else:
+        title = f"{name} - Woche {args.number}, {args.year} - {config.current_user}"
+
+    if results is None or results.empty:
+        print(f"Keine Daten für {title}.", file=sys.stderr)
+        rows = []
+        if args.format == 'text':
+            return 1
+    else:
+        rows = get_chart_rows(results, args.dimension)
+
+    write_charts(rows, title, args.format, sys.stdout)
+    return 0
@@ -0,0 +1,243 @@
+# HTTP-Client für die Last.fm API: gemeinsame Session mit Keep-Alive, Timeouts, Ratenbegrenzung
+# und Circuit Breaker pro API-Schlüssel, Wiederholungen mit exponentiellem Backoff und Messwerte pro
+# API-Methode. Alle Aufrufe der API laufen über call_api.
+# requests wird erst beim ersten Aufruf importiert.
+import json
+import time
+import random
+import threading
+
+from . import config
+from .trace import span, log
+
+try:
+    import orjson  # Optional: schnellerer JSON-Decoder für große Seiten
+except ImportError:
+    orjson = None
+
+# Last.fm-Fehlercodes, bei denen sich ein erneuter Versuch lohnt
+# 8: Operation failed, 11: Service offline, 16: Temporary error, 29: Rate limit exceeded
+RETRYABLE_ERROR_CODES = {8, 11, 16, 29}
+RATE_LIMIT_ERROR_CODE = 29
+
+
+# Fehlermeldung der Last.fm API (code ist der Fehlercode der API, None bei anderen Fehlern)
+class LastFmError(RuntimeError):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+# Token-Bucket zur Begrenzung der Anfragen pro Sekunde (threadsicher)
+class RateLimiter:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+        self.waiting = 0  # Wartende Anfragen mit normaler Priorität
+
+    # Blockiert, bis ein Token verfügbar ist
+    # Anfragen mit niedriger Priorität erhalten nur dann ein Token, wenn keine normale Anfrage wartet.
+    def acquire(self, low_priority=False):
+        if not low_priority:
+            with self.lock:
+                self.waiting += 1
+        try:
+            while True:
+                with self.lock:
+                    now = time.monotonic()
+                    self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                    self.last_refill = now
+                    if low_priority and self.waiting:
+                        wait_time = 1 / self.rate
+                    elif self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    else:
+                        wait_time = (1 - self.tokens) / self.rate
+                time.sleep(wait_time)
+        finally:
+            if not low_priority:
+                with self.lock:
+                    self.waiting -= 1
+
+# Ein Rate-Limiter und ein Circuit Breaker pro API-Schlüssel (Fehler eines Kontos halten die anderen nicht auf)
+rate_limiters = {}
+circuit_breakers = {}
+rate_limiters_lock = threading.Lock()
+
+# Funktion zum Abrufen des Rate-Limiters für einen API-Schlüssel
+def get_rate_limiter(api_key):
+    with rate_limiters_lock:
+        if api_key not in rate_limiters:
+            rate_limiters[api_key] = RateLimiter(config.REQUESTS_PER_SECOND)
+        return rate_limiters[api_key]
+
+# Circuit Breaker: Nach CIRCUIT_FAILURE_THRESHOLD vorübergehenden Fehlern in Folge werden Aufrufe
+# für CIRCUIT_RESET_TIMEOUT Sekunden sofort abgelehnt; danach wird ein einzelner Testaufruf zugelassen.
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    # Prüft, ob ein Aufruf erlaubt ist (im halb offenen Zustand nur einer pro Wartezeit)
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    log.debug("Last.fm: %s Fehler in Folge, Aufrufe werden für %s s ausgesetzt.",
+                              self.failures, self.reset_timeout)
+                self.opened_at = time.monotonic()
+
+# Funktion zum Abrufen des Circuit Breakers für einen API-Schlüssel
+def get_circuit_breaker(api_key):
+    with rate_limiters_lock:
+        if api_key not in circuit_breakers:
+            circuit_breakers[api_key] = CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_TIMEOUT)
+        return circuit_breakers[api_key]
+
+# Messwerte pro API-Methode: Aufrufe, Fehler, Wiederholungen, Bytes und Antwortzeiten
+metrics = {}
+metrics_lock = threading.Lock()
+
+# Funktion zum Erfassen eines einzelnen HTTP-Aufrufs
+def record_request(method, latency, size=0, retry=False, error=False):
+    with metrics_lock:
+        entry = metrics.setdefault(method, {'calls': 0, 'errors': 0, 'retries': 0, 'bytes': 0,
+                                            'latency_total': 0.0, 'latency_max': 0.0})
+        entry['calls'] += 1
+        entry['bytes'] += size
+        entry['latency_total'] += latency
+        entry['latency_max'] = max(entry['latency_max'], latency)
+        if retry:
+            entry['retries'] += 1
+        if error:
+            entry['errors'] += 1
+
+# Funktion zum Abrufen einer Kopie der Messwerte
+def get_metrics():
+    with metrics_lock:
+        return {method: dict(entry) for method, entry in metrics.items()}
+
+# Funktion zur Ausgabe der Messwerte als Tabelle (eine Zeile pro API-Methode)
+def format_metrics():
+    lines = [f"{'Methode':<24} {'Aufrufe':>8} {'Fehler':>7} {'Wdh.':>5} {'kB':>9} {'Ø ms':>7} {'max ms':>7}"]
+    for method, entry in sorted(get_metrics().items()):
+        average = entry['latency_total'] / entry['calls'] * 1000 if entry['calls'] else 0
+        lines.append(f"{method:<24} {entry['calls']:>8} {entry['errors']:>7} {entry['retries']:>5} "
+                     f"{entry['bytes'] / 1024:>9.1f} {average:>7.0f} {entry['latency_max'] * 1000:>7.0f}")
+    return '\n'.join(lines)
+
+# Gemeinsame Session (Keep-Alive, Verbindungspool), wird beim ersten Aufruf angelegt
+session = None
+session_lock = threading.Lock()
+
+# Funktion zum Abrufen der gemeinsamen Session
+def get_session():
+    global session
+    with session_lock:
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            pool_size = config.MAX_WORKERS * config.MAX_SYNC_USERS
+            session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+            session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        return session
+
+# Funktion zur Berechnung der Wartezeit vor dem nächsten Versuch (exponentiell, mit etwas Zufall)
+def get_retry_delay(attempt):
+    delay = min(config.RETRY_DELAY * 2 ** (attempt - 1), config.MAX_RETRY_DELAY)
+    return delay + random.uniform(0, delay / 10)
+
+# Funktion zum Aufruf einer Methode der Last.fm API
+# Vorübergehende Fehler (Netzwerk, HTTP 429/5xx, Fehlercodes 8/11/16/29) werden bis zu
+# MAX_RETRIES-mal wiederholt. Gibt die dekodierte Antwort zurück; löst LastFmError bei
+# Fehlern der API bzw. die letzte requests-Ausnahme bei Netzwerkfehlern aus.
+def call_api(method, params, api_key, low_priority=False):
+    import requests
+    params = dict(params, method=method, api_key=api_key, format='json')
+    limiter = get_rate_limiter(api_key)
+    circuit_breaker = get_circuit_breaker(api_key)
+
+    for attempt in range(1, config.MAX_RETRIES + 1):
+        if not circuit_breaker.allow():
+            raise LastFmError("Last.fm ist vorübergehend nicht erreichbar (zu viele Fehler in Folge).")
+
+        with span('rate_limit_wait'):
+            limiter.acquire(low_priority)
+        started = time.monotonic()
+        response = None
+        size = 0
+        try:
+            with span('http', method=method, attempt=attempt):
+                response = get_session().get(config.BASE_URL, params=params, timeout=config.REQUEST_TIMEOUT)
+            size = len(response.content)
+            try:
+                with span('json_parse', method=method, size=size):
+                    data = decode_json(response.content)
+            except ValueError:
+                data = None
+
+            if isinstance(data, dict) and 'error' in data:
+                code = int(data['error'])
+                raise LastFmError(f"API-Fehler {code}: {data.get('message', '')}", code)
+
+            response.raise_for_status()  # HTTP-Fehler auslösen, falls vorhanden
+            if data is None:
+                raise ValueError("Antwort ist kein gültiges JSON.")
+
+            circuit_breaker.record_success()
+            record_request(method, time.monotonic() - started, size, retry=attempt > 1)
+            return data
+
+        except LastFmError as e:
+            if e.code not in RETRYABLE_ERROR_CODES:
+                # Anfrage ist fehlerhaft (z. B. unbekannter Benutzer): Wiederholen hilft nicht
+                circuit_breaker.record_success()
+                record_request(method, time.monotonic() - started, size, retry=attempt > 1, error=True)
+                raise
+            last_error = e
+        except requests.exceptions.HTTPError as e:
+            status = response.status_code
+            if status != 429 and status < 500:
+                record_request(method, time.monotonic() - started, size, retry=attempt > 1, error=True)
+                raise
+            last_error = e
+        except (requests.exceptions.RequestException, ValueError) as e:
+            last_error = e
+
+        # Vorübergehender Fehler; eine Ratenbegrenzung zählt nicht als Ausfall von Last.fm
+        record_request(method, time.monotonic() - started, size, retry=attempt > 1, error=True)
+        if not (isinstance(last_error, LastFmError) and last_error.code == RATE_LIMIT_ERROR_CODE):
+            circuit_breaker.record_failure()
+        if attempt == config.MAX_RETRIES:
+            raise last_error
+        print(f"Fehler bei {method} (Versuch {attempt} von {config.MAX_RETRIES}): {last_error}")
+        time.sleep(get_retry_delay(attempt))
+
+# Funktion zum Dekodieren einer JSON-Antwort (mit orjson, falls installiert)
+def decode_json(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
@@ -0,0 +1,137 @@
+import os
+import json
+
+# ---------------------------- Konfiguration und Konstante ----------------------------
+# Alle Werte können zur Laufzeit geändert werden (z. B. durch settings.json oder die Kommandozeile),
+# deshalb greifen die übrigen Module immer über config.NAME darauf zu.
+DEBUG_MODE = False  # Debug-Ausgaben und Übersicht der Zeitmessung (settings.json: debug_mode)
+
+# Chartgrößen (Anzahl der Plätze; Platz 1 der Wochencharts erhält WEEKLY_CHART_SIZE Punkte)
+WEEKLY_CHART_SIZE = 20
+MONTHLY_CHART_SIZE = 30
+YEARLY_CHART_SIZE = 50
+RANGE_CHART_SIZE = 50  # Charts eines frei gewählten Zeitraums (Summe der Wochenpunkte wie bei den Monatscharts)
+# Angezeigte Plätze pro Chart (settings.json: chart_depth, Zahl oder "all"): 0 = Chartgröße,
+# -1 = alle Songs des Zeitraums. Plätze jenseits der Chartgröße erhalten keine Punkte.
+CHART_DEPTH = 0
+
+# API-Parameter
+BASE_URL = 'http://ws.audioscrobbler.com/2.0/'
+API_KEY = None  # Wird mit select_user gesetzt
+current_user = None  # Aktueller Benutzer (wird mit select_user gesetzt)
+
+# Parallele Abrufe und Ratenbegrenzung
+PAGE_LIMIT = 200  # Maximale Anzahl Tracks pro Seite
+MAX_WORKERS = 4  # Anzahl paralleler Seitenabrufe
+STREAM_BATCH_PAGES = 25  # Seiten pro Block beim Abrufen (wird jeweils direkt gespeichert)
+BACKFILL_REPORT_INTERVAL = 5  # Sekunden zwischen zwei Fortschrittsmeldungen beim Laden der Historie
+REQUESTS_PER_SECOND = 4  # Maximale Anfragen pro Sekunde und API-Schlüssel
+MAX_RETRIES = 4  # Anzahl Versuche pro Anfrage
+RETRY_DELAY = 1.0  # Wartezeit in Sekunden vor dem ersten erneuten Versuch (verdoppelt sich danach)
+MAX_RETRY_DELAY = 30.0  # Obergrenze der Wartezeit zwischen zwei Versuchen
+REQUEST_TIMEOUT = (5, 30)  # Timeouts in Sekunden für Verbindungsaufbau und Antwort
+CIRCUIT_FAILURE_THRESHOLD = 5  # Fehler in Folge, nach denen Last.fm als nicht erreichbar gilt
+CIRCUIT_RESET_TIMEOUT = 30  # Sekunden bis zum nächsten Versuch danach
+
+# Synchronisierung des lokalen Scrobble-Speichers
+SYNC_MIN_INTERVAL = 60  # Mindestabstand in Sekunden zwischen zwei Synchronisierungen
+SYNC_FRESH_INTERVAL = 15 * 60  # So lange gilt ein synchronisierter Speicher als aktuell (neuestes Datum ohne Abruf)
+MAX_SYNC_USERS = 4  # Anzahl gleichzeitig synchronisierter Benutzer
+
+# Lokaler Speicher auf der Festplatte
+CACHE_DIR = 'data_cache'  # Ein Unterverzeichnis pro Benutzer mit Segmentdateien und manifest.json
+LEGACY_CACHE_FILE = 'data_cache.pkl'  # Alter Cache, wird beim Start übernommen
+MAX_SEGMENTS = 32  # Ab dieser Anzahl werden die Segmente eines Benutzers zusammengefasst
+# Speicher der Scrobbles (settings.json: storage_backend): 'arrow' (Segmentdateien pro Benutzer) oder
+# 'sqlite' (eine Datenbank für alle Benutzer, Wochencharts in SQL). Beim Wechsel werden die
+# gespeicherten Scrobbles beim ersten Zugriff auf einen Benutzer übertragen.
+STORAGE_BACKEND = 'arrow'
+SQLITE_FILE = 'scrobbles.sqlite'  # Liegt im CACHE_DIR
+
+# Import von Last.fm-CSV-Exporten (artist,album,song_title,date_time)
+CSV_DATE_FORMAT = '%d %b %Y %H:%M'  # z. B. "19 Sep 2024 11:25" (UTC, minutengenau)
+CSV_CHUNK_SIZE = 100000  # Zeilen pro Block
+
+# Cache für track.getInfo (Song-Informationen, unabhängig vom Benutzer)
+TRACK_INFO_CACHE_FILE = 'track_info.json'  # Liegt im CACHE_DIR
+TRACK_INFO_CACHE_SIZE = 5000  # Maximale Anzahl gespeicherter Songs (die am längsten nicht verwendeten fallen heraus)
+TRACK_INFO_TTL = 7 * 24 * 3600  # Gültigkeit eines Eintrags in Sekunden
+
+# Zeitmessung (siehe trace.py; in settings.json überschreibbar: trace_file, profile_file)
+TRACE_FILE = None  # Datei für einen Chrome-Trace der Sitzung (None = kein Trace)
+PROFILE_FILE = None  # Datei für cProfile-Statistiken der Sitzung (None = kein Profiler)
+TRACE_MAX_EVENTS = 200000  # Höchstzahl gespeicherter Spans pro Sitzung
+
+# Benutzer und Einstellungen
+KEYS_FILE = 'keys.json'
+SETTINGS_FILE = 'settings.json'
+
+# Vorausladen benachbarter Zeiträume nach der Anzeige von Charts (in settings.json überschreibbar)
+PREFETCH_PERIODS = 1  # Anzahl der Zeiträume je Richtung (0 = kein Vorausladen)
+PREFETCH_DIRECTION = 'both'  # 'back' (frühere), 'forward' (spätere) oder 'both'
+
+# Benutzer aus keys.json: [{'LASTFM_USER': ..., 'LASTFM_API_KEY': ...}, ...]
+users = []
+
+
+# Funktion zum Laden der Benutzer und API-Schlüssel aus keys.json
+# Gibt die Liste der Benutzer zurück (leer, wenn die Datei fehlt oder fehlerhaft ist).
+def load_users():
+    global users
+    try:
+        with open(KEYS_FILE, 'r') as f:
+            users = json.load(f)
+    except Exception as e:
+        print(f"Fehler beim Laden der Benutzer aus {KEYS_FILE}: {e}")
+        users = []
+    return users
+
+# Funktion zum Laden der Einstellungen aus settings.json (fehlende Werte behalten ihren Standard)
+def load_settings():
+    global PREFETCH_PERIODS, PREFETCH_DIRECTION, DEBUG_MODE, TRACE_FILE, PROFILE_FILE, CHART_DEPTH, STORAGE_BACKEND
+    if not os.path.exists(SETTINGS_FILE):
+        return
+    try:
+        with open(SETTINGS_FILE, 'r') as f:
+            settings = json.load(f)
+        DEBUG_MODE = bool(settings.get('debug_mode', DEBUG_MODE))
+        TRACE_FILE = settings.get('trace_file', TRACE_FILE) or None
+        PROFILE_FILE = settings.get('profile_file', PROFILE_FILE) or None
+        CHART_DEPTH = parse_chart_depth(settings.get('chart_depth', CHART_DEPTH))
+        PREFETCH_PERIODS = max(0, int(settings.get('prefetch_periods', PREFETCH_PERIODS)))
+        direction = settings.get('prefetch_direction', PREFETCH_DIRECTION)
+        if direction in ('back', 'forward', 'both'):
+            PREFETCH_DIRECTION = direction
+        else:
+            print(f"Ungültige Richtung für das Vorausladen: {direction}")
+        backend = settings.get('storage_backend', STORAGE_BACKEND)
+        if backend in ('arrow', 'sqlite'):
+            STORAGE_BACKEND = backend
+        else:
+            print(f"Ungültiger Speicher: {backend}")
+    except Exception as e:
+        print(f"Fehler beim Laden der Einstellungen aus {SETTINGS_FILE}: {e}")
+
+# Funktion zum Einlesen einer Charttiefe ("all" bzw. "alle" = -1, sonst eine Anzahl Plätze)
+def parse_chart_depth(value):
+    if str(value).lower() in ('all', 'alle'):
+        return -1
+    return max(-1, int(value))
+
+# Funktion zum Abrufen des API-Schlüssels eines Benutzers (ohne Eintrag: der aktuelle Schlüssel)
+def get_api_key(name):
+    for user in users:
+        if user['LASTFM_USER'] == name:
+            return user['LASTFM_API_KEY']
+    return API_KEY
+
+# Funktion zur Auswahl des aktuellen Benutzers (ohne Namen: der erste Benutzer aus keys.json)
+# Gibt False zurück, wenn der Benutzer nicht in keys.json steht.
+def select_user(name=None):
+    global current_user, API_KEY
+    for user in users:
+        if name is None or user['LASTFM_USER'] == name:
+            current_user = user['LASTFM_USER']
+            API_KEY = user['LASTFM_API_KEY']
+            return True
+    return False
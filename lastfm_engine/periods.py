@@ -0,0 +1,79 @@
+# Zeiträume (Jahr, Monat, ISO-Woche) und ihre Zeitstempel in UTC
+import calendar
+import datetime
+import time
+
+from . import config
+
+
+# Funktion zur Umrechnung eines Datums (0 Uhr UTC) in einen Unix-Zeitstempel
+def get_date_timestamp(date):
+    return calendar.timegm(date.timetuple())
+
+# Funktion zur Berechnung der Zeitstempel (von, bis) eines Zeitraums
+def get_period_timestamps(period_type, year, month=None, week=None):
+    if period_type == 'year':
+        from_timestamp = get_date_timestamp(datetime.date(year, 1, 1))
+        to_timestamp = get_date_timestamp(datetime.date(year + 1, 1, 1)) - 1
+    elif period_type == 'month':
+        from_timestamp = get_date_timestamp(datetime.date(year, month, 1))
+        if month == 12:
+            to_timestamp = get_date_timestamp(datetime.date(year + 1, 1, 1)) - 1
+        else:
+            to_timestamp = get_date_timestamp(datetime.date(year, month + 1, 1)) - 1
+    elif period_type == 'week':
+        if not 1 <= week <= get_weeks_in_year(year):
+            return None  # z. B. Woche 53 in einem Jahr mit 52 ISO-Wochen
+        # Wir nehmen an, dass die Woche beginnt am Montag
+        from_date = datetime.date.fromisocalendar(year, week, 1)
+        from_timestamp = get_date_timestamp(from_date)
+        to_timestamp = from_timestamp + 7 * 24 * 3600 - 1
+    else:
+        return None
+    return from_timestamp, to_timestamp
+
+# Funktion zur Berechnung der Zeitstempel (von, bis) eines frei gewählten Zeitraums
+# von 0 Uhr des ersten bis 24 Uhr des letzten Tages (datetime.date); None, wenn bis vor von liegt
+def get_range_timestamps(from_date, to_date):
+    if to_date < from_date:
+        return None
+    return get_date_timestamp(from_date), get_date_timestamp(to_date + datetime.timedelta(days=1)) - 1
+
+# Funktion zur Berechnung des Zeitraums, der step Schritte (Wochen, Monate, Jahre) entfernt liegt
+# Gibt (year, month, week) zurück; month bzw. week sind None, wenn sie nicht zum Zeitraumtyp gehören.
+def get_adjacent_period(period_type, year, month=None, week=None, step=1):
+    if period_type == 'year':
+        return year + step, None, None
+    if period_type == 'month':
+        index = year * 12 + (month - 1) + step
+        return index // 12, index % 12 + 1, None
+    if period_type == 'week':
+        monday = datetime.date.fromisocalendar(year, week, 1) + datetime.timedelta(weeks=step)
+        iso_year, iso_week, _ = monday.isocalendar()
+        return iso_year, monday.month, iso_week
+    return None
+
+# Funktion zur Bestimmung der vorauszuladenden Nachbarzeiträume (nächste zuerst, nur bis heute)
+def get_prefetch_periods(period_type, year, month=None, week=None):
+    steps = []
+    for distance in range(1, config.PREFETCH_PERIODS + 1):
+        if config.PREFETCH_DIRECTION in ('back', 'both'):
+            steps.append(-distance)
+        if config.PREFETCH_DIRECTION in ('forward', 'both'):
+            steps.append(distance)
+
+    now = int(time.time())
+    periods = []
+    for step in steps:
+        period = get_adjacent_period(period_type, year, month, week, step)
+        if period is None or period[0] < 2000:
+            continue
+        timestamps = get_period_timestamps(period_type, *period)
+        if timestamps[0] <= now:
+            periods.append(period)
+    return periods
+
+# Funktion zur Berechnung der Anzahl der Wochen in einem Jahr
+def get_weeks_in_year(year):
+    last_week = datetime.date(year, 12, 28).isocalendar()[1]
+    return last_week
@@ -0,0 +1,239 @@
+# Materialisierte Chartergebnisse: Einmal berechnete Charts werden pro Benutzer und Zeitraum im
+# Speicher und als JSON-Datei (data_cache/<Benutzer>/charts/) abgelegt. Jedes Ergebnis trägt den
+# Datenstand seines Zeitraums; neu berechnet wird nur, wenn sich die Scrobbles geändert haben
+# (in der Praxis die laufende Woche, der laufende Monat und das laufende Jahr).
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from . import config
+from .periods import get_period_timestamps, get_range_timestamps
+from .store import (get_user_store, get_user_dir, get_period_version, fill_period, fill_range,
+                    read_newest_first, add_string_columns)
+from .weekly import get_weekly_aggregates
+from .sqlstore import query_weekly_aggregates
+from .charts import (calculate_monthly_charts, calculate_yearly_charts, calculate_range_charts, aggregate_weeks,
+                     calculate_weekly_charts_from_aggregates)
+from .chartruns import record_chart_result, save_chart_runs
+from .trace import traced, log
+
+CHART_RESULT_VERSION = 1  # Erhöhen, wenn sich die Berechnung der Charts ändert
+
+
+# Funktion zur Bestimmung des Schlüssels (und Dateinamens) eines Zeitraums
+# Künstler- und Albumcharts erhalten ein Präfix (z. B. "artist_year_2023"), Songcharts keines.
+def get_result_key(period_type, year, month=None, week=None, dimension='track'):
+    if period_type == 'year':
+        key = f"year_{year}"
+    elif period_type == 'month':
+        key = f"month_{year}_{month:02d}"
+    else:
+        key = f"week_{year}_{week:02d}"
+    return get_dimension_prefix(dimension) + key
+
+# Funktion zur Bestimmung des Schlüssels eines frei gewählten Zeitraums (datetime.date von, bis)
+def get_range_key(from_date, to_date, dimension='track'):
+    return f"{get_dimension_prefix(dimension)}range_{from_date:%Y%m%d}_{to_date:%Y%m%d}"
+
+# Funktion zur Bestimmung des Schlüsselpräfixes einer Chartdimension
+def get_dimension_prefix(dimension):
+    return '' if dimension == 'track' else f"{dimension}_"
+
+# Funktion zur Bestimmung der Version eines Ergebnisses (Berechnung, Chartgrößen, Tiefe und Datenstand)
+def get_result_version(entry, period_type, year, month=None, week=None):
+    return get_range_version(entry, *get_period_timestamps(period_type, year, month, week))
+
+# Funktion zur Bestimmung der Version eines Ergebnisses für einen Zeitbereich
+def get_range_version(entry, from_timestamp, to_timestamp):
+    data_version = get_period_version(entry, from_timestamp, to_timestamp)
+    sizes = (f"{config.WEEKLY_CHART_SIZE}-{config.MONTHLY_CHART_SIZE}-{config.YEARLY_CHART_SIZE}-"
+             f"{config.RANGE_CHART_SIZE}-{config.CHART_DEPTH}")
+    return f"{CHART_RESULT_VERSION}:{sizes}:{data_version}"
+
+# Funktion zur Umwandlung der Charts in JSON-fähige Einträge (in Reihenfolge der Plätze)
+def results_to_records(results):
+    records = []
+    for (song_title, artist), row in results.iterrows():
+        album = row['album'] if 'album' in row else ''
+        records.append({
+            'title': str(song_title),
+            'artist': str(artist),
+            'album': album if isinstance(album, str) else '',
+            'plays': int(row['play_count']),
+            'points': int(row['points']),
+        })
+    return records
+
+# Funktion zur Umwandlung gespeicherter Einträge in das Ergebnisformat der Chartberechnung
+def records_to_results(records):
+    if not records:
+        return pd.DataFrame()
+    return pd.DataFrame({
+        'points': np.array([record['points'] for record in records], dtype=np.int64),
+        'play_count': np.array([record['plays'] for record in records], dtype=np.int64),
+        'album': [record['album'] for record in records],
+    }, index=pd.MultiIndex.from_arrays([[record['title'] for record in records],
+                                        [record['artist'] for record in records]],
+                                       names=['song_title', 'artist']))
+
+# Funktion zur Berechnung der Charts eines Zeitraums
+# Wochencharts aus den Wochenaggregaten der ISO-Woche, Monats- und Jahrescharts aus den Wochenaggregaten
+# des Monats bzw. Jahres. Songs, Künstler und Alben stammen jeweils aus derselben Aggregation.
+def calculate_charts(entry, period_type, year, month=None, week=None, dimension='track'):
+    if period_type == 'week':
+        weekly = get_range_aggregates(entry, *get_period_timestamps(period_type, year, month, week))
+        if weekly.empty:
+            return pd.DataFrame()
+        points, plays, results = calculate_weekly_charts_from_aggregates(weekly, year, week, dimension)
+        return results
+
+    weekly = get_period_aggregates(entry, year, month)
+    if weekly.empty:
+        return pd.DataFrame()
+    if period_type == 'month':
+        points, plays, results = calculate_monthly_charts(weekly, year, month, dimension)
+    else:
+        points, plays, results = calculate_yearly_charts(weekly, year, dimension)
+    return results
+
+# Funktion zur Berechnung der Charts eines frei gewählten Zeitraums
+# Gelesen werden nur die Scrobbles des Zeitraums (Binärsuche im Zeitindex der Segmente); die Wochen
+# werden dabei nicht nach Monaten aufgeteilt.
+def calculate_range(entry, from_timestamp, to_timestamp, dimension='track'):
+    weekly = get_range_aggregates(entry, from_timestamp, to_timestamp)
+    if weekly.empty:
+        return pd.DataFrame()
+    points, plays, results = calculate_range_charts(weekly, dimension)
+    return results
+
+# Funktion zum Abrufen der Wochenaggregate eines Monats (oder eines ganzen Jahres)
+# Arrow-Speicher: persistente Wochenaggregate (siehe weekly); SQLite-Speicher: direkt aus SQL, damit keine
+# Aggregate aller Jahre im Speicher gehalten werden.
+def get_period_aggregates(entry, year, month=None):
+    if entry['backend'] == 'sqlite':
+        timestamps = get_period_timestamps('month' if month is not None else 'year', year, month)
+        return get_sql_aggregates(entry, *timestamps)
+    return get_weekly_aggregates(entry, year, month)
+
+# Funktion zum Abrufen der Wochenaggregate eines Zeitbereichs ohne Aufteilung nach Monaten (mit Textspalten)
+# Die Aggregate des zuletzt verwendeten Bereichs bleiben bis zur nächsten Änderung seiner Scrobbles im
+# Speicher: Wechselt man zwischen Song-, Künstler- und Albumcharts derselben Woche, wird nicht erneut gelesen.
+def get_range_aggregates(entry, from_timestamp, to_timestamp):
+    key = (from_timestamp, to_timestamp, get_period_version(entry, from_timestamp, to_timestamp))
+    cached = entry.get('range_aggregates')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    if entry['backend'] == 'sqlite':
+        weekly = get_sql_aggregates(entry, from_timestamp, to_timestamp, split_months=False)
+    else:
+        df = read_newest_first(entry, from_timestamp, to_timestamp)
+        if df.empty:
+            weekly = pd.DataFrame()
+        else:
+            df['year'] = 0
+            df['month'] = 0
+            weekly = add_string_columns(entry, aggregate_weeks(df, entry['strings'].album_ids.get('', -1)))
+    entry['range_aggregates'] = (key, weekly)
+    return weekly
+
+# Funktion zum Abrufen der Wochenaggregate eines Zeitbereichs aus dem SQLite-Speicher (mit Textspalten)
+def get_sql_aggregates(entry, from_timestamp, to_timestamp, split_months=True):
+    weekly = query_weekly_aggregates(entry['user'], from_timestamp, to_timestamp,
+                                     entry['strings'].album_ids.get('', -1), split_months)
+    if weekly.empty:
+        return pd.DataFrame()
+    return add_string_columns(entry, weekly)
+
+# Funktion zum Laden eines gespeicherten Ergebnisses (zuerst aus dem Speicher, dann von der Festplatte)
+# Rückgabe: {'version': ..., 'results': DataFrame} oder None
+def load_result(entry, key):
+    stored = entry['results'].get(key)
+    if stored is not None:
+        return stored
+
+    path = os.path.join(get_user_dir(entry['user']), 'charts', f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        stored = {'version': data['version'], 'results': records_to_results(data['entries'])}
+    except Exception as e:
+        print(f"Fehler beim Laden des Chartergebnisses {path}: {e}")
+        return None
+    entry['results'][key] = stored
+    return stored
+
+# Funktion zum Speichern eines Ergebnisses (im Speicher und atomar als JSON-Datei)
+# Die Chartplätze werden dabei in den Index der Chartverläufe übernommen.
+def save_result(entry, key, version, results):
+    entry['results'][key] = {'version': version, 'results': results}
+    record_chart_result(entry, key, results)
+    save_chart_runs(entry)
+    charts_dir = os.path.join(get_user_dir(entry['user']), 'charts')
+    try:
+        os.makedirs(charts_dir, exist_ok=True)
+        path = os.path.join(charts_dir, f"{key}.json")
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'entries': results_to_records(results)}, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+    except Exception as e:
+        print(f"Fehler beim Speichern des Chartergebnisses {key}: {e}")
+
+# Funktion zum Abrufen der Charts eines Zeitraums
+# Fehlende Daten werden zuerst geladen (außer offline). Passt der Datenstand zum gespeicherten
+# Ergebnis, wird es ohne Berechnung zurückgegeben, sonst neu berechnet und gespeichert.
+# Gibt einen leeren DataFrame zurück, wenn keine Daten vorliegen oder das Laden fehlschlägt.
+# dimension: 'track' (Songcharts), 'artist' oder 'album' (siehe charts.DIMENSIONS)
+@traced
+def get_chart_results(period_type, year, month=None, week=None, job=None, user=None, offline=False,
+                      dimension='track'):
+    user = user or config.current_user
+    if get_period_timestamps(period_type, year, month, week) is None:
+        print(f"Ungültiger Zeitraum: {period_type} {year}/{month}/{week}.")
+        return pd.DataFrame()
+
+    if not offline and not fill_period(period_type, year, month, week, job, user):
+        return pd.DataFrame()
+
+    entry = get_user_store(user)
+    key = get_result_key(period_type, year, month, week, dimension)
+    version = get_result_version(entry, period_type, year, month, week)
+    return get_stored_or_calculate(entry, key, version, job,
+                                   lambda: calculate_charts(entry, period_type, year, month, week, dimension))
+
+# Funktion zum Abrufen der Charts eines frei gewählten Zeitraums (datetime.date von, bis, jeweils
+# einschließlich); Laden, Ergebnis-Cache und Rückgabe wie bei get_chart_results
+@traced
+def get_range_chart_results(from_date, to_date, job=None, user=None, offline=False, dimension='track'):
+    user = user or config.current_user
+    timestamps = get_range_timestamps(from_date, to_date)
+    if timestamps is None:
+        print(f"Ungültiger Zeitraum: {to_date} liegt vor {from_date}.")
+        return pd.DataFrame()
+
+    if not offline and not fill_range(*timestamps, job, user):
+        return pd.DataFrame()
+
+    entry = get_user_store(user)
+    key = get_range_key(from_date, to_date, dimension)
+    version = get_range_version(entry, *timestamps)
+    return get_stored_or_calculate(entry, key, version, job,
+                                   lambda: calculate_range(entry, *timestamps, dimension))
+
+# Funktion zum Abrufen eines gespeicherten Ergebnisses, wenn sein Datenstand passt (sonst wird mit
+# calculate() neu berechnet und gespeichert)
+def get_stored_or_calculate(entry, key, version, job, calculate):
+    stored = load_result(entry, key)
+    if stored is not None and stored['version'] == version:
+        log.debug("Charts %s für %s aus dem Ergebnis-Cache.", key, entry['user'])
+        return stored['results']
+
+    if job is not None:
+        job.set_status("Führe Berechnungen durch...")
+    results = calculate()
+    if not results.empty:
+        save_result(entry, key, version, results)
+    return results
@@ -0,0 +1,132 @@
+# Optionaler SQLite-Speicher (settings.json: "storage_backend": "sqlite"): Die Scrobbles aller Benutzer
+# liegen in einer Datenbank (data_cache/scrobbles.sqlite) statt in Segmentdateien. Manifest und
+# Stringtabelle bleiben wie beim Arrow-Speicher in data_cache/<Benutzer>/.
+# Die Datenbank läuft im WAL-Modus: Mehrere Prozesse können gleichzeitig lesen, während einer schreibt.
+# Die Wiedergaben pro Woche werden in SQL gezählt; nach Python gelangen nur diese Gruppen, nicht die
+# einzelnen Scrobbles.
+import os
+import sqlite3
+import threading
+import itertools
+import numpy as np
+import pandas as pd
+
+from . import config
+from .charts import aggregate_week_groups, get_week_keys
+
+# Tabelle der Scrobbles; der Primärschlüssel (user, uts) ist zugleich der Zeitindex (WITHOUT ROWID:
+# die Zeilen liegen nach Benutzer und Zeit sortiert). Die Datumsspalten werden beim Einfügen berechnet,
+# damit die Wochen in SQL gruppiert werden können.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrobbles (
+    user TEXT NOT NULL,
+    uts INTEGER NOT NULL,
+    track_id INTEGER NOT NULL,
+    artist_id INTEGER NOT NULL,
+    album_id INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    iso_year INTEGER NOT NULL,
+    iso_week INTEGER NOT NULL,
+    PRIMARY KEY (user, uts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scrobbles_user_track ON scrobbles (user, track_id);
+"""
+
+# Verbindungen: eine pro Thread (sqlite3-Verbindungen sind nicht für mehrere Threads gedacht);
+# alle geöffneten Verbindungen stehen in open_connections, damit close_connections sie schließen kann.
+local_connections = threading.local()
+open_connections = []
+connections_lock = threading.Lock()
+connections_generation = [0]
+
+
+# Funktion zur Bestimmung des Pfads der Datenbank
+def get_database_path():
+    return os.path.join(config.CACHE_DIR, config.SQLITE_FILE)
+
+# Funktion zum Abrufen der Verbindung des aktuellen Threads (wird beim ersten Zugriff geöffnet)
+def get_connection():
+    path = get_database_path()
+    state = getattr(local_connections, 'state', None)
+    if state is not None and state[0] == path and state[1] == connections_generation[0]:
+        return state[2]
+
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    with connections_lock:
+        open_connections.append(connection)
+        local_connections.state = (path, connections_generation[0], connection)
+    return connection
+
+# Funktion zum Schließen aller Verbindungen (z. B. bevor der Speicher gelöscht wird)
+def close_connections():
+    with connections_lock:
+        for connection in open_connections:
+            try:
+                connection.close()
+            except sqlite3.Error as e:
+                print(f"Fehler beim Schließen der Datenbank: {e}")
+        open_connections.clear()
+        connections_generation[0] += 1
+
+# Funktion zum Einfügen von Scrobbles (uts, track_id, artist_id, album_id) in einer Transaktion
+# Bereits vorhandene Zeitpunkte werden übersprungen (Schlüssel: user, uts).
+def insert_scrobbles(user, df):
+    date_time = pd.to_datetime(df['uts'], unit='s')
+    iso_calendar = date_time.dt.isocalendar()
+    rows = zip(itertools.repeat(user), df['uts'].tolist(), df['track_id'].tolist(), df['artist_id'].tolist(),
+               df['album_id'].tolist(), date_time.dt.year.tolist(), date_time.dt.month.tolist(),
+               iso_calendar.year.tolist(), iso_calendar.week.tolist())
+    connection = get_connection()
+    with connection:
+        connection.executemany("INSERT OR IGNORE INTO scrobbles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+# Funktion zum Löschen aller Scrobbles eines Benutzers
+def delete_scrobbles(user):
+    connection = get_connection()
+    with connection:
+        connection.execute("DELETE FROM scrobbles WHERE user = ?", (user,))
+
+# Funktion zum Lesen der Scrobbles zwischen zwei Zeitpunkten (nach uts sortiert, über den Zeitindex)
+def read_scrobbles(user, from_timestamp, to_timestamp, columns):
+    cursor = get_connection().execute(
+        f"SELECT {', '.join(columns)} FROM scrobbles WHERE user = ? AND uts BETWEEN ? AND ? ORDER BY uts",
+        (user, int(from_timestamp), int(to_timestamp)))
+    values = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, len(columns))
+    return pd.DataFrame({column: values[:, i] if column == 'uts' else values[:, i].astype(np.int32)
+                         for i, column in enumerate(columns)}, columns=columns)
+
+# Funktion zur Bestimmung des ältesten und neuesten gespeicherten Scrobbles (None ohne Scrobbles)
+def get_stored_range(user):
+    first, last = get_connection().execute(
+        "SELECT min(uts), max(uts) FROM scrobbles WHERE user = ?", (user,)).fetchone()
+    return None if first is None else (first, last)
+
+# Funktion zum Zählen der gespeicherten Scrobbles eines Benutzers
+def count_scrobbles(user):
+    return get_connection().execute("SELECT count(*) FROM scrobbles WHERE user = ?", (user,)).fetchone()[0]
+
+# Funktion zur Berechnung der Wochenaggregate eines Zeitbereichs (gleiche Spalten wie charts.aggregate_weeks)
+# Gezählt wird in SQL mit einer einzigen Gruppierung (Woche, Song, Album) über den Index (user, uts);
+# SQLite übernimmt die Spalte artist_id ohne Aggregat aus der Zeile des max(). Aus diesen Gruppen
+# (neueste zuerst) entstehen Songs, Künstler und Alben gemeinsam und mit denselben Plätzen wie im
+# Arrow-Speicher (charts.aggregate_week_groups); die einzelnen Scrobbles werden nicht gelesen.
+# split_months=False: Wochen werden nicht nach Monaten aufgeteilt (year und month gleich 0).
+def query_weekly_aggregates(user, from_timestamp, to_timestamp, empty_album_id=None, split_months=True):
+    period_columns = 'year, month' if split_months else '0, 0'
+    period_groups = 'year, month, ' if split_months else ''
+    cursor = get_connection().execute(f"""
+        SELECT {period_columns}, iso_year, iso_week, track_id, artist_id, album_id, count(*), max(uts) AS last_uts
+        FROM scrobbles
+        WHERE user = ? AND uts BETWEEN ? AND ?
+        GROUP BY {period_groups}iso_year, iso_week, track_id, album_id
+        ORDER BY last_uts DESC
+    """, (user, int(from_timestamp), int(to_timestamp)))
+    groups = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 9)
+    return aggregate_week_groups(get_week_keys(groups[:, 0], groups[:, 1], groups[:, 2], groups[:, 3]),
+                                 groups[:, 4], groups[:, 5], groups[:, 6], groups[:, 7], groups[:, 8],
+                                 empty_album_id)
@@ -0,0 +1,766 @@
+# Lokaler Scrobble-Speicher: Segmentdateien (Arrow) oder SQLite-Datenbank (siehe sqlstore),
+# Stringtabelle und abgedeckte Zeiträume pro Benutzer, CSV-Import und Übernahme alter Caches
+import os
+import json
+import time
+import shutil
+import threading
+import pickle  # Zum Lesen des alten Caches (data_cache.pkl)
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa  # Spaltenbasierte Segmentdateien (Arrow IPC / Feather)
+import pyarrow.feather as feather
+
+from . import config, sqlstore
+from .api import stream_lastfm_data
+from .periods import get_period_timestamps
+from .trackinfo import reset_track_info_cache
+from .trace import traced, log
+
+# Funktion zum Hinzufügen der Datumskomponenten
+def add_date_columns(df):
+    iso_calendar = df['date_time'].dt.isocalendar()
+    df['iso_year'] = iso_calendar.year
+    df['iso_week'] = iso_calendar.week
+    df['year'] = df['date_time'].dt.year
+    df['month'] = df['date_time'].dt.month
+
+    return df
+
+# Spalten, die in den Segmentdateien gespeichert werden (date_time & Co. werden aus uts berechnet,
+# Texte stehen in der Stringtabelle des Benutzers)
+SEGMENT_COLUMNS = ['uts', 'track_id', 'artist_id', 'album_id']
+STORE_VERSION = 2  # Version 1: Segmente mit Textspalten (artist, album, song_title)
+
+# Globale Variable für den Daten-Cache
+# data_cache enthält pro Benutzer den Stand seines Scrobble-Speichers (aus manifest.json):
+# {'user': ..., 'backend': 'arrow'/'sqlite', 'covered': [[von_uts, bis_uts], ...], 'segments': [...],
+#  'next_segment': n, 'tables': {...}}
+# Jedes Segment ist nach uts sortiert; 'indexes' hält pro geöffnetem Segment die uts als NumPy-Array,
+# in dem ein Zeitbereich per Binärsuche gefunden wird.
+# Alle Scrobbles innerhalb der (sortierten, disjunkten) Bereiche in 'covered' sind lokal vorhanden.
+# 'month_versions' ({'JJJJ-MM': n}) wird bei jedem Hinzufügen von Scrobbles für die betroffenen
+# Monate hochgezählt; abgeleitete Daten (Wochenaggregate, Chartergebnisse) erkennen daran Änderungen.
+# Die Scrobbles selbst liegen in Segmentdateien und werden erst bei Bedarf per Memory-Mapping geöffnet;
+# mit dem SQLite-Speicher ('backend' == 'sqlite') liegen sie in der Datenbank und 'segments' bleibt leer.
+data_cache = {}
+store_lock = threading.RLock()  # Schützt den Speicher, wenn im Hintergrund geladen wird
+
+# Stringtabelle eines Benutzers: Künstler, Alben, Titel und Songs (Titel + Künstler) als Ganzzahl-IDs
+# Neue Einträge werden nur angehängt, vergebene IDs ändern sich nie.
+class StringTable:
+    def __init__(self, artists=None, albums=None, titles=None, track_titles=None, track_artists=None):
+        self.artists = artists or []
+        self.albums = albums or []
+        self.titles = titles or []
+        self.track_titles = track_titles or []  # Titel-ID pro Song-ID
+        self.track_artists = track_artists or []  # Künstler-ID pro Song-ID
+        self.artist_ids = {name: i for i, name in enumerate(self.artists)}
+        self.album_ids = {name: i for i, name in enumerate(self.albums)}
+        self.title_ids = {name: i for i, name in enumerate(self.titles)}
+        self.track_ids = {key: i for i, key in enumerate(zip(self.track_titles, self.track_artists))}
+        self.categories = {}
+        self.lock = threading.Lock()
+
+    # Vergibt IDs für alle Werte einer Spalte (neue Werte werden angehängt)
+    @staticmethod
+    def intern_column(values, ids, names):
+        codes, uniques = pd.factorize(values.fillna(''))
+        mapped = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            value_id = ids.get(value)
+            if value_id is None:
+                value_id = len(names)
+                ids[value] = value_id
+                names.append(value)
+            mapped[i] = value_id
+        return mapped[codes]
+
+    # Wandelt die Textspalten eines DataFrames in track_id, artist_id und album_id um
+    def intern(self, df):
+        with self.lock:
+            artist_ids = self.intern_column(df['artist'], self.artist_ids, self.artists)
+            album_ids = self.intern_column(df['album'], self.album_ids, self.albums)
+            title_ids = self.intern_column(df['song_title'], self.title_ids, self.titles)
+
+            pair_codes, pair_uniques = pd.factorize(title_ids.astype(np.int64) << 32 | artist_ids.astype(np.int64))
+            mapped = np.empty(len(pair_uniques), dtype=np.int32)
+            for i, pair in enumerate(pair_uniques):
+                key = (int(pair >> 32), int(pair & 0xFFFFFFFF))
+                track_id = self.track_ids.get(key)
+                if track_id is None:
+                    track_id = len(self.track_titles)
+                    self.track_ids[key] = track_id
+                    self.track_titles.append(key[0])
+                    self.track_artists.append(key[1])
+                mapped[i] = track_id
+            self.categories = {}
+            return mapped[pair_codes], artist_ids, album_ids
+
+    # Liefert die Texte als Index (für kategorische Spalten), zwischengespeichert bis zur nächsten Änderung
+    def get_categories(self, name):
+        if name not in self.categories:
+            self.categories[name] = pd.Index(list(getattr(self, name)), dtype=object)
+        return self.categories[name]
+
+    # Liefert die Titel-ID pro Song-ID als Array, zwischengespeichert bis zur nächsten Änderung
+    def get_track_titles(self):
+        if 'track_titles' not in self.categories:
+            self.categories['track_titles'] = np.asarray(self.track_titles, dtype=np.int32)
+        return self.categories['track_titles']
+
+    # Funktion zum Umwandeln in ein JSON-fähiges Dictionary
+    def to_dict(self):
+        return {
+            'artists': self.artists,
+            'albums': self.albums,
+            'titles': self.titles,
+            'track_titles': self.track_titles,
+            'track_artists': self.track_artists,
+        }
+
+# Funktion zur Bestimmung des Speicherverzeichnisses eines Benutzers
+def get_user_dir(user):
+    return os.path.join(config.CACHE_DIR, user)
+
+# Funktion zum Abrufen (bzw. Anlegen) des Scrobble-Speichers eines Benutzers
+# Beim ersten Zugriff werden nur das Manifest und die Stringtabelle gelesen, keine Scrobbles.
+def get_user_store(user):
+    with store_lock:
+        return open_user_store(user)
+
+# Funktion zum Öffnen des Scrobble-Speichers (nur mit store_lock aufrufen)
+def open_user_store(user):
+    if user not in data_cache:
+        entry = {'user': user, 'backend': config.STORAGE_BACKEND, 'covered': [], 'segments': [], 'next_segment': 1, 'tables': {}, 'indexes': {},
+                 'strings': StringTable(), 'strings_written': 0, 'month_versions': {}, 'weekly': None, 'results': {},
+                 'chart_runs': None, 'range_aggregates': None}
+        manifest_path = os.path.join(get_user_dir(user), 'manifest.json')
+        strings_path = os.path.join(get_user_dir(user), 'strings.json')
+        version = STORE_VERSION
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as f:
+                    manifest = json.load(f)
+                entry['backend'] = manifest.get('backend', 'arrow')
+                entry['covered'] = manifest['covered']
+                entry['segments'] = manifest['segments']
+                entry['next_segment'] = manifest['next_segment']
+                entry['month_versions'] = manifest.get('month_versions', {})
+                version = manifest.get('version', 1)
+                if os.path.exists(strings_path):
+                    with open(strings_path, 'r') as f:
+                        entry['strings'] = StringTable(**json.load(f))
+                    entry['strings_written'] = get_strings_size(entry['strings'])
+            except Exception as e:
+                print(f"Fehler beim Laden des Manifests für {user}: {e}")
+        data_cache[user] = entry
+        if version < STORE_VERSION and entry['segments']:
+            upgrade_store(entry)
+        if entry['backend'] != config.STORAGE_BACKEND:
+            switch_backend(entry)
+    return data_cache[user]
+
+# Funktion zur Bestimmung der Größe einer Stringtabelle (um Änderungen zu erkennen)
+def get_strings_size(strings):
+    return len(strings.artists) + len(strings.albums) + len(strings.titles) + len(strings.track_titles)
+
+# Funktion zum Schreiben der Stringtabelle (nur wenn neue Einträge hinzugekommen sind)
+def write_strings(entry):
+    size = get_strings_size(entry['strings'])
+    if size == entry['strings_written']:
+        return
+    user_dir = get_user_dir(entry['user'])
+    os.makedirs(user_dir, exist_ok=True)
+    strings_path = os.path.join(user_dir, 'strings.json')
+    with open(strings_path + '.tmp', 'w') as f:
+        json.dump(entry['strings'].to_dict(), f, ensure_ascii=False)
+    os.replace(strings_path + '.tmp', strings_path)
+    entry['strings_written'] = size
+
+# Funktion zur Umstellung eines Speichers mit Textspalten (Version 1) auf Ganzzahl-IDs
+def upgrade_store(entry):
+    print(f"Stelle den Speicher von {entry['user']} auf Ganzzahl-IDs um...")
+    old_segments = entry['segments']
+    df = read_scrobbles(entry, min(segment['min_uts'] for segment in old_segments),
+                        max(segment['max_uts'] for segment in old_segments),
+                        columns=['uts', 'artist', 'album', 'song_title'])
+    entry['segments'] = []
+    entry['tables'] = {}
+    entry['indexes'] = {}
+    merge_scrobbles(entry, df)
+    write_manifest(entry)
+    remove_segments(entry, old_segments)
+
+# Funktion zum Übertragen der Scrobbles eines Benutzers in den eingestellten Speicher (config.STORAGE_BACKEND)
+# Stringtabelle, abgedeckte Bereiche und Monatsversionen bleiben gültig; die Scrobbles im bisherigen
+# Speicher werden erst gelöscht, wenn das Manifest auf den neuen Speicher zeigt.
+def switch_backend(entry):
+    print(f"Übertrage den Speicher von {entry['user']} nach {config.STORAGE_BACKEND}...")
+    stored_range = get_stored_range(entry)
+    df = read_scrobbles(entry, *stored_range) if stored_range is not None else None
+    old_backend, old_segments = entry['backend'], entry['segments']
+    entry['backend'] = config.STORAGE_BACKEND
+    entry['segments'] = []
+    entry['tables'] = {}
+    entry['indexes'] = {}
+    if entry['backend'] == 'sqlite':
+        sqlstore.delete_scrobbles(entry['user'])  # Reste eines früheren Wechsels
+    if df is not None and not df.empty:
+        write_scrobbles(entry, df)
+    write_manifest(entry)
+    if old_backend == 'sqlite':
+        sqlstore.delete_scrobbles(entry['user'])
+    else:
+        remove_segments(entry, old_segments)
+
+# Funktion zum Löschen nicht mehr verwendeter Segmentdateien
+def remove_segments(entry, segments):
+    for segment in segments:
+        try:
+            os.remove(os.path.join(get_user_dir(entry['user']), segment['file']))
+        except OSError as e:
+            print(f"Fehler beim Löschen von {segment['file']}: {e}")
+
+# Funktion zum Schreiben des Manifests eines Benutzers (atomar über eine temporäre Datei)
+def write_manifest(entry):
+    user_dir = get_user_dir(entry['user'])
+    os.makedirs(user_dir, exist_ok=True)
+    manifest = {
+        'version': STORE_VERSION,
+        'backend': entry['backend'],
+        'covered': entry['covered'],
+        'segments': entry['segments'],
+        'next_segment': entry['next_segment'],
+        'month_versions': entry['month_versions'],
+    }
+    manifest_path = os.path.join(user_dir, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+# Funktion zum Öffnen eines Segments per Memory-Mapping (ohne Kopie, einmal pro Sitzung)
+def open_segment(entry, segment):
+    table = entry['tables'].get(segment['file'])
+    if table is None:
+        source = pa.memory_map(os.path.join(get_user_dir(entry['user']), segment['file']), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        entry['tables'][segment['file']] = table
+    return table
+
+# Funktion zum Abrufen des Zeitindex eines Segments (uts als NumPy-Array, einmal pro Sitzung)
+def get_segment_index(entry, segment):
+    index = entry['indexes'].get(segment['file'])
+    if index is None:
+        index = open_segment(entry, segment).column('uts').to_numpy()
+        entry['indexes'][segment['file']] = index
+    return index
+
+# Funktion zur Bestimmung der Zeilen [start, end) eines Segments zwischen zwei Zeitpunkten
+# Binärsuche im Zeitindex (O(log n)), es wird nichts gelesen oder kopiert.
+def find_segment_rows(entry, segment, from_timestamp, to_timestamp):
+    index = get_segment_index(entry, segment)
+    start = int(np.searchsorted(index, from_timestamp, side='left'))
+    end = int(np.searchsorted(index, to_timestamp, side='right'))
+    return start, end
+
+# Funktion zum Lesen der Scrobbles zwischen zwei Zeitpunkten (nach uts sortiert)
+# Es werden nur Segmente geöffnet, deren Zeitbereich den angefragten Bereich überschneidet; aus jedem
+# wird der Bereich über den Zeitindex als Ausschnitt (ohne Kopie) entnommen. Im SQLite-Speicher
+# liest eine Bereichsabfrage über den Index (user, uts).
+def read_scrobbles(entry, from_timestamp, to_timestamp, columns=None):
+    columns = columns or SEGMENT_COLUMNS
+    if entry['backend'] == 'sqlite':
+        return sqlstore.read_scrobbles(entry['user'], from_timestamp, to_timestamp, columns)
+    tables = []
+    with store_lock:
+        for segment in entry['segments']:
+            if segment['max_uts'] < from_timestamp or segment['min_uts'] > to_timestamp:
+                continue
+            start, end = find_segment_rows(entry, segment, from_timestamp, to_timestamp)
+            if end > start:
+                tables.append(open_segment(entry, segment).select(columns).slice(start, end - start))
+
+    if not tables:
+        return pd.DataFrame(columns=columns)
+
+    df = pa.concat_tables(tables).to_pandas()
+    if len(tables) > 1:
+        df = df.sort_values('uts', kind='stable').reset_index(drop=True)
+    return df
+
+# Funktion zum Lesen der Scrobbles zwischen zwei Zeitpunkten, neueste zuerst und mit Datumsspalten
+def read_newest_first(entry, from_timestamp, to_timestamp):
+    df = read_scrobbles(entry, from_timestamp, to_timestamp)
+    df = df.iloc[::-1].reset_index(drop=True)
+    df['date_time'] = pd.to_datetime(df['uts'], unit='s')
+    return add_date_columns(df)
+
+# Funktion zur Bestimmung des Schlüssels eines Monats in 'month_versions'
+def get_month_key(year, month):
+    return f"{year}-{month:02d}"
+
+# Funktion zum Hochzählen der Versionen aller Monate, in die die angegebenen Zeitstempel fallen
+def bump_month_versions(entry, uts):
+    date_time = pd.to_datetime(pd.Series(uts), unit='s')
+    for year_month in np.unique(date_time.dt.year.to_numpy() * 100 + date_time.dt.month.to_numpy()):
+        key = get_month_key(int(year_month) // 100, int(year_month) % 100)
+        entry['month_versions'][key] = entry['month_versions'].get(key, 0) + 1
+
+# Funktion zur Bestimmung des Datenstands eines Zeitraums (Versionen der berührten Monate)
+# Ändert sich, sobald im Zeitraum Scrobbles hinzukommen, ohne dass Scrobbles gelesen werden.
+def get_period_version(entry, from_timestamp, to_timestamp):
+    first = time.gmtime(from_timestamp)
+    last = time.gmtime(to_timestamp)
+    year, month = first.tm_year, first.tm_mon
+    versions = []
+    while (year, month) <= (last.tm_year, last.tm_mon):
+        versions.append(str(entry['month_versions'].get(get_month_key(year, month), 0)))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return '-'.join(versions)
+
+# Funktion zum Schreiben eines neuen Segments (bestehende Segmente bleiben unverändert)
+def write_segment(entry, df):
+    table = pa.Table.from_pandas(df[SEGMENT_COLUMNS].sort_values('uts', kind='stable'), preserve_index=False)
+    file_name = f"segment_{entry['next_segment']:06d}.arrow"
+    os.makedirs(get_user_dir(entry['user']), exist_ok=True)
+    # Unkomprimiert, damit die Datei direkt gemappt werden kann
+    feather.write_feather(table, os.path.join(get_user_dir(entry['user']), file_name), compression='uncompressed')
+    entry['segments'].append({
+        'file': file_name,
+        'min_uts': int(df['uts'].min()),
+        'max_uts': int(df['uts'].max()),
+        'rows': len(df),
+    })
+    entry['next_segment'] += 1
+
+# Funktion zum Zusammenfassen aller Segmente eines Benutzers zu einem einzigen Segment
+@traced
+def compact_segments(entry):
+    old_segments = entry['segments']
+    df = read_scrobbles(entry, min(segment['min_uts'] for segment in old_segments),
+                        max(segment['max_uts'] for segment in old_segments))
+    entry['segments'] = []
+    entry['tables'] = {}
+    entry['indexes'] = {}
+    write_segment(entry, df)
+    write_manifest(entry)
+    remove_segments(entry, old_segments)
+
+# Funktion zum Schreiben neuer Scrobbles in den Speicher des Benutzers (Segment bzw. SQLite-Datenbank)
+def write_scrobbles(entry, df):
+    if entry['backend'] == 'sqlite':
+        sqlstore.insert_scrobbles(entry['user'], df)
+    else:
+        write_segment(entry, df)
+
+# Funktion zur Bestimmung des ältesten und neuesten gespeicherten Scrobbles (None ohne Scrobbles)
+def get_stored_range(entry):
+    if entry['backend'] == 'sqlite':
+        return sqlstore.get_stored_range(entry['user'])
+    if not entry['segments']:
+        return None
+    return (min(segment['min_uts'] for segment in entry['segments']),
+            max(segment['max_uts'] for segment in entry['segments']))
+
+# Funktion zum Zählen der gespeicherten Scrobbles eines Benutzers
+def get_scrobble_count(entry):
+    if entry['backend'] == 'sqlite':
+        return sqlstore.count_scrobbles(entry['user'])
+    return sum(segment['rows'] for segment in entry['segments'])
+
+# Funktion zum Einfügen neuer Scrobbles in den Speicher eines Benutzers (Schlüssel: uts)
+# Die Texte werden dabei in die Stringtabelle übernommen, gespeichert werden nur IDs.
+# Gibt die Anzahl der tatsächlich gespeicherten Scrobbles zurück.
+@traced
+def merge_scrobbles(entry, df):
+    with store_lock:
+        return append_scrobbles(entry, df)
+
+# Funktion zum Anhängen neuer Scrobbles als Segment (nur mit store_lock aufrufen)
+# Gibt die Anzahl der geschriebenen Scrobbles zurück (ohne bereits gespeicherte uts).
+def append_scrobbles(entry, df):
+    if df.empty:
+        return 0
+
+    # Bereits gespeicherte Scrobbles (gleicher uts) nicht erneut schreiben
+    df = df.drop_duplicates(subset='uts', keep='first')
+    existing = read_scrobbles(entry, int(df['uts'].min()), int(df['uts'].max()), columns=['uts'])
+    df = df[~df['uts'].isin(existing['uts'])]
+    if df.empty:
+        return 0
+
+    track_ids, artist_ids, album_ids = entry['strings'].intern(df)
+    df = pd.DataFrame({
+        'uts': df['uts'].to_numpy(dtype=np.int64),
+        'track_id': track_ids,
+        'artist_id': artist_ids,
+        'album_id': album_ids,
+    })
+
+    # Stringtabelle vor dem Segment schreiben, damit jede gespeicherte ID auflösbar ist
+    write_strings(entry)
+    write_scrobbles(entry, df)
+    bump_month_versions(entry, df['uts'].to_numpy())
+    if len(entry['segments']) > config.MAX_SEGMENTS:
+        compact_segments(entry)
+    return len(df)
+
+# Funktion zur Berechnung der Teilbereiche von [von, bis], die noch nicht lokal vorhanden sind
+def get_missing_ranges(covered, from_timestamp, to_timestamp):
+    missing = []
+    start = from_timestamp
+    for covered_from, covered_to in covered:
+        if covered_to < start:
+            continue
+        if covered_from > to_timestamp:
+            break
+        if covered_from > start:
+            missing.append((start, covered_from - 1))
+        start = covered_to + 1
+        if start > to_timestamp:
+            break
+    if start <= to_timestamp:
+        missing.append((start, to_timestamp))
+    return missing
+
+# Funktion zum Eintragen eines abgerufenen Bereichs; angrenzende Bereiche werden zusammengefügt
+def add_covered_range(covered, from_timestamp, to_timestamp):
+    merged = []
+    for range_from, range_to in sorted(covered + [[from_timestamp, to_timestamp]]):
+        if merged and range_from <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], range_to)
+        else:
+            merged.append([range_from, range_to])
+    return merged
+
+# Funktion zum Abrufen des Zeitpunkts der letzten Synchronisierung (High-Water-Mark)
+def get_synced_until(entry):
+    if not entry['covered']:
+        return None
+    return entry['covered'][-1][1]
+
+# Funktion zum Abrufen und Speichern der fehlenden Teilbereiche eines Zeitraums
+# Abgerufen wird für den Benutzer des Speichers (entry['user']) mit seinem eigenen API-Schlüssel.
+# Gibt False zurück, wenn ein Teilbereich nicht abgerufen werden konnte.
+def fetch_missing_ranges(entry, from_timestamp, to_timestamp, job=None):
+    now = int(time.time())
+    to_timestamp = min(to_timestamp, now)
+    if from_timestamp > to_timestamp:
+        return True
+
+    success = True
+    for missing_from, missing_to in get_missing_ranges(entry['covered'], from_timestamp, to_timestamp):
+        if job is not None and job.is_cancelled():
+            success = False
+            break
+
+        # Den jüngsten Bereich nur abrufen, wenn die letzte Synchronisierung lange genug her ist
+        if missing_to == now and now - missing_from < config.SYNC_MIN_INTERVAL:
+            continue
+
+        log.debug("Lade fehlenden Bereich für %s von %s bis %s.", entry['user'], missing_from, missing_to)
+
+        # Jeder Block wird sofort gespeichert und als Checkpoint im Manifest vermerkt: Die Seiten
+        # kommen neueste zuerst, also ist alles vom ältesten Scrobble des Blocks bis missing_to
+        # vorhanden. Ein abgebrochener Abruf setzt beim nächsten Mal dort fort.
+        def store_batch(batch, missing_to=missing_to):
+            with store_lock:
+                merge_scrobbles(entry, batch)
+                if not batch.empty:
+                    entry['covered'] = add_covered_range(entry['covered'], int(batch['uts'].min()), missing_to)
+                    write_manifest(entry)
+
+        if not stream_lastfm_data(missing_from, missing_to, store_batch, job, entry['user']):
+            success = False
+            break
+
+        with store_lock:
+            entry['covered'] = add_covered_range(entry['covered'], missing_from, missing_to)
+    return success
+
+# Funktion zur Synchronisierung der neuen Scrobbles seit dem letzten Stand (High-Water-Mark)
+# Ist für den Benutzer noch nichts gespeichert, wird das laufende Jahr geladen.
+def sync_user_data(user=None, job=None):
+    entry = get_user_store(user or config.current_user)
+    if entry['covered']:
+        from_timestamp = get_synced_until(entry) + 1
+    else:
+        from_timestamp = get_period_timestamps('year', time.gmtime().tm_year)[0]
+
+    covered_before = [list(covered_range) for covered_range in entry['covered']]
+    success = fetch_missing_ranges(entry, from_timestamp, int(time.time()), job)
+    if entry['covered'] != covered_before:
+        save_cache()
+    return success
+
+# Funktion zum Abrufen der gesamten Historie eines Benutzers (erstmalige Einrichtung)
+# Abgerufen werden alle noch fehlenden Bereiche bis heute. Nach jedem gespeicherten Block steht der
+# Fortschritt im Manifest; nach einem Fehler, Abbruch oder Absturz setzt ein erneuter Aufruf
+# beim ältesten bereits gespeicherten Scrobble fort.
+def backfill_user(user=None, job=None):
+    entry = get_user_store(user or config.current_user)
+    success = fetch_missing_ranges(entry, 0, int(time.time()), job)
+    save_cache()
+    return success
+
+# Funktion zur gleichzeitigen Synchronisierung aller Benutzer aus keys.json
+# Jeder Benutzer läuft in einem eigenen Thread mit dem Rate-Limiter seines API-Schlüssels;
+# ein Fehler bei einem Benutzer hält die anderen nicht auf.
+# stored_only=True: nur Benutzer, für die schon Scrobbles gespeichert sind (z. B. beim Programmstart)
+# Rückgabe: {Benutzer: True/False}
+def sync_all_users(job=None, stored_only=False):
+    names = [user['LASTFM_USER'] for user in config.users]
+    if stored_only:
+        names = [name for name in names if get_user_store(name)['covered']]
+    if not names:
+        return {}
+
+    def sync(name):
+        try:
+            return sync_user_data(name, job)
+        except Exception as e:
+            print(f"Fehler bei der Synchronisierung von {name}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=min(config.MAX_SYNC_USERS, len(names))) as executor:
+        results = dict(zip(names, executor.map(sync, names)))
+
+    log.debug("Synchronisierung abgeschlossen: %s", results)
+    return results
+
+# Funktion zum Abrufen des neuesten gespeicherten Scrobbles (uts) ohne Netzwerkzugriff
+# Gibt None zurück, wenn der Speicher länger als max_age Sekunden nicht synchronisiert wurde.
+def get_latest_scrobble_time(user, max_age):
+    entry = get_user_store(user)
+    with store_lock:
+        synced_until = get_synced_until(entry)
+        if synced_until is None or time.time() - synced_until > max_age:
+            return None
+        stored_range = get_stored_range(entry)
+        return stored_range[1] if stored_range is not None else None
+
+# Funktion zum Vervollständigen eines Zeitraums im lokalen Speicher (ohne die Daten zu lesen)
+# Wird auch zum Vorausladen benachbarter Zeiträume verwendet. Gibt False zurück, wenn
+# ein Teilbereich fehlt (Fehler oder Abbruch).
+def fill_period(period_type, year, month=None, week=None, job=None, user=None):
+    return fill_range(*get_period_timestamps(period_type, year, month, week), job, user)
+
+# Funktion zum Vervollständigen eines beliebigen Zeitbereichs im lokalen Speicher (siehe fill_period)
+def fill_range(from_timestamp, to_timestamp, job=None, user=None):
+    entry = get_user_store(user or config.current_user)
+    covered_before = [list(covered_range) for covered_range in entry['covered']]
+    success = fetch_missing_ranges(entry, from_timestamp, to_timestamp, job)
+
+    # Cache speichern, wenn neue Bereiche hinzugekommen sind
+    if entry['covered'] != covered_before:
+        save_cache()
+    return success
+
+# Funktion zum Vorausladen mehrerer Zeiträume nacheinander (bricht ab, sobald job abgebrochen wird)
+def prefetch_periods(period_type, periods, job):
+    for year, month, week in periods:
+        if job.is_cancelled():
+            return
+        log.debug("Lade %s %s/%s/%s für %s voraus.", period_type, year, month, week, config.current_user)
+        fill_period(period_type, year, month, week, job)
+
+# Funktion zum Ausschneiden eines Zeitraums aus dem lokalen Speicher (ohne Netzwerkzugriff)
+# Die Einträge werden wie bei der API mit dem neuesten zuerst geliefert.
+@traced
+def get_cached_period_data(period_type, year, month=None, week=None, user=None):
+    timestamps = get_period_timestamps(period_type, year, month, week)
+    if timestamps is None:
+        return pd.DataFrame()
+    return get_cached_range_data(*timestamps, user)
+
+# Funktion zum Ausschneiden eines beliebigen Zeitbereichs aus dem lokalen Speicher (neueste zuerst)
+def get_cached_range_data(from_timestamp, to_timestamp, user=None):
+    entry = get_user_store(user or config.current_user)
+    if get_stored_range(entry) is None:
+        return pd.DataFrame()
+
+    period_data = read_newest_first(entry, from_timestamp, to_timestamp)
+    log.debug("%s Scrobbles für %s (%s bis %s) aus dem lokalen Speicher.",
+              len(period_data), entry['user'], from_timestamp, to_timestamp)
+    if period_data.empty:
+        return pd.DataFrame()
+
+    return add_string_columns(entry, period_data)
+
+# Funktion zum Ergänzen der Textspalten als kategorische Spalten (Codes = IDs, keine Textkopien)
+def add_string_columns(entry, df):
+    strings = entry['strings']
+    track_ids = df['track_id'].to_numpy()
+    title_ids = strings.get_track_titles()[track_ids]
+    df['song_title'] = pd.Categorical.from_codes(title_ids, categories=strings.get_categories('titles'))
+    df['artist'] = pd.Categorical.from_codes(df['artist_id'].to_numpy(), categories=strings.get_categories('artists'))
+    df['album'] = pd.Categorical.from_codes(df['album_id'].to_numpy(), categories=strings.get_categories('albums'))
+    return df
+
+# Funktion zum Speichern des Caches auf die Festplatte
+# Die Scrobbles liegen bereits in Segmenten bzw. der Datenbank; geschrieben werden nur die Manifeste.
+@traced
+def save_cache():
+    with store_lock:
+        for entry in list(data_cache.values()):
+            try:
+                write_manifest(entry)
+            except Exception as e:
+                print(f"Fehler beim Speichern des Caches für {entry['user']}: {e}")
+
+# Funktion zum Importieren eines Last.fm-CSV-Exports in den lokalen Speicher eines Benutzers
+# Die Datei wird blockweise gelesen. Da der Export nur minutengenau ist, gilt ein Eintrag als
+# bereits vorhanden, wenn derselbe Song in derselben Minute schon gespeichert ist; neue Einträge
+# erhalten die noch freien Sekunden ihrer Minute (der älteste die früheste). Einträge, für die in
+# ihrer Minute keine Sekunde mehr frei ist, werden übersprungen ('skipped').
+# complete_history=True: Der Export enthält die gesamte Historie (vor dem ersten Eintrag gibt es nichts).
+@traced
+def import_lastfm_csv(path, user=None, complete_history=False):
+    user = user or config.current_user
+    entry = get_user_store(user)
+    result = {'imported': 0, 'duplicates': 0, 'invalid': 0, 'skipped': 0}
+    first_minute = None
+    last_minute = None
+
+    for chunk in pd.read_csv(path, chunksize=config.CSV_CHUNK_SIZE, dtype=str, keep_default_na=False):
+        date_time = pd.to_datetime(chunk['date_time'], format=config.CSV_DATE_FORMAT, errors='coerce')
+        valid = date_time.notna().to_numpy()
+        result['invalid'] += int((~valid).sum())
+        chunk = chunk[valid].copy()
+        if chunk.empty:
+            continue
+
+        for column in ('artist', 'album', 'song_title'):
+            chunk[column] = chunk[column].str.strip()
+        minutes = ((date_time[valid] - pd.Timestamp(0)) // pd.Timedelta(minutes=1)).to_numpy(dtype=np.int64)
+        first_minute = minutes.min() if first_minute is None else min(first_minute, minutes.min())
+        last_minute = minutes.max() if last_minute is None else max(last_minute, minutes.max())
+
+        # Abgleich und Schreiben unter store_lock, damit keine gleichzeitige Synchronisierung
+        # eine der vergebenen Sekunden belegt
+        with store_lock:
+            # Mit den bereits gespeicherten Scrobbles derselben Minuten abgleichen
+            track_ids, _, _ = entry['strings'].intern(chunk)
+            existing = read_scrobbles(entry, int(minutes.min()) * 60, int(minutes.max()) * 60 + 59,
+                                      columns=['uts', 'track_id'])
+            existing_uts = existing['uts'].to_numpy(dtype=np.int64)
+            existing_minutes = existing_uts // 60
+            known_counts = existing.groupby([existing_minutes, existing['track_id'].to_numpy()]).size().rename('known')
+            keys = pd.DataFrame({'minute': minutes, 'track': track_ids})
+            keys = keys.merge(known_counts, left_on=['minute', 'track'], right_index=True, how='left')
+            occurrence = keys.groupby(['minute', 'track']).cumcount().to_numpy()
+            keep = occurrence >= keys['known'].fillna(0).to_numpy()
+            result['duplicates'] += int((~keep).sum())
+            if not keep.any():
+                continue
+
+            # Belegte Sekunden jeder Minute markieren; der n-älteste neue Eintrag einer Minute
+            # erhält ihre n-te freie Sekunde (der Export ist nach Zeit absteigend sortiert)
+            minutes = minutes[keep]
+            minute_keys, minute_index = np.unique(minutes, return_inverse=True)
+            occupied = np.zeros((len(minute_keys), 60), dtype=bool)
+            in_chunk = np.isin(existing_minutes, minute_keys)
+            occupied[np.searchsorted(minute_keys, existing_minutes[in_chunk]), existing_uts[in_chunk] % 60] = True
+            free_seconds = np.argsort(occupied, axis=1, kind='stable')
+            slots = pd.Series(minute_index).groupby(minute_index).cumcount(ascending=False).to_numpy()
+            placed = slots < 60 - occupied.sum(axis=1)[minute_index]
+            result['skipped'] += int((~placed).sum())
+
+            minute_index = minute_index[placed]
+            chunk = chunk[keep][placed].assign(uts=minutes[placed] * 60 + free_seconds[minute_index, slots[placed]])
+            written = append_scrobbles(entry, chunk[['artist', 'album', 'song_title', 'uts']])
+        result['imported'] += written
+        result['duplicates'] += len(chunk) - written
+
+        log.debug("%s Scrobbles aus %s importiert.", result['imported'], path)
+
+    if last_minute is not None:
+        covered_from = 0 if complete_history else int(first_minute) * 60
+        entry['covered'] = add_covered_range(entry['covered'], covered_from, int(last_minute) * 60 + 59)
+        save_cache()
+    return result
+
+# Funktion zur Übernahme eines Caches aus älteren Versionen (data_cache.pkl)
+# Liefert pro Benutzer die Scrobbles und die vollständig abgerufenen Bereiche.
+def migrate_cache(old_cache):
+    migrated = {}
+    for key, value in old_cache.items():
+        if isinstance(value, dict) and 'covered' in value:
+            migrated[key] = {'frames': [value['scrobbles']], 'covered': value['covered']}
+        elif isinstance(value, dict) and 'synced_from' in value:
+            # Ein zusammenhängender Bereich zwischen synced_from und synced_until
+            migrated[key] = {
+                'frames': [value['scrobbles']],
+                'covered': [[value['synced_from'], value['synced_until']]],
+            }
+        elif isinstance(value, pd.DataFrame):
+            # Ein Eintrag pro Zeitraum: '{user}_year_{y}', '{user}_month_{y}_{m}', '{user}_week_{y}_{w}'
+            parts = key.split('_')
+            try:
+                if len(parts) >= 3 and parts[-2] == 'year':
+                    user, timestamps = '_'.join(parts[:-2]), get_period_timestamps('year', int(parts[-1]))
+                elif len(parts) >= 4 and parts[-3] == 'month':
+                    user, timestamps = '_'.join(parts[:-3]), get_period_timestamps('month', int(parts[-2]), month=int(parts[-1]))
+                elif len(parts) >= 4 and parts[-3] == 'week':
+                    user, timestamps = '_'.join(parts[:-3]), get_period_timestamps('week', int(parts[-2]), week=int(parts[-1]))
+                else:
+                    continue
+            except ValueError:
+                continue
+            if value.empty:
+                continue
+
+            df = value[['artist', 'album', 'song_title', 'date_time']].copy()
+            df['uts'] = (df['date_time'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+            user_data = migrated.setdefault(user, {'frames': [], 'covered': []})
+            user_data['frames'].append(df)
+            # Der Zeitraum gilt nur bis zum letzten Scrobble als vollständig (er war evtl. noch nicht vorbei)
+            user_data['covered'] = add_covered_range(user_data['covered'], timestamps[0], min(timestamps[1], int(df['uts'].max())))
+    return migrated
+
+# Funktion zum Laden des Caches
+# Die Manifeste werden erst beim ersten Zugriff auf einen Benutzer gelesen (siehe get_user_store);
+# ein vorhandener alter Cache wird einmalig in Segmente übernommen und danach entfernt.
+@traced
+def load_cache():
+    global data_cache
+    data_cache = {}
+    if not os.path.exists(config.LEGACY_CACHE_FILE):
+        return
+
+    try:
+        with open(config.LEGACY_CACHE_FILE, 'rb') as f:
+            migrated = migrate_cache(pickle.load(f))
+        for user, user_data in migrated.items():
+            entry = get_user_store(user)
+            frames = [frame for frame in user_data['frames'] if not frame.empty]
+            if frames:
+                merge_scrobbles(entry, pd.concat(frames, ignore_index=True))
+            for covered_from, covered_to in user_data['covered']:
+                entry['covered'] = add_covered_range(entry['covered'], covered_from, covered_to)
+            write_manifest(entry)
+        os.remove(config.LEGACY_CACHE_FILE)
+        print(f"Alter Cache ({config.LEGACY_CACHE_FILE}) wurde in {config.CACHE_DIR} übernommen.")
+    except Exception as e:
+        print(f"Fehler beim Übernehmen des alten Caches: {e}")
+
+# Funktion zum Löschen des lokalen Speichers aller Benutzer (einschließlich des alten Caches)
+def clear_store():
+    global data_cache
+    with store_lock:
+        data_cache = {}  # Gemappte Segmente freigeben, bevor die Dateien gelöscht werden
+        sqlstore.close_connections()
+    reset_track_info_cache()
+    if os.path.exists(config.CACHE_DIR) or os.path.exists(config.LEGACY_CACHE_FILE):
+        try:
+            if os.path.exists(config.CACHE_DIR):
+                shutil.rmtree(config.CACHE_DIR)
+            if os.path.exists(config.LEGACY_CACHE_FILE):
+                os.remove(config.LEGACY_CACHE_FILE)
+            print("Cache erfolgreich gelöscht.")
+        except Exception as e:
+            print(f"Fehler beim Löschen des Caches: {e}")
+    else:
+        print("Kein Cache vorhanden.")
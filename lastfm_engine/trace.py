@@ -0,0 +1,163 @@
+# Zeitmessung mit Spans: Jeder Span hält Name, Beginn, Dauer und Thread fest. Ausgabe als
+# Chrome-Trace (JSON für chrome://tracing oder ui.perfetto.dev) und als Übersichtstabelle;
+# optional zeichnet cProfile die ganze Sitzung auf (nur der Haupt-Thread).
+# Eingeschaltet wird mit configure() (DEBUG_MODE oder TRACE_FILE). Ausgeschaltet kostet ein Span
+# nur einen Vergleich; es wird nichts gemessen oder gespeichert.
+# Debug-Meldungen der Module laufen über den Logger "lastfm_engine": Sie erscheinen als Zeitpunkte
+# im Trace und im Debug-Modus zusätzlich auf der Fehlerausgabe.
+import os
+import json
+import time
+import logging
+import threading
+import functools
+
+from . import config
+
+enabled = False
+events = []  # (Name, Beginn in ns, Dauer in ns (None bei Meldungen), Thread-ID, Argumente)
+started_ns = time.perf_counter_ns()
+profiler = None
+log = logging.getLogger(__package__)
+
+
+# Gemessener Abschnitt (mit "with span(...)")
+class Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+# Platzhalter, wenn die Zeitmessung ausgeschaltet ist
+class NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NO_SPAN = NoSpan()
+
+# Logging-Handler: speichert jede Meldung als Zeitpunkt (ohne Dauer) im Trace
+class TraceHandler(logging.Handler):
+    def emit(self, log_record):
+        if enabled:
+            record('log', time.perf_counter_ns(), None, {'message': log_record.getMessage()})
+
+
+# Funktion zum Öffnen eines Spans, z. B. "with span('http', method='user.getrecenttracks'):"
+def span(name, **args):
+    if not enabled:
+        return NO_SPAN
+    return Span(name, args)
+
+# Decorator: misst jeden Aufruf einer Funktion als Span mit ihrem Namen
+def traced(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return function(*args, **kwargs)
+        with Span(function.__name__, None):
+            return function(*args, **kwargs)
+    return wrapper
+
+# Funktion zum Speichern eines Spans (list.append ist threadsicher)
+def record(name, start, duration, args=None):
+    if len(events) < config.TRACE_MAX_EVENTS:
+        events.append((name, start, duration, threading.get_ident(), args))
+
+# Funktion zum Einschalten der Zeitmessung, der Debug-Meldungen und des Profilers gemäß der Konfiguration
+def configure():
+    global enabled, profiler
+    enabled = bool(config.DEBUG_MODE or config.TRACE_FILE)
+    if not log.handlers:
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(console)
+        log.addHandler(TraceHandler())
+    log.handlers[0].setLevel(logging.DEBUG if config.DEBUG_MODE else logging.WARNING)
+    log.setLevel(logging.DEBUG if enabled else logging.WARNING)
+    if config.PROFILE_FILE and profiler is None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+# Funktion zum Zusammenfassen der Spans pro Name
+# Rückgabe: Liste von (Name, Anzahl, Summe in ms, Mittelwert in ms, Maximum in ms), nach Summe sortiert
+def get_summary():
+    totals = {}
+    for name, start, duration, thread_id, args in list(events):
+        if duration is None:
+            continue
+        count, total, longest = totals.get(name, (0, 0, 0))
+        totals[name] = (count + 1, total + duration, max(longest, duration))
+    summary = [(name, count, total / 1e6, total / count / 1e6, longest / 1e6)
+               for name, (count, total, longest) in totals.items()]
+    return sorted(summary, key=lambda row: row[2], reverse=True)
+
+# Funktion zur Formatierung der Zusammenfassung als Tabelle
+def format_summary():
+    lines = [f"{'Span':<28} {'Anzahl':>7} {'Summe':>11} {'Mittel':>10} {'Max':>10}"]
+    for name, count, total, mean, longest in get_summary():
+        lines.append(f"{name:<28} {count:>7} {total:>8.1f} ms {mean:>7.2f} ms {longest:>7.2f} ms")
+    return '\n'.join(lines)
+
+# Funktion zum Schreiben der Spans als Chrome-Trace (Zeiten in Mikrosekunden seit Programmstart)
+def write_trace(path):
+    pid = os.getpid()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    trace_events = []
+    thread_ids = set()
+    for name, start, duration, thread_id, args in list(events):
+        thread_ids.add(thread_id)
+        if duration is None:
+            trace_events.append({'name': args['message'], 'cat': 'log', 'ph': 'i', 's': 't',
+                                 'ts': (start - started_ns) / 1000, 'pid': pid, 'tid': thread_id})
+            continue
+        trace_events.append({
+            'name': name,
+            'cat': 'lastfm',
+            'ph': 'X',
+            'ts': (start - started_ns) / 1000,
+            'dur': duration / 1000,
+            'pid': pid,
+            'tid': thread_id,
+            'args': args or {},
+        })
+    for thread_id in thread_ids:
+        trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                             'args': {'name': thread_names.get(thread_id, str(thread_id))}})
+    try:
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+        print(f"Trace mit {len(events)} Spans in {path} gespeichert.")
+    except Exception as e:
+        print(f"Fehler beim Speichern des Traces {path}: {e}")
+
+# Funktion zum Abschluss einer Sitzung: Profil und Trace speichern, im Debug-Modus die Übersicht ausgeben
+def finish():
+    global profiler
+    if profiler is not None:
+        profiler.disable()
+        try:
+            profiler.dump_stats(config.PROFILE_FILE)
+            print(f"Profil in {config.PROFILE_FILE} gespeichert (auswerten mit: python -m pstats {config.PROFILE_FILE}).")
+        except Exception as e:
+            print(f"Fehler beim Speichern des Profils {config.PROFILE_FILE}: {e}")
+        profiler = None
+    if config.TRACE_FILE and events:
+        write_trace(config.TRACE_FILE)
+    if config.DEBUG_MODE and events:
+        print(format_summary())
@@ -0,0 +1,128 @@
+# Song-Informationen (track.getInfo) mit persistentem LRU-Cache und Vorausladen im Hintergrund
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from . import config
+from .client import call_api
+from .trace import log
+
+# Größenbegrenzter LRU-Cache mit Ablaufzeit für track.getInfo, gespeichert in TRACK_INFO_CACHE_FILE
+# Schlüssel ist (artist, track) in normalisierter Schreibweise, Werte sind die 'track'-Objekte der API.
+class TrackInfoCache:
+    def __init__(self, path, max_size, ttl):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # Schlüssel -> {'fetched': uts, 'track': {...}}, zuletzt verwendet am Ende
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    # Normalisierter Schlüssel (Groß-/Kleinschreibung und Leerzeichen am Rand spielen keine Rolle)
+    @staticmethod
+    def make_key(artist, song_title):
+        return f"{str(artist).strip().casefold()}\t{str(song_title).strip().casefold()}"
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            now = time.time()
+            with self.lock:
+                self.entries = OrderedDict(
+                    (key, value) for key, value in entries.items() if now - value['fetched'] < self.ttl
+                )
+        except Exception as e:
+            print(f"Fehler beim Laden des Song-Info-Caches: {e}")
+
+    # Liefert die gespeicherten Informationen oder None, wenn sie fehlen bzw. abgelaufen sind
+    def get(self, artist, song_title):
+        key = self.make_key(artist, song_title)
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                return None
+            if time.time() - value['fetched'] >= self.ttl:
+                del self.entries[key]
+                self.dirty = True
+                return None
+            self.entries.move_to_end(key)
+            return value['track']
+
+    def put(self, artist, song_title, track_info):
+        key = self.make_key(artist, song_title)
+        with self.lock:
+            self.entries[key] = {'fetched': time.time(), 'track': track_info}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    # Speichert den Cache atomar, falls sich etwas geändert hat
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = dict(self.entries)
+            self.dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Fehler beim Speichern des Song-Info-Caches: {e}")
+
+track_info_cache = None
+track_info_cache_lock = threading.Lock()
+
+# Funktion zum Abrufen des Song-Info-Caches (wird beim ersten Zugriff von der Festplatte geladen)
+def get_track_info_cache():
+    global track_info_cache
+    with track_info_cache_lock:
+        if track_info_cache is None:
+            track_info_cache = TrackInfoCache(os.path.join(config.CACHE_DIR, config.TRACK_INFO_CACHE_FILE),
+                                              config.TRACK_INFO_CACHE_SIZE, config.TRACK_INFO_TTL)
+            track_info_cache.load()
+        return track_info_cache
+
+# Funktion zum Verwerfen des geladenen Caches (z. B. nachdem CACHE_DIR gelöscht wurde)
+def reset_track_info_cache():
+    global track_info_cache
+    with track_info_cache_lock:
+        track_info_cache = None
+
+# Funktion zum Abrufen der Song-Informationen (track.getInfo), bevorzugt aus dem Cache
+# Löst LastFmError aus, wenn die API einen Fehler meldet.
+def fetch_track_info(artist, song_title, low_priority=False):
+    cache = get_track_info_cache()
+    track_info = cache.get(artist, song_title)
+    if track_info is not None:
+        return track_info
+
+    data = call_api('track.getInfo', {'artist': artist, 'track': song_title}, config.API_KEY, low_priority)
+    track_info = data.get('track', {})
+    cache.put(artist, song_title, track_info)
+    return track_info
+
+# Funktion zum Vorausladen der Song-Informationen für die angezeigten Chartplätze
+# songs: Liste von (artist, song_title); bricht ab, sobald job abgebrochen wird.
+def prefetch_track_info(songs, job):
+    cache = get_track_info_cache()
+    try:
+        for artist, song_title in songs:
+            if job.is_cancelled():
+                return
+            if cache.get(artist, song_title) is not None:
+                continue
+            try:
+                fetch_track_info(artist, song_title, low_priority=True)
+            except Exception as e:
+                log.debug("Song-Informationen für %s - %s nicht verfügbar: %s", song_title, artist, e)
+    finally:
+        cache.save()
@@ -0,0 +1,93 @@
+# Persistente Wochenaggregate pro Benutzer (data_cache/<Benutzer>/weekly.arrow): Wiedergaben und
+# Platz jedes Songs, Künstlers und Albums in jeder Woche. Monats- und Jahrescharts werden nur noch aus diesen kleinen
+# Tabellen berechnet. Neu aggregiert werden nur Monate, deren Version (siehe 'month_versions' im
+# Scrobble-Speicher) sich seit der letzten Aggregation geändert hat.
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .periods import get_period_timestamps
+from .store import store_lock, get_user_dir, get_month_key, read_newest_first, add_string_columns
+from .charts import AGGREGATE_COLUMNS, aggregate_weeks
+from .trace import traced, log
+
+WEEKLY_VERSION = 2  # Erhöhen, wenn sich das Format oder die Berechnung der Aggregate ändert
+
+
+# Funktion zum Öffnen der Wochenaggregate eines Benutzers (einmal pro Sitzung von der Festplatte)
+# entry['weekly'] = {'table': DataFrame, 'months': {'JJJJ-MM': Version beim Aggregieren}}
+def open_weekly(entry):
+    weekly = entry.get('weekly')
+    if weekly is not None:
+        return weekly
+
+    weekly = {'table': pd.DataFrame(columns=AGGREGATE_COLUMNS), 'months': {}}
+    path = os.path.join(get_user_dir(entry['user']), 'weekly.arrow')
+    if os.path.exists(path):
+        try:
+            table = feather.read_table(path, memory_map=False)
+            metadata = json.loads(table.schema.metadata[b'weekly'])
+            if metadata['version'] == WEEKLY_VERSION:
+                weekly = {'table': table.to_pandas(), 'months': metadata['months']}
+        except Exception as e:
+            print(f"Fehler beim Laden der Wochenaggregate für {entry['user']}: {e}")
+    entry['weekly'] = weekly
+    return weekly
+
+# Funktion zum Speichern der Wochenaggregate (atomar über eine temporäre Datei)
+def save_weekly(entry, weekly):
+    user_dir = get_user_dir(entry['user'])
+    try:
+        os.makedirs(user_dir, exist_ok=True)
+        table = pa.Table.from_pandas(weekly['table'], preserve_index=False)
+        metadata = {'version': WEEKLY_VERSION, 'months': weekly['months']}
+        table = table.replace_schema_metadata({'weekly': json.dumps(metadata)})
+        path = os.path.join(user_dir, 'weekly.arrow')
+        feather.write_feather(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+    except Exception as e:
+        print(f"Fehler beim Speichern der Wochenaggregate für {entry['user']}: {e}")
+
+# Funktion zum Neuberechnen der Aggregate einzelner Monate eines Jahres aus den Scrobbles
+# (nur mit store_lock aufrufen)
+def update_weekly(entry, weekly, year, months):
+    from_timestamp = get_period_timestamps('month', year, month=min(months))[0]
+    to_timestamp = get_period_timestamps('month', year, month=max(months))[1]
+    aggregates = aggregate_weeks(read_newest_first(entry, from_timestamp, to_timestamp),
+                                 entry['strings'].album_ids.get('', -1))
+    aggregates = aggregates[aggregates['month'].isin(months)]
+
+    table = weekly['table']
+    table = table[~((table['year'] == year) & table['month'].isin(months))]
+    if table.empty:
+        weekly['table'] = aggregates.reset_index(drop=True)
+    elif not aggregates.empty:
+        weekly['table'] = pd.concat([table, aggregates], ignore_index=True)
+    else:
+        weekly['table'] = table
+    for month in months:
+        key = get_month_key(year, month)
+        weekly['months'][key] = entry['month_versions'].get(key, 0)
+
+# Funktion zum Abrufen der Wochenaggregate eines Monats (oder eines ganzen Jahres)
+# Veraltete Monate werden vorher aus den Scrobbles neu berechnet und gespeichert.
+# Rückgabe: DataFrame mit AGGREGATE_COLUMNS und den Textspalten song_title, artist und album
+@traced
+def get_weekly_aggregates(entry, year, month=None):
+    months = [month] if month is not None else list(range(1, 13))
+    with store_lock:
+        weekly = open_weekly(entry)
+        stale = [m for m in months
+                 if weekly['months'].get(get_month_key(year, m)) != entry['month_versions'].get(get_month_key(year, m), 0)]
+        if stale:
+            log.debug("Aggregiere Wochen für %s: %s, Monate %s.", entry['user'], year, stale)
+            update_weekly(entry, weekly, year, stale)
+            save_weekly(entry, weekly)
+        table = weekly['table']
+
+    selected = table[(table['year'] == year) & table['month'].isin(months)].reset_index(drop=True)
+    if selected.empty:
+        return pd.DataFrame()
+    return add_string_columns(entry, selected)
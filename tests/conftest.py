@@ -0,0 +1,87 @@
+# Gemeinsame Fixtures der Tests: ein leerer lokaler Speicher pro Test (im tmp_path), kleine
+# Scrobble-Historien und eine nachgebildete Last.fm-Session für user.getrecenttracks.
+import os
+import sys
+import calendar
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lastfm_engine import config, client, store, sqlstore
+from benchmarks.fakeapi import FakeLastFmSession
+
+TEST_USER = 'testuser'
+TEST_API_KEY = 'testkey'
+
+
+# Funktion zur Erzeugung einer kleinen Historie (neueste zuerst) zwischen zwei Zeitpunkten
+# Wenige Songs mit Zipf-verteilten Wiedergaben, damit es viele Gleichstände gibt; einige Alben sind
+# leer, und ein Titel kommt bei zwei Künstlern vor.
+def make_scrobbles(rows, from_timestamp, to_timestamp, tracks=120, seed=1):
+    rng = np.random.default_rng(seed)
+    uts = np.sort(rng.choice(np.arange(from_timestamp, to_timestamp), size=rows, replace=False))[::-1]
+    track_ids = (rng.zipf(1.4, size=rows) - 1) % tracks
+    titles = np.array([f"Song {i % (tracks - 1)}" for i in range(tracks)], dtype=object)
+    artists = np.array([f"Artist {i % 17}" for i in range(tracks)], dtype=object)
+    albums = np.array([f"Album {i % 29}" if i % 7 else '' for i in range(tracks)], dtype=object)
+    return pd.DataFrame({
+        'artist': artists[track_ids],
+        'album': albums[track_ids],
+        'song_title': titles[track_ids],
+        'uts': uts.astype(np.int64),
+    })
+
+# Funktion zur Umrechnung eines UTC-Datums in einen Zeitstempel
+def utc(year, month, day, hour=0, minute=0, second=0):
+    return calendar.timegm((year, month, day, hour, minute, second))
+
+
+# Jeder Test erhält einen eigenen, leeren Speicher; der echte data_cache bleibt unberührt
+@pytest.fixture(autouse=True)
+def empty_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'CACHE_DIR', str(tmp_path / 'data_cache'))
+    monkeypatch.setattr(config, 'LEGACY_CACHE_FILE', str(tmp_path / 'data_cache.pkl'))
+    monkeypatch.setattr(config, 'STORAGE_BACKEND', 'arrow')
+    monkeypatch.setattr(config, 'CHART_DEPTH', 0)
+    monkeypatch.setattr(config, 'DEBUG_MODE', False)
+    monkeypatch.setattr(config, 'current_user', TEST_USER)
+    monkeypatch.setattr(config, 'API_KEY', TEST_API_KEY)
+    monkeypatch.setattr(config, 'users', [])
+    store.load_cache()
+    yield tmp_path
+    sqlstore.close_connections()
+    store.load_cache()
+
+# Historie 2023 (mit Rändern in den Nachbarjahren für die ISO-Wochen am Jahreswechsel)
+@pytest.fixture(scope='session')
+def scrobbles():
+    return make_scrobbles(4000, utc(2022, 12, 20), utc(2024, 1, 10))
+
+# Speicher des Testbenutzers mit den Scrobbles aus scrobbles
+@pytest.fixture
+def stored_entry(scrobbles):
+    entry = store.get_user_store(TEST_USER)
+    store.merge_scrobbles(entry, scrobbles)
+    store.save_cache()
+    return entry
+
+# Nachgebildete Last.fm-Session ohne Wartezeiten (kleine Seiten, kurze Blöcke)
+@pytest.fixture
+def fake_lastfm(monkeypatch):
+    def install(df, fail_page=None):
+        session = FakeLastFmSession(df, fail_page)
+        monkeypatch.setattr(client, 'session', session)
+        return session
+
+    monkeypatch.setattr(config, 'PAGE_LIMIT', 50)
+    monkeypatch.setattr(config, 'STREAM_BATCH_PAGES', 2)
+    monkeypatch.setattr(config, 'REQUESTS_PER_SECOND', 1000000)
+    monkeypatch.setattr(config, 'MAX_RETRIES', 1)
+    client.rate_limiters.pop(TEST_API_KEY, None)
+    client.circuit_breakers.pop(TEST_API_KEY, None)
+    yield install
+    client.rate_limiters.pop(TEST_API_KEY, None)
+    client.circuit_breakers.pop(TEST_API_KEY, None)
@@ -0,0 +1,93 @@
+# Referenz für die Chart-Tests: die ursprünglichen Berechnungen aus lastfm_api-2.0.py (vor der
+# Aufteilung in lastfm_engine), unverändert bis auf die Debug-Ausgaben. Die Engine muss für dieselben
+# Scrobbles dieselben Plätze, Punkte, Wiedergaben und Alben liefern.
+from collections import Counter
+
+import pandas as pd
+
+
+# Funktion zum Hinzufügen der Datumsspalten wie in prepare_data (df neueste zuerst, mit uts)
+def prepare_frame(df):
+    df = df.copy()
+    df['date_time'] = pd.to_datetime(df['uts'], unit='s')
+    df['year'] = df['date_time'].dt.year
+    df['month'] = df['date_time'].dt.month
+    iso = df['date_time'].dt.isocalendar()
+    df['iso_year'] = iso['year'].astype(int)
+    df['iso_week'] = iso['week'].astype(int)
+    return df
+
+# Funktion zur Berechnung der Wochencharts
+def calculate_weekly_charts(df, year, week):
+    week_data = df[(df['iso_year'] == year) & (df['iso_week'] == week)]
+    if week_data.empty:
+        return {}, pd.Series(dtype=int), pd.DataFrame()
+
+    # Zähle die Vorkommen jeder song_title/artist-Kombination
+    counts = week_data.groupby(['song_title', 'artist']).size()
+
+    # Hole das erste Vorkommen jeder song_title/artist-Kombination, um das Album zu erhalten
+    first_occurrences = week_data.drop_duplicates(subset=['song_title', 'artist'], keep='first')
+    top_songs_df = first_occurrences.set_index(['song_title', 'artist'])
+    top_songs_df['play_count'] = counts
+
+    # Sortiere nach Häufigkeit und begrenze auf die Top 20 Songs
+    top_songs_df = top_songs_df.sort_values(by='play_count', ascending=False)
+    top_songs_df = top_songs_df.head(20)
+
+    # Vergabe der Punkte (Platz 1 = 20 Punkte, Platz 2 = 19 usw.)
+    points = {song: 20 - i for i, song in enumerate(top_songs_df.index)}
+    top_songs_df['points'] = top_songs_df.index.map(points)
+    return points, counts, top_songs_df
+
+# Funktion zur Zusammenfassung von Punkten und Wiedergaben zu einem Chart mit size Plätzen
+def build_chart(data, points, plays, size):
+    chart_data = pd.DataFrame({
+        'points': pd.Series(points),
+        'play_count': pd.Series(plays),
+    })
+    chart_data.index.names = ['song_title', 'artist']
+
+    first_occurrences = data.drop_duplicates(subset=['song_title', 'artist'], keep='first')
+    song_info = first_occurrences.set_index(['song_title', 'artist'])[['album']]
+    chart_data = chart_data.merge(song_info, left_index=True, right_index=True)
+
+    chart_data = chart_data.sort_values(by=['points', 'play_count'], ascending=[False, False])
+    chart_data = chart_data.head(size)
+    return chart_data['points'].to_dict(), chart_data['play_count'].to_dict(), chart_data
+
+# Funktion zur Berechnung der Monatscharts (Summe der Wochenpunkte, Top 30)
+def calculate_monthly_charts(df, year, month):
+    month_data = df[(df['year'] == year) & (df['month'] == month)]
+    if month_data.empty:
+        return {}, {}, pd.DataFrame()
+
+    weekly_points = Counter()
+    weekly_plays = Counter()
+    for week in month_data['iso_week'].unique():
+        points, plays, _ = calculate_weekly_charts(month_data, year, week)
+        for song, points_count in points.items():
+            weekly_points[song] += points_count
+            weekly_plays[song] += plays.get(song, 0)
+
+    if not weekly_points:
+        return {}, {}, pd.DataFrame()
+    return build_chart(month_data, weekly_points, weekly_plays, 30)
+
+# Funktion zur Berechnung der Jahrescharts (Summe der Monatspunkte, Top 50)
+def calculate_yearly_charts(df, year):
+    year_data = df[df['year'] == year]
+    if year_data.empty:
+        return {}, {}, pd.DataFrame()
+
+    monthly_points = Counter()
+    monthly_plays = Counter()
+    for month in year_data['month'].unique():
+        points, plays, _ = calculate_monthly_charts(year_data, year, month)
+        for song, points_count in points.items():
+            monthly_points[song] += points_count
+            monthly_plays[song] += plays.get(song, 0)
+
+    if not monthly_points:
+        return {}, {}, pd.DataFrame()
+    return build_chart(year_data, monthly_points, monthly_plays, 50)
@@ -0,0 +1,49 @@
+# Arrow- und SQLite-Speicher liefern für dieselben Scrobbles dieselben Charts (alle Wochen, Monate und
+# das Jahr, alle Dimensionen, mit Chartgröße und allen Plätzen sowie frei gewählte Zeiträume)
+import datetime
+
+import pytest
+
+from lastfm_engine import config, store, results, charts
+from lastfm_engine.periods import get_range_timestamps, get_weeks_in_year
+from conftest import TEST_USER
+
+PERIODS = ([('week', 2023, None, week) for week in range(1, get_weeks_in_year(2023) + 1)]
+           + [('month', 2023, month, None) for month in range(1, 13)] + [('year', 2023, None, None)])
+RANGES = [(datetime.date(2022, 12, 24), datetime.date(2023, 2, 5)), (datetime.date(2023, 6, 1), datetime.date(2023, 8, 31))]
+
+
+# Funktion zur Berechnung aller Charts eines Speichers
+def calculate_all(entry, dimension):
+    calculated = {}
+    for period in PERIODS:
+        calculated[period] = results.calculate_charts(entry, *period, dimension=dimension)
+    for chart_range in RANGES:
+        calculated[chart_range] = results.calculate_range(entry, *get_range_timestamps(*chart_range), dimension)
+    return calculated
+
+@pytest.mark.parametrize('depth', [0, -1])
+@pytest.mark.parametrize('dimension', charts.DIMENSIONS)
+def test_sqlite_charts_equal_arrow_charts(stored_entry, monkeypatch, depth, dimension):
+    monkeypatch.setattr(config, 'CHART_DEPTH', depth)
+    arrow = calculate_all(stored_entry, dimension)
+
+    # Beim nächsten Zugriff mit storage_backend "sqlite" werden die Scrobbles übertragen
+    monkeypatch.setattr(config, 'STORAGE_BACKEND', 'sqlite')
+    store.load_cache()
+    entry = store.get_user_store(TEST_USER)
+    assert entry['backend'] == 'sqlite'
+    sqlite = calculate_all(entry, dimension)
+
+    compared = 0
+    for key, expected in arrow.items():
+        result = sqlite[key]
+        assert result.empty == expected.empty, key
+        if expected.empty:
+            continue
+        compared += 1
+        assert list(result.index) == list(expected.index), key
+        assert list(result['points']) == list(expected['points']), key
+        assert list(result['play_count']) == list(expected['play_count']), key
+        assert list(result['album'].astype(str)) == list(expected['album'].astype(str)), key
+    assert compared == len(PERIODS) + len(RANGES)
@@ -0,0 +1,94 @@
+# Wochen-, Monats- und Jahrescharts der Engine im Vergleich mit den ursprünglichen Berechnungen
+# (legacy_charts), auch bei Gleichständen, für Künstler und Alben und mit größerer Charttiefe.
+import pytest
+
+from lastfm_engine import config, results
+from lastfm_engine.cli import parse_args
+from lastfm_engine.periods import get_period_timestamps
+from legacy_charts import prepare_frame, calculate_weekly_charts, calculate_monthly_charts, calculate_yearly_charts
+
+WEEKS = [1, 2, 9, 22, 35, 48, 52]
+MONTHS = list(range(1, 13))
+
+
+# Funktion zum Vergleich eines Engine-Ergebnisses mit der Referenz (Reihenfolge, Punkte, Wiedergaben, Album)
+def assert_same_chart(result, expected, compare_album=True):
+    assert list(result.index) == list(expected.index)
+    assert list(result['points']) == list(expected['points'])
+    assert list(result['play_count']) == list(expected['play_count'])
+    if compare_album:
+        assert list(result['album'].astype(str)) == list(expected['album'].astype(str))
+
+# Funktion zur Umformung der Scrobbles, damit die Songcharts der Referenz Künstler- bzw. Albumcharts ergeben
+def as_dimension(df, dimension):
+    df = df.copy()
+    if dimension == 'artist':
+        df['song_title'] = ''
+    else:
+        df = df[df['album'] != '']
+        df['song_title'] = df['album']
+    return df
+
+@pytest.fixture(scope='module')
+def legacy_frame(scrobbles):
+    return prepare_frame(scrobbles)
+
+
+@pytest.mark.parametrize('week', WEEKS)
+def test_weekly_charts_match_baseline(stored_entry, legacy_frame, week):
+    result = results.calculate_charts(stored_entry, 'week', 2023, week=week)
+    assert_same_chart(result, calculate_weekly_charts(legacy_frame, 2023, week)[2])
+
+@pytest.mark.parametrize('month', MONTHS)
+def test_monthly_charts_match_baseline(stored_entry, legacy_frame, month):
+    result = results.calculate_charts(stored_entry, 'month', 2023, month)
+    assert_same_chart(result, calculate_monthly_charts(legacy_frame, 2023, month)[2])
+
+def test_yearly_charts_match_baseline(stored_entry, legacy_frame):
+    result = results.calculate_charts(stored_entry, 'year', 2023)
+    assert len(result) == 50
+    assert_same_chart(result, calculate_yearly_charts(legacy_frame, 2023)[2])
+
+@pytest.mark.parametrize('dimension', ['artist', 'album'])
+def test_artist_and_album_charts_match_baseline(stored_entry, scrobbles, dimension):
+    frame = prepare_frame(as_dimension(scrobbles, dimension))
+    for week in WEEKS:
+        result = results.calculate_charts(stored_entry, 'week', 2023, week=week, dimension=dimension)
+        assert_same_chart(result, calculate_weekly_charts(frame, 2023, week)[2], compare_album=False)
+    for month in (1, 6, 12):
+        result = results.calculate_charts(stored_entry, 'month', 2023, month, dimension=dimension)
+        assert_same_chart(result, calculate_monthly_charts(frame, 2023, month)[2], compare_album=False)
+    result = results.calculate_charts(stored_entry, 'year', 2023, dimension=dimension)
+    assert_same_chart(result, calculate_yearly_charts(frame, 2023)[2], compare_album=False)
+
+# Mit chart_depth "all" beginnt jedes Chart mit den Plätzen der Referenz; danach folgen die übrigen
+# Songs mit Punkten und zuletzt alle Songs des Zeitraums ohne Punkte, geordnet nach ihren Wiedergaben
+def test_full_depth_extends_baseline(stored_entry, legacy_frame, monkeypatch):
+    monkeypatch.setattr(config, 'CHART_DEPTH', -1)
+    for period, args, expected in (
+            ('week', {'week': 22}, calculate_weekly_charts(legacy_frame, 2023, 22)[2]),
+            ('month', {'month': 6}, calculate_monthly_charts(legacy_frame, 2023, 6)[2]),
+            ('year', {}, calculate_yearly_charts(legacy_frame, 2023)[2])):
+        result = results.calculate_charts(stored_entry, period, 2023, **args)
+        assert_same_chart(result.head(len(expected)), expected)
+
+        rest = result.iloc[len(expected):]
+        assert list(rest['points']) == sorted(rest['points'], reverse=True)
+        without_points = rest[rest['points'] == 0]
+        assert len(without_points) > 0
+        assert list(without_points['play_count']) == sorted(without_points['play_count'], reverse=True)
+
+    year = legacy_frame[legacy_frame['year'] == 2023]
+    result = results.calculate_charts(stored_entry, 'year', 2023)
+    assert len(result) == year.groupby(['song_title', 'artist']).ngroups
+
+# Eine Woche 53 gibt es nur in Jahren mit 53 ISO-Wochen: sonst keine Charts statt eines Fehlers,
+# und die Kommandozeile lehnt sie ab
+def test_week_53_only_in_long_iso_years(stored_entry, capsys):
+    assert results.get_chart_results('week', 2023, week=53, offline=True).empty
+    assert get_period_timestamps('week', 2020, week=53) is not None
+
+    with pytest.raises(SystemExit):
+        parse_args(['week', '2023', '53', '--offline'])
+    assert 'nur 52 Wochen' in capsys.readouterr().err
+    assert parse_args(['week', '2020', '53', '--offline']).number == 53
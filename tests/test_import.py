@@ -0,0 +1,85 @@
+# Import von Last.fm-CSV-Exporten: Duplikate, freie Sekunden innerhalb der Minute und Reihenfolge
+import json
+
+import pandas as pd
+
+from lastfm_engine import config, store
+from lastfm_engine.cli import parse_args, run_command
+from conftest import TEST_USER, utc
+
+
+# Funktion zum Schreiben eines CSV-Exports (Zeilen: (artist, album, song_title, uts), neueste zuerst)
+def write_csv(path, rows):
+    df = pd.DataFrame(rows, columns=['artist', 'album', 'song_title', 'uts'])
+    df['date_time'] = pd.to_datetime(df['uts'], unit='s').dt.strftime(config.CSV_DATE_FORMAT)
+    df[['artist', 'album', 'song_title', 'date_time']].to_csv(path, index=False)
+    return str(path)
+
+# Funktion zum Lesen der gespeicherten Scrobbles des Testbenutzers (neueste zuerst, mit Texten)
+def read_stored(entry):
+    df = store.read_newest_first(entry, 0, utc(2100, 1, 1))
+    return store.add_string_columns(entry, df)
+
+
+def test_import_stores_rows_in_export_order(tmp_path):
+    minute = utc(2024, 9, 19, 11, 25)
+    rows = [('A', 'X', 'Song 3', minute + 60), ('A', 'X', 'Song 2', minute), ('B', '', 'Song 1', minute),
+            ('A', 'X', 'Song 2', minute), ('C', 'Y', 'Song 0', minute - 3600)]
+    path = write_csv(tmp_path / 'export.csv', rows)
+
+    result = store.import_lastfm_csv(path, TEST_USER)
+    assert result == {'imported': 5, 'duplicates': 0, 'invalid': 0, 'skipped': 0}
+
+    stored = read_stored(store.get_user_store(TEST_USER))
+    assert list(stored['song_title'].astype(str)) == ['Song 3', 'Song 2', 'Song 1', 'Song 2', 'Song 0']
+    assert stored['uts'].is_unique
+    assert list(stored['uts'] // 60 * 60) == [row[3] for row in rows]
+
+def test_reimport_counts_duplicates(tmp_path):
+    minute = utc(2024, 9, 19, 11, 25)
+    rows = [('A', 'X', 'Song 1', minute), ('A', 'X', 'Song 1', minute), ('B', 'Y', 'Song 2', minute - 60)]
+    path = write_csv(tmp_path / 'export.csv', rows)
+    store.import_lastfm_csv(path, TEST_USER)
+
+    # Eine zusätzliche Wiedergabe in derselben Minute ist neu, die übrigen sind bereits vorhanden
+    more = write_csv(tmp_path / 'more.csv', rows + [('A', 'X', 'Song 1', minute)])
+    result = store.import_lastfm_csv(more, TEST_USER)
+    assert result == {'imported': 1, 'duplicates': 3, 'invalid': 0, 'skipped': 0}
+    assert store.get_scrobble_count(store.get_user_store(TEST_USER)) == 4
+
+def test_import_skips_seconds_of_existing_scrobbles(tmp_path):
+    minute = utc(2024, 9, 19, 11, 25)
+    entry = store.get_user_store(TEST_USER)
+    api_scrobbles = pd.DataFrame({'artist': ['A', 'B'], 'album': ['X', 'Y'], 'song_title': ['Song 1', 'Song 2'],
+                                  'uts': [minute, minute + 1]})
+    assert store.merge_scrobbles(entry, api_scrobbles) == 2
+
+    # Song 1 ist schon vorhanden; die neuen Einträge dürfen die Sekunden 0 und 1 nicht überschreiben
+    rows = [('C', 'Z', f"Track {i}", minute) for i in range(3)] + [('A', 'X', 'Song 1', minute)]
+    result = store.import_lastfm_csv(write_csv(tmp_path / 'export.csv', rows), TEST_USER)
+    assert result == {'imported': 3, 'duplicates': 1, 'invalid': 0, 'skipped': 0}
+
+    stored = read_stored(entry)
+    assert len(stored) == 5
+    assert sorted(stored['uts'] - minute) == [0, 1, 2, 3, 4]
+    assert set(stored.loc[stored['uts'] < minute + 2, 'song_title'].astype(str)) == {'Song 1', 'Song 2'}
+
+def test_import_reports_rows_without_free_second(tmp_path):
+    minute = utc(2024, 9, 19, 11, 25)
+    rows = [('C', 'Z', f"Track {i}", minute) for i in range(62)] + [('A', 'X', 'Song', minute - 60)]
+    path = write_csv(tmp_path / 'export.csv', rows)
+    with open(path, 'a') as f:
+        f.write("A,X,Song,kein Datum\n")
+
+    result = store.import_lastfm_csv(path, TEST_USER)
+    assert result == {'imported': 61, 'duplicates': 0, 'invalid': 1, 'skipped': 2}
+    assert store.get_scrobble_count(store.get_user_store(TEST_USER)) == 61
+
+# Import über die Kommandozeile; mit --complete gilt auch alles vor dem ersten Eintrag als abgedeckt
+def test_cli_import_complete_history(tmp_path, capsys):
+    minute = utc(2024, 9, 19, 11, 25)
+    path = write_csv(tmp_path / 'export.csv', [('A', 'X', 'Song 1', minute), ('B', 'Y', 'Song 2', minute - 60)])
+
+    assert run_command(parse_args(['import', path, '--complete', '--format', 'json'])) == 0
+    assert json.loads(capsys.readouterr().out) == {'imported': 2, 'duplicates': 0, 'invalid': 0, 'skipped': 0}
+    assert store.get_user_store(TEST_USER)['covered'] == [[0, minute + 59]]
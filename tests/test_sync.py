@@ -0,0 +1,66 @@
+# Abgedeckte Bereiche (covered) und Abruf fehlender Bereiche: Checkpoints nach jedem gespeicherten
+# Block, Fortsetzen nach einem Abbruch und Übernahme in das Manifest
+import json
+import os
+
+from lastfm_engine import store
+from conftest import TEST_USER, make_scrobbles, utc
+
+
+def test_missing_ranges_between_covered_ranges():
+    covered = [[100, 199], [300, 399]]
+    assert store.get_missing_ranges(covered, 0, 500) == [(0, 99), (200, 299), (400, 500)]
+    assert store.get_missing_ranges(covered, 150, 350) == [(200, 299)]
+    assert store.get_missing_ranges(covered, 100, 199) == []
+    assert store.get_missing_ranges([], 10, 20) == [(10, 20)]
+
+def test_covered_ranges_merge_when_adjacent_or_overlapping():
+    covered = store.add_covered_range([], 100, 199)
+    covered = store.add_covered_range(covered, 300, 399)
+    assert covered == [[100, 199], [300, 399]]
+    assert store.add_covered_range(covered, 200, 299) == [[100, 399]]
+    assert store.add_covered_range(covered, 150, 320) == [[100, 399]]
+    assert store.add_covered_range(covered, 0, 50) == [[0, 50], [100, 199], [300, 399]]
+
+def test_fetch_missing_ranges_stores_range(fake_lastfm):
+    from_timestamp, to_timestamp = utc(2023, 1, 1), utc(2023, 3, 1) - 1
+    scrobbles = make_scrobbles(700, from_timestamp, to_timestamp + 1, seed=3)
+    session = fake_lastfm(scrobbles)
+    entry = store.get_user_store(TEST_USER)
+
+    assert store.fetch_missing_ranges(entry, from_timestamp, to_timestamp)
+    assert entry['covered'] == [[from_timestamp, to_timestamp]]
+    stored = store.read_scrobbles(entry, from_timestamp, to_timestamp)
+    assert sorted(stored['uts']) == sorted(scrobbles['uts'])
+
+    # Ein zweiter Abruf desselben Bereichs fragt Last.fm nicht mehr
+    requests = len(session.requests)
+    assert store.fetch_missing_ranges(entry, from_timestamp, to_timestamp)
+    assert len(session.requests) == requests
+
+def test_interrupted_fetch_resumes_after_checkpoint(fake_lastfm):
+    from_timestamp, to_timestamp = utc(2023, 1, 1), utc(2023, 3, 1) - 1
+    scrobbles = make_scrobbles(700, from_timestamp, to_timestamp + 1, seed=4)
+    entry = store.get_user_store(TEST_USER)
+
+    # Seite 5 schlägt fehl: Gespeichert sind die Blöcke mit den Seiten 1-2 und 3-4 (je 50 Scrobbles),
+    # abgedeckt ist alles vom ältesten gespeicherten Scrobble bis zum Ende des Bereichs
+    fake_lastfm(scrobbles, fail_page=5)
+    assert not store.fetch_missing_ranges(entry, from_timestamp, to_timestamp)
+    stored = store.read_scrobbles(entry, from_timestamp, to_timestamp)
+    assert len(stored) == 200
+    checkpoint = int(stored['uts'].min())
+    assert entry['covered'] == [[checkpoint, to_timestamp]]
+
+    # Der Checkpoint steht bereits im Manifest (auch nach einem Absturz vorhanden)
+    with open(os.path.join(store.get_user_dir(TEST_USER), 'manifest.json')) as f:
+        assert json.load(f)['covered'] == [[checkpoint, to_timestamp]]
+
+    # Der nächste Abruf setzt vor dem Checkpoint fort und lädt nur den Rest
+    session = fake_lastfm(scrobbles)
+    assert store.fetch_missing_ranges(entry, from_timestamp, to_timestamp)
+    assert {(request_from, request_to) for request_from, request_to, page in session.requests} == \
+        {(from_timestamp, checkpoint - 1)}
+    assert entry['covered'] == [[from_timestamp, to_timestamp]]
+    stored = store.read_scrobbles(entry, from_timestamp, to_timestamp)
+    assert sorted(stored['uts']) == sorted(scrobbles['uts'])